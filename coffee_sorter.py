@@ -9,10 +9,16 @@ import RPi.GPIO as GPIO
 from hx711 import HX711  # Older library
 import time
 import config
+import os
+import sys
 import joblib  # For ML model
 import requests  # For ThingSpeak
 import signal  # For timeout
 
+# After `import config`: scripts/ has its own config.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from load_cell import LoadCellStream
+
 # Load ML model
 model = joblib.load('decision_tree_model.pkl')
 
@@ -56,15 +62,14 @@ def classify_bean(r, g, b, weight):
     return "GOOD" if prediction[0] == 1 else "BAD"
 
 # Load cell functions
-def get_weight(hx, samples=5):
-    if hx is None:
+def get_weight(scale, detected_at):
+    if scale is None:
         return 0.25  # Default weight for testing when HX711 is disabled
-    readings = []
-    for _ in range(samples):
-        readings.append(hx.get_weight())
-        time.sleep(0.1)
-    raw = sum(readings) / len(readings)
-    return raw / config.LOAD_SCALE  # Manual scaling
+    # Settled reading taken after the bean arrived (the scale lags the drop)
+    weight, settled = scale.wait_settled(after_ts=detected_at, timeout=1.0)
+    if not settled:
+        print(f"Weight not settled - using {weight:.2f}g")
+    return weight
 
 # Servo functions
 def set_servo_angle(angle):
@@ -130,6 +135,12 @@ except Exception as e:
 
 signal.alarm(0)  # Cancel alarm
 
+# Sample the load cell continuously; get_weight() only waits for it to settle
+scale = (LoadCellStream(lambda: hx.get_weight() / config.LOAD_SCALE, interval_s=0.05).start()
+         if hx else None)
+if scale:
+    scale.calibrate_tolerance()  # empty scale: settle tolerance from the noise
+
 # Counters for ThingSpeak (initialize here)
 good_count = 0
 bad_count = 0
@@ -151,6 +162,7 @@ try:
         while not bean_detected:
             if GPIO.input(config.IR_SENSOR) == GPIO.LOW:  # Active low
                 bean_detected = True
+                detected_at = time.time()
                 print("✓ Bean detected!")
                 time.sleep(0.5)  # Debounce
             else:
@@ -158,13 +170,14 @@ try:
                 try:
                     input("")  # Non-blocking check
                     bean_detected = True
+                    detected_at = time.time()
                     print("✓ Manual trigger!")
                 except:
                     pass
             time.sleep(0.1)
 
         # Read sensors
-        weight = get_weight(hx)
+        weight = get_weight(scale, detected_at)
         r, g, b = read_color()
         print(f"Weight: {weight:.2f}g | Color - R:{r} G:{g} B:{b}")
 
@@ -212,6 +225,8 @@ except KeyboardInterrupt:
     print("\nSorter stopped")
 
 finally:
+    if scale:
+        scale.stop()
     pwm.stop()
     set_leds()
     GPIO.cleanup()
@@ -13,9 +13,14 @@ import config
 import joblib  # For ML model
 import requests  # For ThingSpeak
 import select  # For non-blocking input
+import os
 import sys
 import signal  # For timeout
 
+# After `import config`: scripts/ has its own config.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from load_cell import LoadCellStream
+
 # Load ML model
 model = joblib.load('decision_tree_model.pkl')
 
@@ -59,15 +64,14 @@ def classify_bean(r, g, b, weight):
     return "GOOD" if prediction[0] == 1 else "BAD"
 
 # Load cell functions
-def get_weight(hx, samples=5):
-    if hx is None:
+def get_weight(scale, detected_at):
+    if scale is None:
         return 0.25  # Default weight for testing when HX711 is disabled
-    readings = []
-    for _ in range(samples):
-        readings.append(hx.get_weight())  # Manual averaging for older library
-        time.sleep(0.05)  # Faster averaging
-    raw = sum(readings) / len(readings)
-    return raw / config.LOAD_SCALE  # Manual scaling
+    # Settled reading taken after the bean arrived (the scale lags the drop)
+    weight, settled = scale.wait_settled(after_ts=detected_at, timeout=1.0)
+    if not settled:
+        print(f"Weight not settled - using {weight:.2f}g")
+    return weight
 
 # Servo functions
 def set_servo_angle(angle):
@@ -140,6 +144,12 @@ except Exception as e:
 
 signal.alarm(0)  # Cancel alarm
 
+# Sample the load cell continuously; get_weight() only waits for it to settle
+scale = (LoadCellStream(lambda: hx.get_weight() / config.LOAD_SCALE, interval_s=0.05).start()
+         if hx else None)
+if scale:
+    scale.calibrate_tolerance()  # empty scale: settle tolerance from the noise
+
 # Counters for ThingSpeak
 good_count = 0
 bad_count = 0
@@ -161,15 +171,17 @@ try:
         while not bean_detected:
             if GPIO.input(config.IR_SENSOR) == GPIO.LOW:  # Active low
                 bean_detected = True
+                detected_at = time.time()
                 print("✓ Bean detected by IR!")
                 time.sleep(0.5)  # Debounce
             elif check_manual_input():
                 bean_detected = True
+                detected_at = time.time()
                 print("✓ Manual trigger!")
             time.sleep(0.1)
         
         # Read sensors
-        weight = get_weight(hx)
+        weight = get_weight(scale, detected_at)
         r, g, b = read_color()
         print(f"Weight: {weight:.2f}g | Color - R:{r} G:{g} B:{b}")
         
@@ -217,6 +229,8 @@ except KeyboardInterrupt:
     print("\nSorter stopped")
 
 finally:
+    if scale:
+        scale.stop()
     pwm.stop()
     set_leds()
     GPIO.cleanup()
@@ -1,76 +1,136 @@
 import streamlit as st
 import requests
+import json
 import time
 from collections import deque
 
 st.set_page_config(page_title="Coffee Sorter Dashboard", layout="centered")
 
 st.title("☕ Coffee Bean Sorter Dashboard")
-st.write("Real-time updates from sorter_service.py")
+st.write("Live updates pushed from sorter_service.py")
 
-# URL of sorter_service
-STATUS_URL = "http://localhost:5000/status"
+# URLs of sorter_service
+EVENTS_URL = "http://localhost:5000/events"
+SUMMARY_URL = "http://localhost:5000/results/summary?minutes=60"
+HISTORY_URL = "http://localhost:5000/history"
+SUMMARY_EVERY = 10     # seconds between summary refreshes
+HISTORY_ROWS = 50      # recent events shown in the table
 
-# Store last 50 events
-history = deque(maxlen=50)
+# Last HISTORY_ROWS events, newest first — seeded from the service's
+# history ring so a reload does not start from an empty table
+history = deque(maxlen=HISTORY_ROWS)
 
 placeholder = st.empty()
+summary = None
+last_summary = 0.0
+last_seq = 0           # resume point after a reconnect (SSE Last-Event-ID)
+
+
+def iter_events(url, last_id):
+    """Yield (seq, event_dict) from the service's server-sent event stream."""
+    headers = {"Accept": "text/event-stream"}
+    if last_id:
+        headers["Last-Event-ID"] = str(last_id)
+    with requests.get(url, headers=headers, stream=True, timeout=(2, 30)) as resp:
+        resp.raise_for_status()
+        seq, kind, data = None, "message", []
+        for line in resp.iter_lines(decode_unicode=True):
+            if line:
+                field, _, value = line.partition(":")
+                value = value.lstrip(" ")
+                if field == "id":
+                    seq = int(value)
+                elif field == "event":
+                    kind = value
+                elif field == "data":
+                    data.append(value)
+                continue
+            # Blank line = end of one event
+            if kind == "bean" and data:
+                yield seq, json.loads("\n".join(data))
+            elif kind == "gap":
+                st.warning(f"Missed {data[0]} beans while disconnected")
+            seq, kind, data = None, "message", []
+
+
+def remember(r):
+    history.appendleft({
+        "seq": r["seq"],
+        "time": r["timestamp"],
+        "prediction": r["prediction"],
+        "r": r["normalized"]["R"],
+        "g": r["normalized"]["G"],
+        "b": r["normalized"]["B"],
+        "raw_r": r["raw"]["R"],
+        "raw_g": r["raw"]["G"],
+        "raw_b": r["raw"]["B"]
+    })
+
+
+def load_history():
+    """Fill `history` with the service's most recent beans; returns the newest seq."""
+    head = requests.get(HISTORY_URL, params={"limit": 1}, timeout=2).json()["head"]
+    page = requests.get(HISTORY_URL, params={"since": max(head - HISTORY_ROWS, 0),
+                                             "limit": HISTORY_ROWS}, timeout=2).json()
+    history.clear()
+    for r in page["records"]:
+        remember(r)
+    return page["records"][-1] if page["records"] else None, head
+
+
+def render(r):
+    pred = r["prediction"]
+    rn, gn, bn = r["normalized"]["R"], r["normalized"]["G"], r["normalized"]["B"]
+    rawr, rawg, rawb = r["raw"]["R"], r["raw"]["G"], r["raw"]["B"]
+
+    with placeholder.container():
+        st.subheader(f"Latest Prediction: **{pred}**")
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("R (norm)", f"{rn:.3f}")
+        col2.metric("G (norm)", f"{gn:.3f}")
+        col3.metric("B (norm)", f"{bn:.3f}")
+
+        st.write("### Raw RGB Frequencies")
+        col4, col5, col6 = st.columns(3)
+        col4.metric("Raw R", f"{rawr:.1f}")
+        col5.metric("Raw G", f"{rawg:.1f}")
+        col6.metric("Raw B", f"{rawb:.1f}")
+
+        if summary:
+            st.write("### Last Hour")
+            col7, col8, col9 = st.columns(3)
+            col7.metric("Beans sorted", summary["total"])
+            col8.metric("Pass rate", f"{summary['pass_rate'] * 100:.1f}%")
+            col9.metric("Beans/min", f"{summary['beans_per_min']:.1f}")
+
+        st.write("### Recent Events")
+        st.dataframe(list(history))
+
+
+with placeholder.container():
+    st.warning("Waiting for sorter_service.py to process first bean…")
 
 while True:
     try:
-        # Query sorter service
-        r = requests.get(STATUS_URL, timeout=1).json()
-
-        # Only proceed if we have a valid prediction (not None or "WAITING")
-        if r.get("prediction") not in [None, "WAITING"]:
-            timestamp = r["timestamp"]
-            pred = r["prediction"]
-            
-            # Fixed: Access nested normalized values with uppercase keys
-            rn = r["normalized"]["R"]
-            gn = r["normalized"]["G"]
-            bn = r["normalized"]["B"]
-            
-            # Fixed: Access nested raw values with uppercase keys
-            rawr = r["raw"]["R"]
-            rawg = r["raw"]["G"]
-            rawb = r["raw"]["B"]
-
-            history.appendleft({
-                "time": timestamp,
-                "prediction": pred,
-                "r": rn,
-                "g": gn,
-                "b": bn,
-                "raw_r": rawr,
-                "raw_g": rawg,
-                "raw_b": rawb
-            })
-
-            with placeholder.container():
-                st.subheader(f"Latest Prediction: **{pred}**")
-
-                col1, col2, col3 = st.columns(3)
-                col1.metric("R (norm)", f"{rn:.3f}")
-                col2.metric("G (norm)", f"{gn:.3f}")
-                col3.metric("B (norm)", f"{bn:.3f}")
-
-                st.write("### Raw RGB Frequencies")
-                col4, col5, col6 = st.columns(3)
-                col4.metric("Raw R", f"{rawr:.1f}")
-                col5.metric("Raw G", f"{rawg:.1f}")
-                col6.metric("Raw B", f"{rawb:.1f}")
-
-                st.write("### Recent Events")
-                st.dataframe(list(history))
-        else:
-            # If no valid data yet, show waiting message
-            with placeholder.container():
-                st.warning("Waiting for sorter_service.py to process first bean…")
-
-        time.sleep(1)
+        if not last_seq:
+            latest, last_seq = load_history()
+            if latest:
+                render(latest)
+
+        # Every decision is pushed to us — no polling, no missed beans
+        for seq, event in iter_events(EVENTS_URL, last_seq):
+            last_seq = seq
+            remember(event)
+
+            # Aggregates come from the service's SQLite database, so they
+            # survive dashboard reloads
+            if time.time() - last_summary > SUMMARY_EVERY:
+                summary = requests.get(SUMMARY_URL, timeout=1).json()
+                last_summary = time.time()
+
+            render(event)
 
     except Exception as e:
-        # More specific error handling
         st.error(f"Error connecting to sorter_service.py: {str(e)}. Retrying...")
         time.sleep(2)
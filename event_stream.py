@@ -0,0 +1,75 @@
+"""
+event_stream.py — Push bean decisions from sorter_service.py to clients
+
+Each decision is published once with a monotonically increasing
+sequence number. Subscribers (the /events SSE endpoint) block until
+there is something newer than the last sequence they saw, so nothing
+is missed between polls. A short backlog lets a reconnecting client
+resume from its Last-Event-ID. Sequence numbers restart with the
+service, so an id newer than anything published means the client saw a
+previous run: it gets a `reset` event and the backlog from the start.
+"""
+
+import json
+import threading
+from collections import deque
+
+BACKLOG = 500       # events kept for clients that reconnect
+KEEPALIVE_S = 15.0  # comment line sent when idle so proxies keep the connection
+
+
+class EventBroadcaster:
+    """Single producer (sorting thread), many waiting readers."""
+
+    def __init__(self, backlog=BACKLOG):
+        self._events = deque(maxlen=backlog)     # (seq, json_text)
+        self._cond = threading.Condition()
+        self.seq = 0
+
+    def publish(self, event: dict) -> int:
+        with self._cond:
+            self.seq += 1
+            event = dict(event, seq=self.seq)
+            self._events.append((self.seq, json.dumps(event)))
+            self._cond.notify_all()
+            return self.seq
+
+    def oldest(self) -> int:
+        """Sequence number of the oldest event still in the backlog (0 if none)."""
+        with self._cond:
+            return self._events[0][0] if self._events else 0
+
+    def since(self, seq: int, timeout: float | None = None) -> list:
+        """Events newer than `seq`; waits up to `timeout` s if there are none yet."""
+        with self._cond:
+            if self.seq <= seq and timeout:
+                self._cond.wait_for(lambda: self.seq > seq, timeout)
+            return [e for e in self._events if e[0] > seq]
+
+
+def parse_seq(value) -> int:
+    """Last-Event-ID / ?since= value as a sequence number; 0 if missing or malformed."""
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def sse_stream(broadcaster: EventBroadcaster, last_seq: int = 0):
+    """Generator of text/event-stream chunks starting after `last_seq`."""
+    # Client resuming from before a service restart — its ids are void
+    if last_seq > broadcaster.seq:
+        yield f"event: reset\ndata: {broadcaster.seq}\n\n"
+        last_seq = 0
+    # Client resuming from an id older than the backlog — tell it what was lost
+    oldest = broadcaster.oldest()
+    if last_seq and oldest and oldest > last_seq + 1:
+        yield f"event: gap\ndata: {oldest - last_seq - 1}\n\n"
+    while True:
+        events = broadcaster.since(last_seq, timeout=KEEPALIVE_S)
+        if not events:
+            yield ": keepalive\n\n"
+            continue
+        for seq, payload in events:
+            yield f"id: {seq}\nevent: bean\ndata: {payload}\n\n"
+            last_seq = seq
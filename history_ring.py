@@ -0,0 +1,77 @@
+"""
+history_ring.py — Fixed-size in-memory history of recent beans
+
+Records live in one preallocated NumPy structured array (no per-bean
+dicts). The sorting thread is the only writer: it fills the slot for
+the next sequence number and then advances `head`. Readers never lock.
+Each slot works as a seqlock: the writer zeroes the slot's sequence number
+before rewriting it and stores the new one last. A reader copies the
+slots, then re-reads their sequence numbers from the live buffer and
+keeps a record only if both the copy and the re-read show the sequence
+number it asked for. Anything else was torn or lapped by the writer.
+"""
+
+import numpy as np
+
+CAPACITY = 4096
+
+RECORD = np.dtype([
+    ("seq",    np.uint64),
+    ("ts",     np.float64),
+    ("raw_r",  np.float32), ("raw_g",  np.float32), ("raw_b",  np.float32),
+    ("norm_r", np.float32), ("norm_g", np.float32), ("norm_b", np.float32),
+    ("label",  np.uint8),
+])
+
+
+class HistoryRing:
+    """Single-writer, lock-free-reader ring of compact bean records."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=RECORD)
+        self._labels = []           # label code → prediction string
+        self._codes = {}
+        self.head = 0               # sequence number of the newest record
+
+    def _code(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self._labels)
+            self._labels.append(label)
+        return code
+
+    def append(self, seq, ts, raw, norm, prediction):
+        """Writer side (sorting thread only). `seq` must increase by one each call."""
+        slot = self._buf[seq % self.capacity]
+        slot["seq"] = 0             # mark the slot as being rewritten
+        slot["ts"] = ts
+        slot["raw_r"], slot["raw_g"], slot["raw_b"] = raw["R"], raw["G"], raw["B"]
+        slot["norm_r"], slot["norm_g"], slot["norm_b"] = norm["R"], norm["G"], norm["B"]
+        slot["label"] = self._code(str(prediction))
+        slot["seq"] = seq
+        self.head = seq             # publish (a single reference assignment)
+
+    def since(self, seq, limit=100):
+        """Up to `limit` records with sequence > `seq`, oldest first."""
+        head = self.head
+        first = max(seq + 1, head - self.capacity + 1, 1)
+        last = min(head, first + limit - 1)
+        if last < first:
+            return []
+        idx = np.arange(first, last + 1) % self.capacity
+        wanted = np.arange(first, last + 1, dtype=np.uint64)
+        recs = self._buf[idx]               # fancy indexing copies the slots
+        after = self._buf["seq"][idx]       # re-read: was a slot rewritten since?
+        recs = recs[(recs["seq"] == wanted) & (after == wanted)]
+        labels = self._labels
+        return [{
+            "seq"        : int(r["seq"]),
+            "timestamp"  : float(r["ts"]),
+            "raw"        : {"R": float(r["raw_r"]), "G": float(r["raw_g"]), "B": float(r["raw_b"])},
+            "normalized" : {"R": float(r["norm_r"]), "G": float(r["norm_g"]), "B": float(r["norm_b"])},
+            "prediction" : labels[r["label"]],
+        } for r in recs]
+
+    def oldest(self):
+        return max(self.head - self.capacity + 1, 1) if self.head else 0
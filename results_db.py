@@ -0,0 +1,150 @@
+"""
+results_db.py — SQLite results database for sorter_service.py
+
+Every bean the service sorts is stored as one row, so history survives
+restarts and dashboard reloads.
+
+  - WAL mode: the dashboard can read while the sorter writes
+  - the sorting thread only appends to a list; a writer thread commits
+    rows in batches (one transaction per BATCH_SIZE rows / BATCH_INTERVAL s)
+  - indexes on timestamp, session and prediction keep time-range
+    aggregates fast with millions of rows; the aggregates are computed
+    in SQL rather than by loading rows into Python
+"""
+
+import time
+import sqlite3
+import threading
+
+DB_PATH         = "sorter_results.db"
+BATCH_SIZE      = 20
+BATCH_INTERVAL  = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS beans (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL NOT NULL,
+    session     TEXT NOT NULL,
+    raw_r       REAL, raw_g  REAL, raw_b  REAL,
+    norm_r      REAL, norm_g REAL, norm_b REAL,
+    prediction  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_beans_ts         ON beans(ts);
+CREATE INDEX IF NOT EXISTS idx_beans_session_ts ON beans(session, ts);
+CREATE INDEX IF NOT EXISTS idx_beans_prediction ON beans(prediction, ts);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ResultsDB:
+    """Batched writer plus SQL aggregate queries over the beans table."""
+
+    def __init__(self, path=None, batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL):
+        path = path or DB_PATH          # looked up now, so tools can redirect DB_PATH
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._local = threading.local()     # one read connection per Flask thread
+        self._pending = []
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ResultsDB", daemon=True)
+        self._thread.start()
+
+    # ── Writing (sorting thread) ───────────────────────────────────────────────
+
+    def record(self, session, raw, norm, prediction, ts=None):
+        row = (time.time() if ts is None else ts, session,
+               raw["R"], raw["G"], raw["B"],
+               norm["R"], norm["G"], norm["B"], prediction)
+        with self._cond:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        conn = _connect(self.path)
+        while True:
+            with self._cond:
+                if self._running and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.batch_interval)
+                rows, self._pending = self._pending, []
+                running = self._running
+            if rows:
+                with conn:              # one transaction per batch
+                    conn.executemany(
+                        "INSERT INTO beans (ts, session, raw_r, raw_g, raw_b, "
+                        "norm_r, norm_g, norm_b, prediction) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            if not running:
+                conn.close()
+                return
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=5.0)
+
+    # ── Queries (Flask threads) ────────────────────────────────────────────────
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    @staticmethod
+    def _where(start, end, session):
+        clauses, args = ["ts >= ?", "ts < ?"], [start, end]
+        if session:
+            clauses.append("session = ?")
+            args.append(session)
+        return " AND ".join(clauses), args
+
+    def summary(self, start, end, session=None):
+        """Counts, pass rate and throughput between two unix times."""
+        where, args = self._where(start, end, session)
+        total, good, first, last = self._reader().execute(
+            f"SELECT COUNT(*), "
+            f"       COALESCE(SUM(prediction = 'GOOD'), 0), MIN(ts), MAX(ts) "
+            f"FROM beans WHERE {where}", args).fetchone()
+        span = (last - first) if total > 1 else 0.0
+        return {
+            "start"         : start,
+            "end"           : end,
+            "session"       : session,
+            "total"         : total,
+            "good"          : good,
+            "bad"           : total - good,
+            "pass_rate"     : good / total if total else 0.0,
+            "beans_per_min" : total / (span / 60) if span > 0 else 0.0,
+        }
+
+    def per_minute(self, start, end, session=None):
+        """Beans and good beans per wall-clock minute, oldest first."""
+        where, args = self._where(start, end, session)
+        rows = self._reader().execute(
+            f"SELECT CAST(ts / 60 AS INTEGER) * 60 AS minute, COUNT(*), "
+            f"       SUM(prediction = 'GOOD') "
+            f"FROM beans WHERE {where} GROUP BY minute ORDER BY minute", args).fetchall()
+        return [{"minute": m, "total": n, "good": g,
+                 "pass_rate": g / n if n else 0.0} for m, n, g in rows]
+
+    def sessions(self):
+        rows = self._reader().execute(
+            "SELECT session, COUNT(*), MIN(ts), MAX(ts) FROM beans GROUP BY session "
+            "ORDER BY MIN(ts)").fetchall()
+        return [{"session": s, "total": n, "first_ts": a, "last_ts": b}
+                for s, n, a, b in rows]
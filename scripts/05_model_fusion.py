@@ -206,6 +206,13 @@ print(f"\n  ✓ All {len(X_test)} beans processed")
 print(f"\n  Average DT  confidence (good): {dt_probs.mean()*100:.1f}%")
 print(f"  Average CNN confidence (good): {cnn_probs.mean()*100:.1f}%")
 
+# Cache the probability vectors so fusion_optimiser.py can search
+# weights/thresholds without re-running both models
+os.makedirs("data", exist_ok=True)
+np.savez("data/fusion_probs.npz",
+         dt_probs=dt_probs, cnn_probs=cnn_probs, y_true=y_test)
+print(f"  ✓ Cached probabilities: data/fusion_probs.npz")
+
 # Apply the 3 fusion strategies
 # Strategy 1: AND Rule — both must predict good (prob >= 0.5)
 y_pred_and = ((dt_probs >= 0.5) & (cnn_probs >= 0.5)).astype(int)
@@ -432,11 +439,26 @@ fusion_config = {
     }
 }
 
+# Merge into the existing file so an operating point tuned by
+# scripts/fusion_optimiser.py survives re-running this step
+FUSION_CONFIG_FILE = "models/fusion_config.json"
+TUNED_KEYS = ("best_strategy", "dt_weight", "cnn_weight", "threshold")
+if os.path.exists(FUSION_CONFIG_FILE):
+    with open(FUSION_CONFIG_FILE) as f:
+        existing = json.load(f)
+    if "operating_points" in existing:
+        for key in TUNED_KEYS:
+            if key in existing:
+                fusion_config[key] = existing[key]
+        print("  ✓ Kept tuned weights/threshold from fusion_optimiser.py")
+    existing.update(fusion_config)
+    fusion_config = existing
+
 os.makedirs("models", exist_ok=True)
-with open("models/fusion_config.json", "w") as f:
+with open(FUSION_CONFIG_FILE, "w") as f:
     json.dump(fusion_config, f, indent=2)
 
-print(f"\n  ✓ Saved: models/fusion_config.json")
+print(f"\n  ✓ Saved: {FUSION_CONFIG_FILE}")
 print(f"\n  Config contents:")
 print(json.dumps(fusion_config, indent=4))
 
@@ -535,6 +557,10 @@ print(f"""
     models/scaler.pkl
     models/fusion_config.json
 
+  NEXT (optional):
+    python scripts/fusion_optimiser.py  — tune weights/threshold
+    for a target false pass rate from data/fusion_probs.npz
+
   READY FOR:
     Step 6 — Deploy to Raspberry Pi
     (copy models/ folder to Pi and run sorter_main.py)
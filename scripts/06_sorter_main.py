@@ -13,15 +13,18 @@ HOW TO INSTALL ON RASPBERRY PI:
      pip install numpy pillow opencv-python tflite-runtime joblib
      pip install RPi.GPIO hx711-rpi-py picamera2
 
-  3. Copy this script to the Pi:
-     scp scripts/06_sorter_main.py pi@raspberrypi.local:/home/pi/coffee_sorter/
+  3. Copy the scripts/ folder to the Pi (this script imports its
+     helper modules — load_cell, acquisition, metrics, … — from there):
+     scp -r scripts/ pi@raspberrypi.local:/home/pi/coffee_sorter/
 
-  4. Run on the Pi:
-     python /home/pi/coffee_sorter/06_sorter_main.py
+  4. Run on the Pi (from the folder holding models/):
+     cd /home/pi/coffee_sorter && python scripts/06_sorter_main.py
 
 WHAT THIS SCRIPT DOES:
   - Initialises all hardware (camera, TCS3200, HX711, servo, LED)
   - Runs the main sorting loop continuously
+  - Polls a cheap presence check (IR or one clear-filter read) so an
+    empty belt never triggers the full sensor cycle
   - For each bean: captures image + reads sensors simultaneously
   - Runs Decision Tree + CNN fusion to classify the bean
   - Triggers servo to divert defective beans
@@ -33,12 +36,16 @@ WHAT THIS SCRIPT DOES:
 
 import os
 import sys
-import csv
 import json
 import time
 import logging
 import numpy as np
-from datetime import datetime
+from metrics import REGISTRY, serve_http
+from span_trace import SpanTracer
+from profiler_hook import ProfilerHook
+from realtime import RealtimeMode
+from load_cell import LoadCellStream
+from acquisition import AcquisitionCoordinator
 
 # ================================================================
 # LOGGING SETUP
@@ -73,13 +80,27 @@ CONFIG = {
 
     # ── Sensor Settings ───────────────────────────────────────
     "HX711_SCALE_RATIO" : 102,    # Calibration value — adjust for your load cell
-    "WEIGHT_SAMPLES"    : 5,      # Number of weight readings to average
+    "WEIGHT_SAMPLES"    : 5,      # Readings in the load cell's moving average
+    "WEIGHT_SETTLE_TOL_G": None,  # grams; None = measure HX711 noise at startup
+    "WEIGHT_SETTLE_TIMEOUT": 1.0, # max wait for a settled weight per bean (s)
     "COLOR_SAMPLES"     : 30,     # Number of TCS3200 pulses to count
 
+    # ── Presence Detection (checked before the full sensor cycle) ──
+    "PRESENCE_SENSOR"   : "clear",  # "ir", "clear" (TCS3200 no-filter read) or "weight"
+    "IR_PIN"            : None,     # IR sensor pin when PRESENCE_SENSOR = "ir" (None = ir_sensor.IR_PIN)
+    "PRESENCE_EDGES"    : 10,       # TCS3200 pulses per clear read
+    "PRESENCE_EDGE_TIMEOUT_MS": 50, # no TCS3200 pulse for this long = no reading
+    "PRESENCE_THRESHOLD": 0.15,     # clear-frequency change vs empty belt = bean
+    "PRESENCE_MIN_WEIGHT": 0.05,    # grams, when PRESENCE_SENSOR = "weight"
+    "PRESENCE_IDLE_S"   : 0.05,     # pause between checks while the belt is empty
+
     # ── Servo Settings ────────────────────────────────────────
     "SERVO_PASS_ANGLE"  : 0,      # Degrees — gate open (bean passes)
     "SERVO_REJECT_ANGLE": 90,     # Degrees — gate closed (bean diverted)
     "SERVO_DELAY"       : 0.3,    # Seconds to hold position
+    "GATE_SCHEDULED"    : False,  # True = actuate at arrival + GATE_DELAY_S on the
+                                  # GateScheduler thread (bean_tracker.py), not inline
+    "GATE_DELAY_S"      : 1.0,    # Seconds from bean detection to reaching the gate
 
     # ── Belt Settings ─────────────────────────────────────────
     "BELT_SPEED_PCT"    : 40,     # Belt speed 0-100% (lower = more time per bean)
@@ -89,6 +110,8 @@ CONFIG = {
     "CAMERA_WARMUP"     : 2,      # Seconds for camera to initialise
 
     # ── ML Model Settings ─────────────────────────────────────
+    # Fallbacks only — overridden at startup by FUSION_CONFIG_PATH
+    # (written by 05_model_fusion.py / fusion_optimiser.py)
     "DT_WEIGHT"         : 0.65,   # Decision Tree contribution to fusion
     "CNN_WEIGHT"        : 0.35,   # CNN contribution to fusion
     "FUSION_THRESHOLD"  : 0.5,    # Score >= this = GOOD bean
@@ -99,12 +122,53 @@ CONFIG = {
     "SCALER_PATH"       : "models/scaler.pkl",
     "FUSION_CONFIG_PATH": "models/fusion_config.json",
     "LOG_CSV_PATH"      : "data/sorting_results.csv",
+    "SESSION_STORE_DIR" : "data/sessions",   # columnar per-bean records (session_store.py)
+    "METRICS_PORT"      : 9100,   # Prometheus /metrics (None = disabled)
+    "TRACE_DIR"         : "data/traces",   # per-bean stage spans (Chrome trace JSON)
+    "REALTIME_MODE"     : False,  # pin sorting loop to a core, raise priority, hold off GC
+    "REALTIME_CPU"      : 3,
 }
 
+# ================================================================
+# METRICS — per-stage latency histograms (served on METRICS_PORT)
+# ================================================================
+STAGE_SECONDS = REGISTRY.histogram(
+    "sorter_stage_seconds", "Time spent in each sorting stage", ("stage",))
+M_SENSOR = {c: STAGE_SECONDS.labels(f"sensor_{c}") for c in ("red", "green", "blue", "weight")}
+M_CAPTURE    = STAGE_SECONDS.labels("capture")
+M_PREPROCESS = STAGE_SECONDS.labels("preprocess")
+M_DT         = STAGE_SECONDS.labels("dt")
+M_CNN        = STAGE_SECONDS.labels("cnn")
+M_ACTUATION  = STAGE_SECONDS.labels("actuation")
+M_LOGGING    = STAGE_SECONDS.labels("logging")
+M_BEANS      = REGISTRY.counter("sorter_beans_total", "Beans sorted", ("decision",))
+M_ERRORS     = REGISTRY.counter("sorter_errors_total", "Beans skipped after an error")
+M_BELT       = REGISTRY.gauge("sorter_belt_running", "1 while the conveyor belt runs")
+
+# Timed sleeps go through REALTIME so their wake-up jitter is always measured
+REALTIME = RealtimeMode(CONFIG["REALTIME_MODE"], CONFIG["REALTIME_CPU"])
+
 
 # ================================================================
 # SECTION 1 — LOAD ML MODELS
 # ================================================================
+def load_fusion_config():
+    """
+    Load fusion_config.json and apply its weights/threshold to CONFIG.
+    Keys missing from the file keep the CONFIG fallback values.
+    """
+    with open(CONFIG["FUSION_CONFIG_PATH"]) as f:
+        fusion_cfg = json.load(f)
+
+    CONFIG["DT_WEIGHT"]        = float(fusion_cfg.get("dt_weight",  CONFIG["DT_WEIGHT"]))
+    CONFIG["CNN_WEIGHT"]       = float(fusion_cfg.get("cnn_weight", CONFIG["CNN_WEIGHT"]))
+    CONFIG["FUSION_THRESHOLD"] = float(fusion_cfg.get("threshold",  CONFIG["FUSION_THRESHOLD"]))
+    log.info(f"  ✓ Fusion weights: DT={CONFIG['DT_WEIGHT']:.2f} "
+             f"CNN={CONFIG['CNN_WEIGHT']:.2f} "
+             f"threshold={CONFIG['FUSION_THRESHOLD']:.2f}")
+    return fusion_cfg
+
+
 def load_models():
     """Load all ML models and return them."""
     log.info("Loading ML models...")
@@ -118,8 +182,7 @@ def load_models():
     log.info(f"  ✓ Decision Tree loaded (depth={dt_model.get_depth()})")
 
     # Load fusion config
-    with open(CONFIG["FUSION_CONFIG_PATH"]) as f:
-        fusion_cfg = json.load(f)
+    fusion_cfg = load_fusion_config()
     log.info(f"  ✓ Fusion config loaded (strategy: {fusion_cfg['best_strategy']})")
 
     # Load CNN TFLite
@@ -195,7 +258,7 @@ def read_colour_channel(GPIO, s2_val, s3_val):
     """Read one RGB channel from TCS3200."""
     GPIO.output(CONFIG["S2"], s2_val)
     GPIO.output(CONFIG["S3"], s3_val)
-    time.sleep(0.05)
+    REALTIME.sleep(0.05)
     count = 0
     start = time.time()
     while count < CONFIG["COLOR_SAMPLES"]:
@@ -205,39 +268,125 @@ def read_colour_channel(GPIO, s2_val, s3_val):
     return int(count / elapsed)
 
 
-def read_all_sensors(GPIO, hx):
-    """
-    Read weight + RGB colour simultaneously.
-    Returns: (weight_g, red, green, blue)
-    """
-    # Turn on LED ring for consistent lighting
-    GPIO.output(CONFIG["LED_PIN"], GPIO.HIGH)
-    time.sleep(0.05)
-
-    # Read colour channels
+def read_colour(GPIO):
+    """Read R, G, B from the TCS3200 (LED ring must already be on)."""
+    t0 = time.perf_counter()
     r = read_colour_channel(GPIO, GPIO.LOW,  GPIO.LOW)    # Red
+    t1 = time.perf_counter()
     g = read_colour_channel(GPIO, GPIO.HIGH, GPIO.HIGH)   # Green
+    t2 = time.perf_counter()
     b = read_colour_channel(GPIO, GPIO.LOW,  GPIO.HIGH)   # Blue
+    t3 = time.perf_counter()
+    M_SENSOR["red"].observe(t1 - t0)
+    M_SENSOR["green"].observe(t2 - t1)
+    M_SENSOR["blue"].observe(t3 - t2)
+    return r, g, b
 
-    GPIO.output(CONFIG["LED_PIN"], GPIO.LOW)
 
-    # Read weight (average of multiple readings for stability)
-    readings = [hx.get_weight_mean(readings=CONFIG["WEIGHT_SAMPLES"])
-                for _ in range(3)]
-    weight = round(sum(readings) / len(readings), 3)
+def read_clear(GPIO):
+    """
+    One short clear-filter (no colour filter) TCS3200 read, in Hz.
+    Returns None if the sensor stops pulsing (PRESENCE_EDGE_TIMEOUT_MS).
+    """
+    GPIO.output(CONFIG["S2"], GPIO.HIGH)
+    GPIO.output(CONFIG["S3"], GPIO.LOW)
+    timeout = CONFIG["PRESENCE_EDGE_TIMEOUT_MS"]
+    # first edge after the switch starts the count
+    if GPIO.wait_for_edge(CONFIG["OUT"], GPIO.FALLING, timeout=timeout) is None:
+        return None
+    start = time.perf_counter()
+    for _ in range(CONFIG["PRESENCE_EDGES"]):
+        if GPIO.wait_for_edge(CONFIG["OUT"], GPIO.FALLING, timeout=timeout) is None:
+            return None
+    return CONFIG["PRESENCE_EDGES"] / (time.perf_counter() - start)
+
+
+def make_presence_check(GPIO, scale):
+    """
+    Return a no-argument function that is True while a bean is under
+    the sensors. It is called every loop, so it uses the cheapest
+    signal PRESENCE_SENSOR allows:
+      "ir"     — the IR sensor's debounced state (no event queue)
+      "clear"  — one short clear-filter read compared with the empty-belt
+                 level learned here (belt must be empty at startup);
+                 a read that times out counts as no bean
+      "weight" — the load cell thread's latest filtered weight
+    """
+    mode = CONFIG["PRESENCE_SENSOR"]
+    if mode == "ir":
+        from ir_sensor import IRSensor, IR_PIN
+        ir = IRSensor(pin=CONFIG["IR_PIN"] or IR_PIN, publish_events=False)
+        return ir.is_bean_present
+    if mode == "clear":
+        levels = [hz for hz in (read_clear(GPIO) for _ in range(5)) if hz is not None]
+        if not levels:
+            raise RuntimeError("TCS3200 clear channel gives no pulses — check OUT wiring")
+        baseline = float(np.median(levels))
+        log.info(f"  ✓ Presence: clear channel {baseline:.0f} Hz on empty belt")
+
+        def clear_changed():
+            hz = read_clear(GPIO)
+            return hz is not None and abs(hz - baseline) / baseline > CONFIG["PRESENCE_THRESHOLD"]
+        return clear_changed
+    if mode == "weight":
+        return lambda: read_weight(scale) >= CONFIG["PRESENCE_MIN_WEIGHT"]
+    raise ValueError(f"Unknown PRESENCE_SENSOR: {mode}")
+
+
+def read_weight(scale, after_ts=None):
+    """
+    Filtered weight from the load cell thread. With `after_ts` (bean
+    arrival time) wait — up to WEIGHT_SETTLE_TIMEOUT — for a settled
+    reading taken after it, so the bean is not under-weighed while the
+    scale is still rising; without it, the latest value at once.
+    """
+    t0 = time.perf_counter()
+    if after_ts is None:
+        weight = scale.current_weight()
+    else:
+        weight, settled = scale.wait_settled(after_ts, CONFIG["WEIGHT_SETTLE_TIMEOUT"])
+        if not settled:
+            log.warning(f"Weight not settled after {CONFIG['WEIGHT_SETTLE_TIMEOUT']}s "
+                        f"— using {weight:.3f} g")
+    M_SENSOR["weight"].observe_since(t0)
+    return weight
 
-    return weight, r, g, b
+
+def read_all_sensors(GPIO, acquire):
+    """
+    Read colour, image and weight at once under the LED ring.
+    `acquire` is the AcquisitionCoordinator built in main(); the LED
+    is switched off again even if a read fails.
+    Returns: the coordinator's bundle (colour, image, weight, spans …)
+    """
+    # Turn on LED ring for consistent lighting
+    GPIO.output(CONFIG["LED_PIN"], GPIO.HIGH)
+    try:
+        time.sleep(0.05)
+        return acquire.acquire()
+    finally:
+        GPIO.output(CONFIG["LED_PIN"], GPIO.LOW)
 
 
 # ================================================================
 # SECTION 4 — CAMERA CAPTURE
 # ================================================================
-def capture_bean_image(cam):
+def capture_bean_image(cam, segmenter=None):
     """
     Capture image of bean under LED ring lighting.
+    If a segmenter is given, only the tight crop around the bean is used.
     Returns: numpy array shape (224, 224, 3) normalised 0.0-1.0
     """
+    t0 = time.perf_counter()
     img_array = cam.capture_array()
+    M_CAPTURE.observe_since(t0)
+
+    # Crop to the bean so the CNN does not see belt background
+    t0 = time.perf_counter()
+    if segmenter is not None:
+        seg = segmenter.segment(img_array)
+        if seg:
+            img_array = segmenter.crop(img_array, seg)
 
     # Resize to 224x224 if needed
     from PIL import Image
@@ -246,7 +395,9 @@ def capture_bean_image(cam):
                      Image.LANCZOS)
 
     # Normalise to 0.0-1.0
-    return np.array(img) / 255.0
+    img = np.array(img) / 255.0
+    M_PREPROCESS.observe_since(t0)
+    return img
 
 
 # ================================================================
@@ -264,18 +415,22 @@ def predict_bean(sensor_data, image_array,
       cnn_prob     : CNN confidence (good)
     """
     # ── Decision Tree prediction ──────────────────────────────
+    t0 = time.perf_counter()
     weight, r, g, b = sensor_data
     raw    = np.array([[weight, r, g, b]])
     scaled = scaler.transform(raw)
     dt_prob = dt_model.predict_proba(scaled)[0][1]   # prob of good
+    M_DT.observe_since(t0)
 
     # ── CNN prediction ────────────────────────────────────────
+    t0 = time.perf_counter()
     img_input = np.expand_dims(image_array, axis=0).astype(np.float32)
     interpreter.set_tensor(input_details[0]["index"], img_input)
     interpreter.invoke()
     cnn_prob = float(
         interpreter.get_tensor(output_details[0]["index"])[0][0]
     )
+    M_CNN.observe_since(t0)
 
     # ── Weighted fusion ───────────────────────────────────────
     fusion_score = (CONFIG["DT_WEIGHT"]  * dt_prob +
@@ -302,41 +457,40 @@ def trigger_sort(servo_pwm, decision):
     GOOD  → gate stays open  (bean passes to good bin)
     BAD   → gate closes briefly (bean diverted to reject bin)
     """
+    t0 = time.perf_counter()
     if decision == "BAD":
         set_servo_angle(servo_pwm, CONFIG["SERVO_REJECT_ANGLE"])
-        time.sleep(CONFIG["SERVO_DELAY"])
+        REALTIME.sleep(CONFIG["SERVO_DELAY"])
         set_servo_angle(servo_pwm, CONFIG["SERVO_PASS_ANGLE"])
     # GOOD: do nothing, gate stays open
+    M_ACTUATION.observe_since(t0)
 
 
 # ================================================================
 # SECTION 7 — CSV LOGGING
 # ================================================================
 def init_csv_log():
-    """Create CSV log file with headers if it doesn't exist."""
-    os.makedirs("data", exist_ok=True)
-    file_exists = os.path.isfile(CONFIG["LOG_CSV_PATH"])
-    with open(CONFIG["LOG_CSV_PATH"], "a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow([
-                "timestamp", "bean_id", "weight_g",
-                "red", "green", "blue",
-                "dt_prob", "cnn_prob", "fusion_score", "decision"
-            ])
-
-
-def log_result(bean_id, weight, r, g, b,
+    """
+    Open the CSV result log (headers written if new).
+    Returns a ResultWriter — rows are buffered and written on a
+    background thread, so logging costs almost nothing per bean.
+    """
+    from result_writer import ResultWriter
+    return ResultWriter(CONFIG["LOG_CSV_PATH"], [
+        "timestamp", "bean_id", "weight_g",
+        "red", "green", "blue",
+        "dt_prob", "cnn_prob", "fusion_score", "decision"
+    ])
+
+
+def log_result(results, bean_id, weight, r, g, b,
                dt_prob, cnn_prob, fusion_score, decision):
-    """Append one bean result to the CSV log."""
-    with open(CONFIG["LOG_CSV_PATH"], "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            bean_id, weight, r, g, b,
-            round(dt_prob, 4), round(cnn_prob, 4),
-            round(fusion_score, 4), decision
-        ])
+    """Queue one bean result for the CSV log."""
+    t0 = time.perf_counter()
+    results.write(bean_id, weight, r, g, b,
+                  round(dt_prob, 4), round(cnn_prob, 4),
+                  round(fusion_score, 4), decision)
+    M_LOGGING.observe_since(t0)
 
 
 # ================================================================
@@ -368,6 +522,7 @@ def start_belt(motor_pwm, GPIO):
     GPIO.output(CONFIG["DC_MOTOR_IN1"], GPIO.HIGH)
     GPIO.output(CONFIG["DC_MOTOR_IN2"], GPIO.LOW)
     motor_pwm.ChangeDutyCycle(CONFIG["BELT_SPEED_PCT"])
+    M_BELT.set(1)
     log.info(f"  Belt started at {CONFIG['BELT_SPEED_PCT']}% speed")
 
 
@@ -376,12 +531,18 @@ def stop_belt(motor_pwm, GPIO):
     motor_pwm.ChangeDutyCycle(0)
     GPIO.output(CONFIG["DC_MOTOR_IN1"], GPIO.LOW)
     GPIO.output(CONFIG["DC_MOTOR_IN2"], GPIO.LOW)
+    M_BELT.set(0)
     log.info("  Belt stopped")
 
 
 # ================================================================
 # SECTION 10 — MAIN SORTING LOOP
 # ================================================================
+def _span_ms(span):
+    start_ns, end_ns = span
+    return (end_ns - start_ns) / 1e6
+
+
 def main():
     """Main entry point — runs the full sorting system."""
     print("\n" + "="*55)
@@ -407,8 +568,68 @@ def main():
         log.error("Check GPIO connections and run: gpio readall")
         sys.exit(1)
 
+    # ── Load cell sampling thread ─────────────────────────────
+    scale = LoadCellStream(lambda: hx.get_weight_mean(readings=1),
+                           window=CONFIG["WEIGHT_SAMPLES"]).start()
+    if CONFIG["WEIGHT_SETTLE_TOL_G"]:
+        scale.settle_tolerance_g = CONFIG["WEIGHT_SETTLE_TOL_G"]
+    else:
+        scale.calibrate_tolerance()         # scale must be empty at startup
+
     # ── Prepare CSV log ───────────────────────────────────────
-    init_csv_log()
+    from result_writer import install_sigterm_handler
+    results = init_csv_log()
+    install_sigterm_handler()       # SIGTERM → normal shutdown, rows flushed
+
+    from session_store import SessionStore
+    session = SessionStore(CONFIG["SESSION_STORE_DIR"]).writer(
+        time.strftime("%Y%m%d_%H%M%S"))
+
+    # ── Bean segmentation (learn empty belt) ──────────────────
+    from bean_segmenter import BeanSegmenter
+    segmenter = BeanSegmenter()
+    segmenter.learn_background([cam.capture_array() for _ in range(5)])
+
+    # ── Metrics endpoint ──────────────────────────────────────
+    if CONFIG["METRICS_PORT"]:
+        serve_http(REGISTRY, CONFIG["METRICS_PORT"])
+        log.info(f"  Metrics at http://<pi>:{CONFIG['METRICS_PORT']}/metrics")
+
+    # ── Presence stage: cheap check that gates the full sensor cycle ──
+    bean_present = make_presence_check(GPIO, scale)
+
+    # ── Concurrent acquisition: colour (this thread), image, weight ──
+    # Built before REALTIME.enter() so its workers start at normal priority
+    arrived = {"ts": 0.0, "mono": 0.0}  # when the current bean was detected
+    acquire = AcquisitionCoordinator({
+        "colour": lambda: read_colour(GPIO),
+        "image" : lambda: capture_bean_image(cam, segmenter),
+        "weight": lambda: read_weight(scale, after_ts=arrived["ts"]),
+    }, inline="colour")
+
+    # ── Gate timing (opt-in): servo fired when the bean reaches it ──
+    # Started before REALTIME.enter() for the same reason as above
+    gate = None
+    if CONFIG["GATE_SCHEDULED"]:
+        from bean_tracker import GateScheduler
+        gate = GateScheduler(lambda decision, _: trigger_sort(servo_pwm, decision))
+        gate.start()
+
+    # ── Per-bean stage tracing ────────────────────────────────
+    tracer    = SpanTracer()
+    S_SENSORS = tracer.stage("read_colour")
+    S_CAPTURE = tracer.stage("capture_bean_image")
+    S_PREDICT = tracer.stage("predict_bean")
+    S_SORT    = tracer.stage("trigger_sort")
+    S_LOG     = tracer.stage("log_result")
+    S_BEAN    = tracer.stage("bean_total")
+
+    # ── On-demand profiling: kill -USR1 <pid> → next 20 beans ──
+    profiler = ProfilerHook(time.strftime("%Y%m%d_%H%M%S"))
+    profiler.install_signal()
+
+    # ── Real-time mode (opt-in) — applies to this, the sorting thread ──
+    REALTIME.enter()
 
     # ── Startup stats ─────────────────────────────────────────
     total_sorted  = 0
@@ -418,7 +639,8 @@ def main():
     bean_id       = 1
 
     print(f"\n  System ready! Starting conveyor belt...")
-    print(f"  Press Ctrl+C to stop sorting session.\n")
+    print(f"  Press Ctrl+C to stop sorting session.")
+    print(f"  Profile the next 20 beans: kill -USR1 {os.getpid()}\n")
 
     # ── Start conveyor belt ───────────────────────────────────
     start_belt(motor_pwm, GPIO)
@@ -429,56 +651,96 @@ def main():
             try:
                 bean_label = f"bean_{bean_id:05d}"
 
-                # Step 1: Read sensors
-                weight, r, g, b = read_all_sensors(GPIO, hx)
-
-                # Skip if no bean detected (weight too low)
-                if weight < 0.05:
-                    time.sleep(0.1)
+                # Step 1: Cheap presence check — an empty belt costs one
+                # IR/clear read per PRESENCE_IDLE_S, no LED or full cycle
+                if not bean_present():
+                    time.sleep(CONFIG["PRESENCE_IDLE_S"])
                     continue
-
-                # Step 2: Capture image
-                image = capture_bean_image(cam)
-
-                # Step 3: Run fusion prediction
-                decision, fusion_score, dt_prob, cnn_prob = predict_bean(
-                    (weight, r, g, b), image,
-                    dt_model, scaler,
-                    interpreter, input_details, output_details
-                )
-
-                # Step 4: Trigger servo
-                trigger_sort(servo_pwm, decision)
-
-                # Step 5: Log result
-                log_result(bean_label, weight, r, g, b,
-                           dt_prob, cnn_prob, fusion_score, decision)
-
-                # Step 6: Update stats
-                total_sorted += 1
-                if decision == "GOOD":
-                    good_count += 1
-                else:
-                    bad_count += 1
-
-                # Step 7: Print result
-                status_icon = "✓" if decision == "GOOD" else "✗"
-                print(f"  {status_icon} {bean_label} | "
-                      f"W:{weight:.2f}g R:{r} G:{g} B:{b} | "
-                      f"DT:{dt_prob:.2f} CNN:{cnn_prob:.2f} | "
-                      f"Score:{fusion_score:.2f} → {decision}")
-
-                # Step 8: Print stats every 20 beans
-                if total_sorted % 20 == 0:
-                    print_stats(total_sorted, good_count,
-                                bad_count, start_time)
-
-                bean_id += 1
+                arrived["ts"] = time.time()
+                arrived["mono"] = time.monotonic()
+
+                profiler.bean_start()
+                REALTIME.window_start()
+                try:
+                    t0 = time.perf_counter()
+                    span_bean = tracer.now()
+
+                    # Step 2: Read colour, capture image and weight at once,
+                    # under the LED ring
+                    bundle = read_all_sensors(GPIO, acquire)
+                    r, g, b = bundle["colour"]
+                    weight  = bundle["weight"]
+                    image   = bundle["image"]
+                    tracer.add(S_SENSORS, bean_id, *bundle["spans"]["colour"])
+                    tracer.add(S_CAPTURE, bean_id, *bundle["spans"]["image"])
+                    t2 = time.perf_counter()
+
+                    # Step 3: Run fusion prediction
+                    span = tracer.now()
+                    decision, fusion_score, dt_prob, cnn_prob = predict_bean(
+                        (weight, r, g, b), image,
+                        dt_model, scaler,
+                        interpreter, input_details, output_details
+                    )
+                    tracer.add(S_PREDICT, bean_id, span)
+                    t3 = time.perf_counter()
+
+                    # Step 4: Trigger servo (now, or when the bean reaches the gate)
+                    span = tracer.now()
+                    if gate is not None:
+                        gate.schedule(arrived["mono"] + CONFIG["GATE_DELAY_S"],
+                                      decision, bean_id)
+                    else:
+                        trigger_sort(servo_pwm, decision)
+                    tracer.add(S_SORT, bean_id, span)
+
+                    # Step 5: Log result
+                    span = tracer.now()
+                    log_result(results, bean_label, weight, r, g, b,
+                               dt_prob, cnn_prob, fusion_score, decision)
+                    session.append(
+                        ts=time.time(), bean_id=bean_id,
+                        raw_r=r, raw_g=g, raw_b=b, weight_g=weight,
+                        dt_prob=dt_prob, cnn_prob=cnn_prob,
+                        fusion_score=fusion_score, decision=decision,
+                        sense_ms=_span_ms(bundle["spans"]["colour"]),
+                        capture_ms=_span_ms(bundle["spans"]["image"]),
+                        infer_ms=(t3 - t2) * 1000,
+                        total_ms=(time.perf_counter() - t0) * 1000)
+                    tracer.add(S_LOG, bean_id, span)
+                    tracer.add(S_BEAN, bean_id, span_bean)
+
+                    # Step 6: Update stats
+                    M_BEANS.labels(decision).inc()
+                    total_sorted += 1
+                    if decision == "GOOD":
+                        good_count += 1
+                    else:
+                        bad_count += 1
+
+                    # Step 7: Print result
+                    status_icon = "✓" if decision == "GOOD" else "✗"
+                    print(f"  {status_icon} {bean_label} | "
+                          f"W:{weight:.2f}g R:{r} G:{g} B:{b} | "
+                          f"DT:{dt_prob:.2f} CNN:{cnn_prob:.2f} | "
+                          f"Score:{fusion_score:.2f} → {decision}")
+
+                    # Step 8: Print stats every 20 beans
+                    if total_sorted % 20 == 0:
+                        print_stats(total_sorted, good_count,
+                                    bad_count, start_time)
+
+                    bean_id += 1
+                finally:
+                    # Also on errors: re-enable GC, close the profile window
+                    REALTIME.window_end()
+                    profiler.bean_end()
 
                 # Small delay between beans
                 time.sleep(0.2)
 
             except Exception as e:
+                M_ERRORS.inc()
                 log.warning(f"Error processing bean {bean_id}: {e}")
                 log.warning("Skipping bean and continuing...")
                 time.sleep(0.5)
@@ -490,12 +752,29 @@ def main():
 
     finally:
         # Always clean up hardware on exit
+        acquire.close()
+        if gate is not None:
+            gate.stop(drain=True)           # beans already on their way still get sorted
+            log.info(f"  Gate: {gate.fired} actuations, {gate.late} late")
+        scale.stop()
         stop_belt(motor_pwm, GPIO)
         set_servo_angle(servo_pwm, CONFIG["SERVO_PASS_ANGLE"])
         servo_pwm.stop()
         motor_pwm.stop()
         cam.stop()
         GPIO.cleanup()
+        results.close()
+        session.close()
+        log_stats = results.stats()
+        acq = acquire.stats()
+
+        # Per-stage latency breakdown + trace file for chrome://tracing
+        os.makedirs(CONFIG["TRACE_DIR"], exist_ok=True)
+        trace_path = os.path.join(CONFIG["TRACE_DIR"],
+                                  f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        tracer.export_chrome(trace_path)
+        tracer.print_summary()
+        REALTIME.jitter.print()
 
         # Print final session summary
         elapsed = time.time() - start_time
@@ -509,6 +788,9 @@ def main():
   Session duration    : {int(elapsed//60)}m {int(elapsed%60)}s
   Throughput          : {total_sorted/max(elapsed/60,1):.0f} beans/minute
   Results saved to    : {CONFIG['LOG_CSV_PATH']}
+  Stage trace         : {trace_path}
+  Log writes          : {log_stats['rows_written']} rows in {log_stats['flushes']} flushes, avg {log_stats['avg_flush_ms']:.1f} ms (max {log_stats['max_flush_ms']:.1f} ms)
+  Sensor overlap      : {acq['saved_ms']:.0f} ms saved per bean ({acq['serial_ms']:.0f} ms serial → {acq['wall_ms']:.0f} ms wall)
         """)
         print("="*55)
         log.info("Sorter shutdown complete.")
@@ -541,10 +823,9 @@ def simulate_on_laptop():
     output_details = interpreter.get_output_details()
 
     # Load fusion config
-    with open("models/fusion_config.json") as f:
-        fusion_cfg = json.load(f)
+    fusion_cfg = load_fusion_config()
 
-    init_csv_log()
+    results = init_csv_log()
 
     # Simulate 20 beans
     np.random.seed(42)
@@ -606,12 +887,13 @@ def simulate_on_laptop():
 
         # Log result
         bean_label = f"bean_{i+1:05d}"
-        log_result(bean_label, weight, r, g, b,
+        is_pass = fusion_score >= CONFIG["FUSION_THRESHOLD"]
+        log_result(results, bean_label, weight, r, g, b,
                    dt_prob, cnn_prob, fusion_score,
-                   "GOOD" if fusion_score >= 0.5 else "BAD")
+                   "GOOD" if is_pass else "BAD")
 
         total += 1
-        if fusion_score >= 0.5: good += 1
+        if is_pass: good += 1
         else: bad += 1
 
         print(f"  {bean_label:<12} {weight:>7.3f}g {r:>5} {g:>5} {b:>5} "
@@ -619,6 +901,7 @@ def simulate_on_laptop():
 
         time.sleep(0.05)
 
+    results.close()
     print(f"\n  {'─'*70}")
     print(f"  SIMULATION COMPLETE")
     print(f"  Total: {total} | Good: {good} ({good/total*100:.0f}%) | "
@@ -0,0 +1,102 @@
+"""
+acquisition.py — Concurrent multi-sensor acquisition for one bean
+Group Trailblazers | Uganda Christian University
+
+The load cell, the TCS3200 and the camera are independent devices, but
+the sorting loop used to read them one after another. The coordinator
+starts all reads at once and waits for the slowest:
+
+  - the `inline` task (the TCS3200 pulse count — the timing-sensitive
+    one) runs on the calling thread, so real-time mode still applies
+  - every other task runs on a small worker pool (camera capture and
+    HX711 reads spend their time waiting on the device)
+  - the result is one bundle: a wall-clock timestamp, each task's
+    value, each task's (start_ns, end_ns) span and how much wall time
+    the overlap saved compared with running the tasks back to back
+
+Usage:
+  acquire = AcquisitionCoordinator({
+      "colour": lambda: read_colour(GPIO),
+      "image" : lambda: capture_bean_image(cam, segmenter),
+      "weight": scale.reading,
+  }, inline="colour")
+  bundle = acquire.acquire()
+  r, g, b = bundle["colour"]
+
+Build the coordinator BEFORE RealtimeMode.enter(): its worker threads
+are started in the constructor and must not inherit the real-time
+affinity/priority.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AcquisitionCoordinator:
+    def __init__(self, tasks: dict, inline: str | None = None):
+        """tasks: name → zero-argument callable; `inline` runs on the caller's thread."""
+        if inline is not None and inline not in tasks:
+            raise ValueError(f"Unknown inline task: {inline}")
+        self.tasks = tasks
+        self.inline = inline
+        pooled = len(tasks) - (inline is not None)
+        self._pool = ThreadPoolExecutor(max_workers=max(pooled, 1),
+                                        thread_name_prefix="Acquire")
+        self._prestart(max(pooled, 1))
+        self.beans = 0
+        self.serial_s = 0.0         # sum over beans of the task times added up
+        self.wall_s = 0.0           # sum over beans of the actual wall time
+
+    def _prestart(self, workers: int):
+        """
+        Start every pool thread now. The executor spawns threads lazily
+        and a new thread inherits the creator's CPU affinity and
+        scheduling policy — spawned after RealtimeMode.enter() they would
+        compete with the sorting thread for its core at SCHED_FIFO.
+        The barrier keeps each worker busy so every submit spawns one.
+        """
+        barrier = threading.Barrier(workers)
+        for f in [self._pool.submit(barrier.wait) for _ in range(workers)]:
+            f.result()
+
+    @staticmethod
+    def _timed(fn):
+        start = time.perf_counter_ns()
+        value = fn()
+        return value, (start, time.perf_counter_ns())
+
+    def acquire(self) -> dict:
+        """Run every task concurrently; raises the first task error."""
+        ts = time.time()
+        start = time.perf_counter_ns()
+        futures = {name: self._pool.submit(self._timed, fn)
+                   for name, fn in self.tasks.items() if name != self.inline}
+        results = {}
+        if self.inline is not None:
+            results[self.inline] = self._timed(self.tasks[self.inline])
+        for name, future in futures.items():
+            results[name] = future.result()
+        end = time.perf_counter_ns()
+
+        spans = {name: span for name, (_, span) in results.items()}
+        serial = sum(e - s for s, e in spans.values()) / 1e9
+        wall = (end - start) / 1e9
+        self.beans += 1
+        self.serial_s += serial
+        self.wall_s += wall
+
+        bundle = {name: value for name, (value, _) in results.items()}
+        bundle.update(ts=ts, spans=spans, wall_ms=wall * 1000,
+                      saved_ms=(serial - wall) * 1000)
+        return bundle
+
+    def stats(self) -> dict:
+        n = max(self.beans, 1)
+        return {"beans": self.beans,
+                "serial_ms": self.serial_s / n * 1000,
+                "wall_ms": self.wall_s / n * 1000,
+                "saved_ms": (self.serial_s - self.wall_s) / n * 1000}
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,201 @@
+"""
+batch_classifier.py — Multi-bean-per-frame detection and batched CNN scoring
+Group Trailblazers | Uganda Christian University
+
+The rest of the sorter handles one bean at a time (one IR trigger → one
+capture → one CNN invoke). On a wider belt one frame can hold many
+beans, so this module:
+  1. segments every bean in the frame (BeanSegmenter.segment_all)
+  2. crops each to IMG_SIZE x IMG_SIZE into one float32 batch
+  3. scores the whole batch with a single TFLite invoke
+  4. returns per-bean positions so the actuator knows where each one is
+
+The interpreter input is resized to power-of-two batch buckets (1, 2,
+4 … MAX_BATCH) and only ever grows: a smaller frame reuses the current
+bucket with the unused rows zero-padded, so after warm-up there is no
+re-allocation at all.
+Models exported with a fixed batch of 1 fall back to one invoke per
+crop — segmentation and cropping are still done once per frame.
+
+HOW TO RUN (laptop, no hardware):
+  python scripts/batch_classifier.py [beans_per_frame] [frames]
+  — benchmarks beans/second against the one-bean loop using sim_camera.py
+"""
+
+import time
+import numpy as np
+from bean_segmenter import BeanSegmenter
+
+# ── Batch Configuration ────────────────────────────────────────────────────────
+IMG_SIZE        = 224
+MAX_BATCH       = 16
+CNN_MODEL_PATH  = "models/cnn_model.tflite"
+
+
+def load_interpreter(model_path: str = CNN_MODEL_PATH):
+    """tflite_runtime on the Pi, full TensorFlow on a laptop."""
+    try:
+        import tflite_runtime.interpreter as tflite
+        interpreter = tflite.Interpreter(model_path=model_path)
+    except ImportError:
+        import tensorflow as tf
+        interpreter = tf.lite.Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+class BatchClassifier:
+    """Segment all beans in a frame and score them with one CNN invoke."""
+
+    def __init__(self, interpreter, segmenter: BeanSegmenter | None = None,
+                 img_size: int = IMG_SIZE, max_batch: int = MAX_BATCH):
+        self.interpreter = interpreter
+        self.segmenter = segmenter or BeanSegmenter()
+        self.img_size = img_size
+        self.max_batch = max_batch
+        self._in  = interpreter.get_input_details()[0]
+        self._out = interpreter.get_output_details()[0]
+        self._batch = int(self._in["shape"][0])
+        self._can_batch = True
+        # Preallocated input buffer: crops are written straight into it and
+        # the first self._batch rows are what the interpreter is fed
+        self._buf = np.zeros((max(max_batch, self._batch), img_size, img_size, 3),
+                             dtype=np.float32)
+
+    # ── Interpreter batch sizing ───────────────────────────────────────────────
+
+    def _ensure_batch(self, n: int) -> bool:
+        """Grow the interpreter input to the smallest bucket >= n (never shrinks)."""
+        if not self._can_batch:
+            return False
+        bucket = 1
+        while bucket < n:
+            bucket *= 2
+        bucket = min(bucket, self.max_batch)
+        if bucket <= self._batch:
+            return True
+        try:
+            self.interpreter.resize_tensor_input(
+                self._in["index"], [bucket, self.img_size, self.img_size, 3])
+            self.interpreter.allocate_tensors()
+            self._batch = bucket
+            return True
+        except Exception as e:
+            print(f"[Batch] Model does not support batching ({e}) — "
+                  f"falling back to one invoke per bean")
+            self._can_batch = False
+            self.interpreter.resize_tensor_input(
+                self._in["index"], [1, self.img_size, self.img_size, 3])
+            self.interpreter.allocate_tensors()
+            self._batch = 1
+            return False
+
+    # ── Scoring ────────────────────────────────────────────────────────────────
+
+    def score_crops(self, crops: np.ndarray) -> np.ndarray:
+        """CNN prob-of-good for a (N, S, S, 3) float32 batch, in chunks of max_batch."""
+        probs = np.empty(len(crops), dtype=np.float32)
+        for start in range(0, len(crops), self.max_batch):
+            chunk = crops[start:start + self.max_batch]
+            n = len(chunk)
+            if self._ensure_batch(n):
+                # classify_frame already cropped into self._buf — no copy then
+                if chunk.ctypes.data != self._buf.ctypes.data:
+                    self._buf[:n] = chunk
+                self._buf[n:self._batch] = 0.0
+                self.interpreter.set_tensor(self._in["index"], self._buf[:self._batch])
+                self.interpreter.invoke()
+                probs[start:start + n] = \
+                    self.interpreter.get_tensor(self._out["index"])[:n, 0]
+            else:
+                for i in range(n):
+                    self.interpreter.set_tensor(self._in["index"], chunk[i:i + 1])
+                    self.interpreter.invoke()
+                    probs[start + i] = \
+                        self.interpreter.get_tensor(self._out["index"])[0, 0]
+        return probs
+
+    def classify_frame(self, frame: np.ndarray, threshold: float = 0.5) -> list:
+        """
+        Segment and score every bean in the frame.
+
+        Returns one dict per bean, ordered along the belt (x then y):
+            bbox, centroid (normalised), cnn_prob, decision ("GOOD"/"BAD")
+        """
+        beans = self.segmenter.segment_all(frame)
+        if not beans:
+            return []
+        beans.sort(key=lambda b: (b["centroid"][0], b["centroid"][1]))
+
+        n = len(beans)
+        crops = self._buf[:n] if n <= self.max_batch else \
+            np.zeros((n, self.img_size, self.img_size, 3), np.float32)
+        for i, seg in enumerate(beans):
+            crop = self.segmenter.crop(frame, seg, size=self.img_size)
+            np.multiply(crop, 1.0 / 255.0, out=crops[i], casting="unsafe")
+
+        probs = self.score_crops(crops)
+        return [{
+            "bbox"    : seg["bbox"],
+            "centroid": seg["centroid"],
+            "cnn_prob": float(p),
+            "decision": "GOOD" if p >= threshold else "BAD",
+        } for seg, p in zip(beans, probs)]
+
+
+# ── Benchmark ──────────────────────────────────────────────────────────────────
+
+def benchmark(beans_per_frame: int = 12, frames: int = 20,
+              model_path: str = CNN_MODEL_PATH) -> dict:
+    """
+    beans/second for the one-bean loop versus frame-level batching,
+    both fed by SimulatedCamera. Camera time is excluded — only
+    segmentation, cropping and CNN scoring are timed.
+    """
+    from sim_camera import SimulatedCamera
+
+    interpreter = load_interpreter(model_path)
+    clf = BatchClassifier(interpreter, max_batch=max(MAX_BATCH, beans_per_frame))
+    total_beans = beans_per_frame * frames
+
+    # One bean per frame, batch of 1 — what the current sorter does
+    single = SimulatedCamera(beans_per_frame=1, seed=1)
+    clf.segmenter.learn_background([single.empty_frame()])
+    imgs = [single.capture_array() for _ in range(total_beans)]
+    clf.classify_frame(imgs[0])                        # warm-up
+    t0 = time.perf_counter()
+    n_single = sum(len(clf.classify_frame(img)) for img in imgs)
+    single_s = time.perf_counter() - t0
+
+    # Many beans per frame, one batched invoke
+    multi = SimulatedCamera(beans_per_frame=beans_per_frame, seed=2)
+    imgs = [multi.capture_array() for _ in range(frames)]
+    clf.classify_frame(imgs[0])                        # warm-up / allocate
+    t0 = time.perf_counter()
+    n_multi = sum(len(clf.classify_frame(img)) for img in imgs)
+    multi_s = time.perf_counter() - t0
+
+    return {
+        "beans_per_frame"     : beans_per_frame,
+        "single_beans"        : n_single,
+        "single_beans_per_s"  : n_single / single_s if single_s else 0.0,
+        "batched_beans"       : n_multi,
+        "batched_beans_per_s" : n_multi / multi_s if multi_s else 0.0,
+        "batched_invoke_used" : clf._can_batch,
+        "speedup"             : (n_multi / multi_s) / (n_single / single_s)
+                                if multi_s and single_s and n_single else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    bpf    = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"\nBenchmarking {bpf} beans/frame x {frames} frames …\n")
+    result = benchmark(bpf, frames)
+    print(f"  One-bean loop   : {result['single_beans_per_s']:8.1f} beans/s "
+          f"({result['single_beans']} beans)")
+    print(f"  Batched frames  : {result['batched_beans_per_s']:8.1f} beans/s "
+          f"({result['batched_beans']} beans)")
+    print(f"  Speed-up        : {result['speedup']:.2f}x "
+          f"(batched invoke: {'yes' if result['batched_invoke_used'] else 'no — per-bean fallback'})")
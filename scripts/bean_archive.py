@@ -0,0 +1,367 @@
+"""
+bean_archive.py — Compact, quota-limited bean image archive
+Group Trailblazers | Uganda Christian University
+
+One JPEG file per bean means millions of tiny files on the SD card,
+which are slow to write, list and back up. This archive instead packs
+JPEG-encoded bean crops into large append-only chunk files:
+
+  data/bean_archive/
+    chunk_000001.bin   — JPEG bytes, back to back
+    chunk_000002.bin
+    index.db           — SQLite: bean_id → chunk, offset, length,
+                         label, predicted, timestamp
+
+Disk quota: when the chunks exceed QUOTA_MB, beans are evicted by
+priority, computed at eviction time from the stored label/prediction
+(a class that was rare when a bean arrived may not be rare any more):
+  2 = misclassified (label known and != predicted)
+  1 = rare class    (label seen in < RARE_FRACTION of labelled beans)
+  0 = everything else
+For each level, oldest first, chunks holding nothing above that level
+are deleted outright; only if the quota still cannot be met are mixed
+chunks compacted (beans worth keeping copied forward into the current
+chunk, the old file deleted). Label counts for the rare-class test are
+kept in memory, and index rows are committed in batches (every
+COMMIT_EVERY beans or COMMIT_INTERVAL_S seconds) rather than once per bean.
+
+HOW TO RUN:
+  python scripts/bean_archive.py import "data/*.jpg"            — pack existing JPEGs
+  python scripts/bean_archive.py import "data/*.jpg" --delete   — ...and remove each
+                                                                  JPEG once indexed
+  python scripts/bean_archive.py stats
+"""
+
+import os
+import io
+import glob
+import time
+import sqlite3
+import threading
+import numpy as np
+
+# ── Archive Configuration ──────────────────────────────────────────────────────
+ARCHIVE_DIR     = "data/bean_archive"
+CHUNK_MB        = 64        # chunk file size before a new one is started
+QUOTA_MB        = 2048      # total chunk bytes allowed on disk
+RARE_FRACTION   = 0.05      # labels below 5% of labelled beans count as rare
+JPEG_QUALITY    = 90
+COMMIT_EVERY    = 32        # index rows per SQLite commit...
+COMMIT_INTERVAL_S = 2.0     # ...or this long since the last one, whichever first
+
+
+def encode_jpeg(frame: np.ndarray, quality: int = JPEG_QUALITY) -> bytes:
+    """RGB array → JPEG bytes, using OpenCV or PIL (whichever is available)."""
+    try:
+        import cv2
+        ok, buf = cv2.imencode(".jpg", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                               [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buf.tobytes()
+    except ImportError:
+        from PIL import Image
+        out = io.BytesIO()
+        Image.fromarray(frame).save(out, format="JPEG", quality=quality)
+        return out.getvalue()
+
+
+def decode_jpeg(data: bytes) -> np.ndarray:
+    """JPEG bytes → RGB array."""
+    try:
+        import cv2
+        bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    except ImportError:
+        from PIL import Image
+        return np.array(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+class BeanArchive:
+    """Append-only chunked image store with an SQLite index and quota eviction."""
+
+    def __init__(self, root: str = ARCHIVE_DIR, quota_mb: float = QUOTA_MB,
+                 chunk_mb: float = CHUNK_MB):
+        self.root = root
+        self.quota = int(quota_mb * 1024 * 1024)
+        self.chunk_limit = int(chunk_mb * 1024 * 1024)
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(root, "index.db"),
+                                   check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS beans (
+                bean_id   TEXT PRIMARY KEY,
+                chunk     INTEGER NOT NULL,
+                offset    INTEGER NOT NULL,
+                length    INTEGER NOT NULL,
+                label     TEXT,
+                predicted TEXT,
+                timestamp REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunk ON beans(chunk)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_label ON beans(label)")
+        self._db.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._label_counts = dict(self._db.execute(
+            "SELECT label, COUNT(*) FROM beans WHERE label IS NOT NULL GROUP BY label"
+        ).fetchall())
+
+        chunks = self._chunk_ids()
+        self._chunk = chunks[-1] if chunks else 1
+        self._fh = open(self._chunk_path(self._chunk), "ab")
+        self._usage = self.disk_usage()     # kept up to date instead of stat-ing files
+
+    # ── Paths / helpers ────────────────────────────────────────────────────────
+
+    def _chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.root, f"chunk_{chunk:06d}.bin")
+
+    def _chunk_ids(self) -> list:
+        names = glob.glob(os.path.join(self.root, "chunk_*.bin"))
+        return sorted(int(os.path.basename(n)[6:12]) for n in names)
+
+    def disk_usage(self) -> int:
+        return sum(os.path.getsize(self._chunk_path(c)) for c in self._chunk_ids())
+
+    def _count_label(self, label, delta: int):
+        if label is not None:
+            n = self._label_counts.get(label, 0) + delta
+            if n > 0:
+                self._label_counts[label] = n
+            else:
+                self._label_counts.pop(label, None)
+
+    def _rare_labels(self) -> set:
+        total = sum(self._label_counts.values())
+        return {lab for lab, n in self._label_counts.items()
+                if total and n / total < RARE_FRACTION}
+
+    def _changed(self):
+        """Count an uncommitted index row; commit once a batch is due."""
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY or \
+                time.monotonic() - self._last_commit >= COMMIT_INTERVAL_S:
+            self.commit()
+
+    def commit(self):
+        """Write pending index rows to index.db now."""
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+            self._last_commit = time.monotonic()
+
+    def _priority_sql(self) -> tuple:
+        """SQL expression (and its arguments) for each row's current priority."""
+        rare = sorted(self._rare_labels())
+        expr = "CASE WHEN label IS NOT NULL AND predicted IS NOT NULL " \
+               "AND label != predicted THEN 2 "
+        if rare:
+            expr += f"WHEN label IN ({', '.join('?' * len(rare))}) THEN 1 "
+        return expr + "ELSE 0 END", tuple(rare)
+
+    # ── Writing ────────────────────────────────────────────────────────────────
+
+    def _append_bytes(self, data: bytes):
+        if self._fh.tell() + len(data) > self.chunk_limit and self._fh.tell() > 0:
+            self._fh.close()
+            self._chunk += 1
+            self._fh = open(self._chunk_path(self._chunk), "ab")
+        offset = self._fh.tell()
+        self._fh.write(data)
+        self._usage += len(data)
+        return self._chunk, offset
+
+    def append(self, bean_id: str, frame=None, jpeg: bytes | None = None,
+               label: str | None = None, predicted: str | None = None,
+               timestamp: float | None = None):
+        """Add one bean image (RGB array or ready-made JPEG bytes)."""
+        data = jpeg if jpeg is not None else encode_jpeg(frame)
+        with self._lock:
+            chunk, offset = self._append_bytes(data)
+            self._fh.flush()
+            old = self._db.execute(
+                "SELECT label FROM beans WHERE bean_id = ?", (bean_id,)).fetchone()
+            if old is not None:
+                self._count_label(old[0], -1)
+            self._count_label(label, +1)
+            self._db.execute(
+                "INSERT OR REPLACE INTO beans (bean_id, chunk, offset, length, "
+                "label, predicted, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (bean_id, chunk, offset, len(data), label, predicted,
+                 timestamp if timestamp is not None else time.time()))
+            self._changed()
+            if self._usage > self.quota:
+                self.enforce_quota()
+
+    def set_label(self, bean_id: str, label: str | None = None,
+                  predicted: str | None = None):
+        """Attach the true label and/or prediction once known."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT label, predicted FROM beans WHERE bean_id = ?", (bean_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            if label is not None:
+                self._count_label(row[0], -1)
+                self._count_label(label, +1)
+            label = label if label is not None else row[0]
+            predicted = predicted if predicted is not None else row[1]
+            self._db.execute(
+                "UPDATE beans SET label = ?, predicted = ? WHERE bean_id = ?",
+                (label, predicted, bean_id))
+            self._changed()
+            return True
+
+    # ── Eviction ───────────────────────────────────────────────────────────────
+
+    def enforce_quota(self):
+        """Evict the oldest, lowest-priority beans until the archive fits in the quota."""
+        with self._lock:
+            prio, args = self._priority_sql()
+            for keep_from in (1, 2, 3):          # 3 = keep nothing
+                # Chunks with nothing at or above keep_from: delete, no rewrite
+                top = dict(self._db.execute(
+                    f"SELECT chunk, MAX({prio}) FROM beans GROUP BY chunk", args
+                ).fetchall())
+                for chunk in self._chunk_ids()[:-1]:   # never the open chunk
+                    if self._usage <= self.quota:
+                        return
+                    if top.get(chunk, -1) < keep_from:
+                        self._compact(chunk, keep_from, prio, args)
+                # Still over: copy the keepers out of mixed chunks
+                for chunk in self._chunk_ids()[:-1]:
+                    if self._usage <= self.quota:
+                        return
+                    self._compact(chunk, keep_from, prio, args)
+
+    def _compact(self, chunk: int, keep_from: int, prio: str, args: tuple):
+        path = self._chunk_path(chunk)
+        rows = self._db.execute(
+            f"SELECT bean_id, offset, length, {prio}, label FROM beans WHERE chunk = ?",
+            args + (chunk,)).fetchall()
+        keep = [r for r in rows if r[3] >= keep_from]
+        if keep:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                for bean_id, offset, length, _, _ in keep:
+                    data = os.pread(fd, length, offset)
+                    new_chunk, new_off = self._append_bytes(data)
+                    self._db.execute(
+                        "UPDATE beans SET chunk = ?, offset = ? WHERE bean_id = ?",
+                        (new_chunk, new_off, bean_id))
+            finally:
+                os.close(fd)
+            self._fh.flush()
+        for r in rows:
+            if r[3] < keep_from:
+                self._count_label(r[4], -1)
+        self._db.executemany("DELETE FROM beans WHERE bean_id = ?",
+                             [(r[0],) for r in rows if r[3] < keep_from])
+        self.commit()           # chunk file is deleted next: the index must agree
+        self._usage -= os.path.getsize(path)
+        os.remove(path)
+        print(f"[Archive] Compacted chunk {chunk}: kept {len(keep)}, "
+              f"evicted {len(rows) - len(keep)}")
+
+    # ── Reading ────────────────────────────────────────────────────────────────
+
+    def get_jpeg(self, bean_id: str) -> bytes | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT chunk, offset, length FROM beans WHERE bean_id = ?", (bean_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._fh.flush()
+            fd = os.open(self._chunk_path(row[0]), os.O_RDONLY)
+            try:
+                return os.pread(fd, row[2], row[1])
+            finally:
+                os.close(fd)
+
+    def get(self, bean_id: str) -> np.ndarray | None:
+        data = self.get_jpeg(bean_id)
+        return decode_jpeg(data) if data is not None else None
+
+    def iter_beans(self, label: str | None = None, decode: bool = True):
+        """
+        Yield (bean_id, label, image) for retraining, read in chunk/offset
+        order so each chunk file is scanned sequentially.
+        """
+        with self._lock:
+            self._fh.flush()
+            query = "SELECT bean_id, chunk, offset, length, label FROM beans"
+            args = ()
+            if label is not None:
+                query += " WHERE label = ?"
+                args = (label,)
+            rows = self._db.execute(query + " ORDER BY chunk, offset", args).fetchall()
+
+        fd, open_chunk = None, None
+        try:
+            for bean_id, chunk, offset, length, lab in rows:
+                if chunk != open_chunk:
+                    if fd is not None:
+                        os.close(fd)
+                    try:
+                        fd = os.open(self._chunk_path(chunk), os.O_RDONLY)
+                    except FileNotFoundError:       # compacted meanwhile
+                        fd, open_chunk = None, None
+                        continue
+                    open_chunk = chunk
+                data = os.pread(fd, length, offset)
+                yield bean_id, lab, decode_jpeg(data) if decode else data
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, = self._db.execute("SELECT COUNT(*) FROM beans").fetchone()
+            prio, args = self._priority_sql()
+            by_prio = dict(self._db.execute(
+                f"SELECT {prio} AS p, COUNT(*) FROM beans GROUP BY p", args).fetchall())
+        return {
+            "beans"     : n,
+            "chunks"    : len(self._chunk_ids()),
+            "disk_mb"   : self._usage / 1024 / 1024,
+            "quota_mb"  : self.quota / 1024 / 1024,
+            "priority"  : by_prio,
+        }
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+            self.commit()
+            self._db.close()
+
+
+def import_files(pattern: str, archive: BeanArchive, delete: bool = False) -> int:
+    """Pack existing bean_*.jpg files into the archive (bean_id = file stem)."""
+    count = 0
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "rb") as f:
+            data = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        archive.append(stem, jpeg=data, timestamp=os.path.getmtime(path))
+        if delete:
+            archive.commit()        # index row durable before the file goes
+            os.remove(path)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    archive = BeanArchive()
+    try:
+        if len(sys.argv) > 2 and sys.argv[1] == "import":
+            n = import_files(sys.argv[2], archive, delete="--delete" in sys.argv)
+            print(f"Imported {n} images into {ARCHIVE_DIR}")
+        print(archive.stats())
+    finally:
+        archive.close()
@@ -0,0 +1,151 @@
+"""
+bean_segmenter.py — Bean segmentation and tight ROI crop for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+Finds the bean in each camera frame so that:
+  - only a tight crop around the bean is resized and sent to the CNN
+  - only bean pixels (not belt background) go into the colour features
+
+Pipeline (run on a frame downscaled by WORK_SCALE for speed):
+  1. Background model — median of a few empty-belt frames, or, before one
+     has been learned, the median colour of the frame border
+  2. Threshold the per-pixel colour difference from the background
+  3. Morphological open to remove speckle
+  4. Largest external contour = the bean → mask + bounding box
+"""
+
+import numpy as np
+import cv2
+
+# ── Segmentation Configuration ─────────────────────────────────────────────────
+WORK_SCALE      = 0.25    # segment on a 1/4-size frame, scale results back up
+DIFF_THRESHOLD  = 30      # max per-channel |frame - background| to count as bean
+MIN_AREA_FRAC   = 0.002   # blobs smaller than 0.2% of the frame are noise
+BORDER_FRAC     = 0.05    # border width used to estimate belt colour (no background)
+CROP_PADDING    = 0.15    # grow the bounding box by 15% each side before cropping
+OPEN_KERNEL     = 3       # morphological open kernel (pixels at work scale)
+
+
+class BeanSegmenter:
+    """
+    Background-difference bean segmenter.
+
+    segment(frame) returns a dict for the largest bean, or None:
+        bbox     : (x, y, w, h) in full-frame pixels
+        mask     : bool array (h, w) — bean pixels inside the bbox
+        area     : bean area in full-frame pixels (approx.)
+        centroid : (cx, cy) normalised 0.0-1.0
+    """
+
+    def __init__(self, work_scale: float = WORK_SCALE):
+        self.work_scale = work_scale
+        self._bg = None
+        self._kernel = np.ones((OPEN_KERNEL, OPEN_KERNEL), np.uint8)
+
+    # ── Background model ───────────────────────────────────────────────────────
+
+    def learn_background(self, frames):
+        """Learn the empty belt from a few frames (per-pixel median)."""
+        small = [self._downscale(f).astype(np.int16) for f in frames]
+        self._bg = np.median(np.stack(small), axis=0).astype(np.int16)
+        print(f"[Segment] Background learned from {len(small)} frames")
+
+    def has_background(self) -> bool:
+        return self._bg is not None
+
+    # ── Segmentation ───────────────────────────────────────────────────────────
+
+    def foreground_mask(self, frame: np.ndarray) -> np.ndarray:
+        """Binary (uint8 0/255) bean mask at work scale."""
+        small = self._downscale(frame).astype(np.int16)
+        if self._bg is not None and self._bg.shape == small.shape:
+            bg = self._bg
+        else:
+            bg = self._border_colour(small)
+        diff = np.abs(small - bg).max(axis=2)
+        mask = (diff > DIFF_THRESHOLD).astype(np.uint8) * 255
+        return cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+
+    def segment_all(self, frame: np.ndarray, max_beans: int | None = None) -> list:
+        """All beans in the frame, largest first."""
+        mask = self.foreground_mask(frame)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = MIN_AREA_FRAC * mask.shape[0] * mask.shape[1]
+        contours = [c for c in contours if cv2.contourArea(c) >= min_area]
+        contours.sort(key=cv2.contourArea, reverse=True)
+        if max_beans:
+            contours = contours[:max_beans]
+        return [self._describe(c, frame.shape) for c in contours]
+
+    def segment(self, frame: np.ndarray) -> dict | None:
+        """Largest bean in the frame, or None if the belt is empty."""
+        beans = self.segment_all(frame, max_beans=1)
+        return beans[0] if beans else None
+
+    # ── Outputs for the models ─────────────────────────────────────────────────
+
+    def crop(self, frame: np.ndarray, seg: dict, size: int | None = None,
+             padding: float = CROP_PADDING) -> np.ndarray:
+        """
+        Square crop around the bean (bbox + padding), optionally resized
+        to size x size for the CNN. Returns a uint8 RGB array.
+        """
+        H, W = frame.shape[:2]
+        x, y, w, h = seg["bbox"]
+        side = int(max(w, h) * (1 + 2 * padding))
+        cx, cy = x + w // 2, y + h // 2
+        x0 = max(0, min(cx - side // 2, W - side))
+        y0 = max(0, min(cy - side // 2, H - side))
+        out = frame[y0:y0 + side, x0:x0 + side]
+        if size:
+            out = cv2.resize(out, (size, size), interpolation=cv2.INTER_AREA)
+        return out
+
+    def masked_mean_rgb(self, frame: np.ndarray, seg: dict) -> tuple:
+        """Mean (R, G, B) over bean pixels only."""
+        x, y, w, h = seg["bbox"]
+        pixels = frame[y:y + h, x:x + w][seg["mask"]]
+        if pixels.size == 0:
+            return 0.0, 0.0, 0.0
+        r, g, b = pixels.reshape(-1, 3).mean(axis=0)
+        return float(r), float(g), float(b)
+
+    # ── Helpers ────────────────────────────────────────────────────────────────
+
+    def _downscale(self, frame):
+        if self.work_scale == 1.0:
+            return frame
+        return cv2.resize(frame, None, fx=self.work_scale, fy=self.work_scale,
+                          interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _border_colour(small):
+        b = max(1, int(min(small.shape[:2]) * BORDER_FRAC))
+        border = np.concatenate([
+            small[:b].reshape(-1, 3), small[-b:].reshape(-1, 3),
+            small[:, :b].reshape(-1, 3), small[:, -b:].reshape(-1, 3),
+        ])
+        return np.median(border, axis=0).astype(np.int16)
+
+    def _describe(self, contour, shape):
+        H, W = shape[:2]
+        s = 1.0 / self.work_scale
+        xs, ys, ws, hs = cv2.boundingRect(contour)
+        x, y = int(xs * s), int(ys * s)
+        w = min(int(np.ceil(ws * s)), W - x)
+        h = min(int(np.ceil(hs * s)), H - y)
+
+        # Rasterise the contour at full resolution inside the bbox only
+        mask = np.zeros((h, w), np.uint8)
+        shifted = (contour.astype(np.float32) * s - [x, y]).astype(np.int32)
+        cv2.drawContours(mask, [shifted], -1, 255, thickness=cv2.FILLED)
+
+        m = cv2.moments(contour)
+        cx = (m["m10"] / m["m00"]) * s if m["m00"] else x + w / 2
+        cy = (m["m01"] / m["m00"]) * s if m["m00"] else y + h / 2
+        return {
+            "bbox"    : (x, y, w, h),
+            "mask"    : mask.astype(bool),
+            "area"    : int(np.count_nonzero(mask)),
+            "centroid": (cx / W, cy / H),
+        }
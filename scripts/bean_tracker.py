@@ -0,0 +1,294 @@
+"""
+bean_tracker.py — Continuous-motion video sorting with cross-frame bean tracking
+Group Trailblazers | Uganda Christian University
+
+Instead of stopping the belt for one capture per IR trigger, the camera
+runs at video rate while the belt moves:
+
+  1. Every frame is segmented (BeanSegmenter.segment_all)
+  2. Detections are matched to existing tracks by predicted centroid
+     (position + velocity x dt), so each bean keeps one track id
+  3. Each track remembers its best-quality crop (sharp and well inside
+     the frame)
+  4. When a bean leaves the frame its best crop is classified ONCE
+     (tracks leaving together share one batched CNN invoke)
+  5. The track's position and velocity give the time it reaches the
+     gate, and GateScheduler fires the servo at that moment
+
+HOW TO RUN (laptop, no hardware):
+  python scripts/bean_tracker.py [seconds]   — runs on sim_camera.SimulatedBelt
+"""
+
+import time
+import heapq
+import threading
+import numpy as np
+import cv2
+from config import CAMERA
+
+# ── Tracking Configuration ─────────────────────────────────────────────────────
+MAX_MATCH_DIST   = 0.08    # normalised distance a bean may be from its prediction
+MAX_MISSED       = 3       # frames a track may go unseen before it is closed
+MIN_HITS         = 3       # frames a track needs before it is classified
+EDGE_MARGIN      = 0.04    # crops touching this margin are low quality
+# Positions are normalised centroids, so along BELT_AXIS one unit is one frame
+# width (BELT_AXIS = 0) or one frame height (BELT_AXIS = 1)
+BELT_AXIS        = CAMERA["BELT_AXIS"]  # 0 = x, 1 = y: index into (x, y) centroids
+GATE_POSITION    = CAMERA["GATE_POSITION"]  # gate distance from the upstream edge, frame lengths
+MIN_SPEED        = 0.02    # below this (frame lengths / s) fall back to DEFAULT_SPEED
+DEFAULT_SPEED    = 0.5
+IMG_SIZE         = 224
+
+
+class Track:
+    """One bean followed across frames."""
+
+    __slots__ = ("id", "pos", "vel", "last_ts", "hits", "missed",
+                 "best_quality", "best_crop", "first_ts")
+
+    def __init__(self, track_id, pos, ts):
+        self.id = track_id
+        self.pos = np.asarray(pos, dtype=np.float64)
+        self.vel = np.zeros(2)
+        self.first_ts = ts
+        self.last_ts = ts
+        self.hits = 1
+        self.missed = 0
+        self.best_quality = -1.0
+        self.best_crop = None
+
+    def predict(self, ts):
+        return self.pos + self.vel * (ts - self.last_ts)
+
+    def update(self, pos, ts):
+        dt = ts - self.last_ts
+        pos = np.asarray(pos, dtype=np.float64)
+        if dt > 0:
+            measured = (pos - self.pos) / dt
+            # Light smoothing — the belt speed is nearly constant
+            self.vel = measured if self.hits == 1 else 0.6 * self.vel + 0.4 * measured
+        self.pos = pos
+        self.last_ts = ts
+        self.hits += 1
+        self.missed = 0
+
+
+def crop_quality(crop: np.ndarray, centroid) -> float:
+    """Sharpness (Laplacian variance) scaled down for beans near the frame edge."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+    sharp = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    cx, cy = centroid
+    edge = min(cx, cy, 1 - cx, 1 - cy)
+    return sharp * (0.2 if edge < EDGE_MARGIN else 1.0)
+
+
+class BeanTracker:
+    """Nearest-neighbour tracker on segmented bean centroids."""
+
+    def __init__(self, segmenter, img_size: int = IMG_SIZE):
+        self.segmenter = segmenter
+        self.img_size = img_size
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, frame: np.ndarray, ts: float) -> list:
+        """Add one frame; returns tracks that have just finished (left the frame)."""
+        dets = self.segmenter.segment_all(frame)
+        centroids = np.array([d["centroid"] for d in dets]).reshape(-1, 2)
+
+        matched_det = set()
+        if self.tracks and len(dets):
+            pred = np.array([t.predict(ts) for t in self.tracks])
+            dist = np.linalg.norm(pred[:, None, :] - centroids[None, :, :], axis=2)
+            # Greedy assignment, closest pairs first
+            for flat in np.argsort(dist, axis=None):
+                ti, di = np.unravel_index(flat, dist.shape)
+                if dist[ti, di] > MAX_MATCH_DIST:
+                    break
+                track = self.tracks[ti]
+                if di in matched_det or track.last_ts == ts:
+                    continue
+                track.update(centroids[di], ts)
+                matched_det.add(di)
+                self._offer_crop(track, frame, dets[di])
+
+        for track in self.tracks:
+            if track.last_ts != ts:
+                track.missed += 1
+
+        for di, det in enumerate(dets):
+            if di not in matched_det:
+                track = Track(self._next_id, det["centroid"], ts)
+                self._next_id += 1
+                self._offer_crop(track, frame, det)
+                self.tracks.append(track)
+
+        finished = [t for t in self.tracks if t.missed > MAX_MISSED]
+        self.tracks = [t for t in self.tracks if t.missed <= MAX_MISSED]
+        return [t for t in finished if t.hits >= MIN_HITS and t.best_crop is not None]
+
+    def flush(self) -> list:
+        """Close all open tracks (end of run)."""
+        done = [t for t in self.tracks if t.hits >= MIN_HITS and t.best_crop is not None]
+        self.tracks = []
+        return done
+
+    def _offer_crop(self, track, frame, det):
+        crop = self.segmenter.crop(frame, det, size=self.img_size)
+        q = crop_quality(crop, det["centroid"])
+        if q > track.best_quality:
+            track.best_quality = q
+            track.best_crop = crop.copy()
+
+
+def gate_eta(track: Track) -> float:
+    """Time (same clock as the frame timestamps) the bean reaches the gate."""
+    speed = track.vel[BELT_AXIS]
+    if speed < MIN_SPEED:
+        speed = DEFAULT_SPEED
+    return track.last_ts + (GATE_POSITION - track.pos[BELT_AXIS]) / speed
+
+
+class GateScheduler:
+    """
+    Fires actuate(decision, track_id) at each bean's predicted gate time.
+    A single thread sleeps until the earliest pending deadline.
+
+    With ticked=True the clock is simulated and only moves when the caller
+    says so: instead of sleeping the remaining time in real seconds the
+    thread waits for tick(), which is called after each clock advance.
+    """
+
+    def __init__(self, actuate, clock=time.monotonic, ticked: bool = False):
+        self._actuate = actuate
+        self._clock = clock
+        self._ticked = ticked
+        self._heap = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.fired = 0
+        self.late = 0            # deadlines already passed when scheduled/fired
+        self.lateness_ms = []
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="GateScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True):
+        """Stop the thread; with drain=True pending beans are still actuated first."""
+        with self._cond:
+            if not drain:
+                self._heap.clear()
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+
+    def schedule(self, when: float, decision: str, track_id: int):
+        with self._cond:
+            heapq.heappush(self._heap, (when, track_id, decision))
+            self._cond.notify()
+
+    def tick(self):
+        """The (simulated) clock has advanced: re-check the earliest deadline."""
+        with self._cond:
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        if not self._running:
+                            return
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - self._clock()
+                    if wait <= 0:
+                        when, track_id, decision = heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(None if self._ticked else wait)
+            lateness = (self._clock() - when) * 1000
+            if lateness > 5:
+                self.late += 1
+            self.lateness_ms.append(lateness)
+            self._actuate(decision, track_id)
+            self.fired += 1
+
+
+class VideoSorter:
+    """Camera at video rate → tracker → one classification per bean → gate."""
+
+    def __init__(self, camera, classifier, scheduler: GateScheduler,
+                 threshold: float = 0.5, clock=time.monotonic):
+        self.camera = camera
+        self.classifier = classifier
+        self.tracker = BeanTracker(classifier.segmenter, classifier.img_size)
+        self.scheduler = scheduler
+        self.threshold = threshold
+        self.clock = clock
+        self.frames = 0
+        self.classified = 0
+        self.results = []
+
+    def step(self, ts: float | None = None):
+        frame = self.camera.capture_array()
+        ts = self.clock() if ts is None else ts
+        self.frames += 1
+        self._classify(self.tracker.update(frame, ts))
+        self.scheduler.tick()
+
+    def finish(self):
+        self._classify(self.tracker.flush())
+        self.scheduler.tick()
+
+    def _classify(self, tracks):
+        if not tracks:
+            return
+        crops = np.stack([t.best_crop for t in tracks]).astype(np.float32) / 255.0
+        probs = self.classifier.score_crops(crops)
+        for track, p in zip(tracks, probs):
+            decision = "GOOD" if p >= self.threshold else "BAD"
+            eta = gate_eta(track)
+            self.scheduler.schedule(eta, decision, track.id)
+            self.classified += 1
+            self.results.append({"track": track.id, "cnn_prob": float(p),
+                                 "decision": decision, "gate_eta": eta,
+                                 "frames_seen": track.hits})
+
+
+# ── Standalone simulation ──────────────────────────────────────────────────────
+if __name__ == "__main__":
+    import sys
+    from sim_camera import SimulatedBelt
+    from batch_classifier import BatchClassifier, load_interpreter
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    belt = SimulatedBelt(speed=0.5, beans_per_second=2.0, fps=30)
+    clf = BatchClassifier(load_interpreter())
+    clf.segmenter.learn_background([belt.empty_frame()])
+
+    # Simulated clock: belt.t advances one frame interval per capture
+    gate = GateScheduler(lambda d, tid: None, clock=lambda: belt.t, ticked=True)
+    sorter = VideoSorter(belt, clf, gate, clock=lambda: belt.t)
+    gate.start()
+
+    t0 = time.perf_counter()
+    while belt.t < seconds:
+        sorter.step()
+    sorter.finish()
+    wall = time.perf_counter() - t0
+
+    # The simulated clock stops with the last frame: run it on past the
+    # last bean's gate time so the scheduler fires everything still pending
+    if sorter.results:
+        belt.t = max(belt.t, max(r["gate_eta"] for r in sorter.results))
+    gate.stop(drain=True)
+
+    print(f"\n  Simulated {seconds:.0f} s of belt: {sorter.frames} frames, "
+          f"{sorter.classified} beans classified (spawned {belt._bean_id})")
+    print(f"  Processing speed : {sorter.frames / wall:.1f} frames/s, "
+          f"{sorter.classified / wall * 60:.0f} beans/minute")
+    print(f"  Gate actuations  : {gate.fired} of {sorter.classified} beans")
@@ -0,0 +1,422 @@
+"""
+benchmark_sorter.py — Hardware-free benchmarks of the sorter hot paths
+Group Trailblazers | Uganda Christian University
+
+Runs on any Linux/Mac box: GPIO, HX711 and camera are replaced by
+sim_gpio / sim_camera, and time.sleep() is disabled inside the timed
+code so only computation and Python overhead are measured. Only the
+benchmark thread stops sleeping — sorter_service's own sorting thread,
+the load-cell stream and the writers keep their real sleeps.
+
+Benchmarks (skipped with a reason when a model file or library is missing):
+  pulse_count          06 read_colour_channel (30 edges)
+  read_freq            sorter_service read_freq busy-poll loop (0.1 s window)
+  normalise            sorter_service normalize()
+  dt_predict_06        scaler + DecisionTree predict_proba (06_sorter_main)
+  dt_predict_service   pandas row + model.predict (sorter_service)
+  preprocess           06 capture_bean_image (segment, crop, resize)
+  tflite_invoke        CNN set_tensor + invoke + get_tensor
+  csv_open_per_row     old log_result: open/append/close per bean
+  csv_result_writer    ResultWriter.write (buffered, background thread)
+  e2e_06               one bean through 06: sensors → image → predict → sort → log
+  e2e_service          one sorter_service loop iteration
+
+HOW TO RUN (from the repo root):
+  python scripts/benchmark_sorter.py run [out.json]
+  python scripts/benchmark_sorter.py compare old.json new.json [--threshold 0.10]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import platform
+import tempfile
+import threading
+import importlib
+import contextlib
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim_gpio
+
+# ── Benchmark Configuration ────────────────────────────────────────────────────
+RESULTS_DIR         = "data/benchmarks"
+TIME_BUDGET_S       = 1.0       # per benchmark
+MAX_ITERATIONS      = 10_000
+WARMUP_ITERATIONS   = 3
+REGRESSION_THRESHOLD= 0.10      # 10% slower median = regression
+
+
+_real_sleep = time.sleep
+_no_sleep = threading.local()
+
+
+def _sleep(seconds):
+    if not getattr(_no_sleep, "on", False):
+        _real_sleep(seconds)
+
+
+@contextlib.contextmanager
+def no_sleep():
+    """
+    Disable time.sleep on the calling thread only, so hardware settling
+    delays are not measured and background threads are left alone.
+    """
+    time.sleep = _sleep             # idempotent; threads not in no_sleep() sleep as usual
+    _no_sleep.on = True
+    try:
+        yield
+    finally:
+        _no_sleep.on = False
+
+
+def measure(fn, budget_s=TIME_BUDGET_S, max_iter=MAX_ITERATIONS):
+    """Call fn repeatedly for ~budget_s; returns per-call latency stats (µs)."""
+    for _ in range(WARMUP_ITERATIONS):
+        fn()
+    samples = []
+    deadline = time.perf_counter() + budget_s
+    while len(samples) < max_iter and time.perf_counter() < deadline:
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    us = np.array(samples) / 1000
+    return {
+        "n"         : int(len(us)),
+        "median_us" : float(np.median(us)),
+        "mean_us"   : float(us.mean()),
+        "p95_us"    : float(np.percentile(us, 95)),
+        "min_us"    : float(us.min()),
+    }
+
+
+# ── Module loading ─────────────────────────────────────────────────────────────
+
+def load_sorter_main(gpio):
+    sim_gpio.install(gpio)
+    return importlib.import_module("06_sorter_main")
+
+
+def load_sorter_service(gpio, tmp):
+    """
+    Import sorter_service.py with simulated GPIO. Its sorting thread
+    starts at import; it is left running (real sleeps, ~1 bean / 1.3 s)
+    and does not affect the other measurements noticeably. Its results
+    database goes to the benchmark's temp directory, not the cwd.
+    """
+    sim_gpio.install(gpio)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import results_db
+    results_db.DB_PATH = os.path.join(tmp, "sorter_results.db")
+    return importlib.import_module("sorter_service")
+
+
+# ── Benchmarks ─────────────────────────────────────────────────────────────────
+
+def bench_pulse_count(ctx):
+    m, gpio = ctx["main"], ctx["gpio"]
+    with no_sleep():
+        return measure(lambda: m.read_colour_channel(gpio, gpio.LOW, gpio.LOW))
+
+
+def bench_read_freq(ctx):
+    svc = ctx["service"]
+    with no_sleep():
+        stats = measure(lambda: svc.read_freq(0.1), budget_s=1.0, max_iter=10)
+    # Busy-poll window — overshoot beyond the 100 ms target is the interesting bit
+    stats["overshoot_us"] = stats["median_us"] - 100_000
+    return stats
+
+
+def bench_normalise(ctx):
+    svc = ctx["service"]
+    raw = {"R": 1900.0, "G": 1800.0, "B": 2200.0}
+    return measure(lambda: svc.normalize(raw))
+
+
+def bench_dt_predict_06(ctx):
+    dt_model, scaler = ctx["dt_model"], ctx["scaler"]
+    sensor = np.array([[0.15, 120, 90, 70]])
+
+    def run():
+        dt_model.predict_proba(scaler.transform(sensor))
+    return measure(run)
+
+
+def bench_dt_predict_service(ctx):
+    import pandas as pd
+    svc = ctx["service"]
+    norm = {"R": 0.4, "G": 0.3, "B": 0.5}
+
+    def run():
+        X = pd.DataFrame([[norm['R'], norm['G'], norm['B']]], columns=['r', 'g', 'b'])
+        svc.model.predict(X)
+    return measure(run)
+
+
+def bench_preprocess(ctx):
+    from sim_camera import SimulatedCamera
+    from bean_segmenter import BeanSegmenter
+    m = ctx["main"]
+    cam = SimulatedCamera(resolution=(640, 480))
+    seg = BeanSegmenter()
+    seg.learn_background([cam.empty_frame()])
+    frame = cam.capture_array()
+
+    class FixedFrame:           # same frame every call → only preprocessing is timed
+        def capture_array(self, stream="main"):
+            return frame
+    return measure(lambda: m.capture_bean_image(FixedFrame(), seg))
+
+
+def bench_tflite_invoke(ctx):
+    interp = ctx["interpreter"]
+    inp = interp.get_input_details()[0]
+    out = interp.get_output_details()[0]
+    x = np.random.default_rng(0).random(inp["shape"]).astype(inp["dtype"])
+
+    def run():
+        interp.set_tensor(inp["index"], x)
+        interp.invoke()
+        interp.get_tensor(out["index"])
+    return measure(run)
+
+
+def bench_csv_open_per_row(ctx):
+    from datetime import datetime
+    path = os.path.join(ctx["tmp"], "per_row.csv")
+
+    def run():
+        with open(path, "a", newline="") as f:
+            csv.writer(f).writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                    "bean_00001", 0.15, 120, 90, 70,
+                                    0.9, 0.8, 0.86, "GOOD"])
+    return measure(run)
+
+
+def bench_csv_result_writer(ctx):
+    from result_writer import ResultWriter
+    writer = ResultWriter(os.path.join(ctx["tmp"], "buffered.csv"), ["timestamp"] + ["x"] * 9)
+    try:
+        return measure(lambda: writer.write("bean_00001", 0.15, 120, 90, 70,
+                                            0.9, 0.8, 0.86, "GOOD"))
+    finally:
+        writer.close()
+        stats = writer.stats()
+        print(f"    (writer: {stats['flushes']} flushes, avg {stats['avg_flush_ms']:.2f} ms)")
+
+
+def bench_e2e_06(ctx):
+    from sim_camera import SimulatedCamera
+    from bean_segmenter import BeanSegmenter
+    from result_writer import ResultWriter
+    from load_cell import LoadCellStream
+    from acquisition import AcquisitionCoordinator
+    m, gpio = ctx["main"], ctx["gpio"]
+    hx = sim_gpio.SimHX711()
+    scale = LoadCellStream(lambda: hx.get_weight_mean(readings=1),
+                           interval_s=0.1).start()     # HX711 rate: 10 SPS
+    cam = SimulatedCamera(resolution=(640, 480))
+    seg = BeanSegmenter()
+    seg.learn_background([cam.empty_frame()])
+    servo = gpio.PWM(m.CONFIG["SERVO_PIN"], 50)
+    results = ResultWriter(os.path.join(ctx["tmp"], "e2e.csv"), ["timestamp"] + ["x"] * 9)
+    m.CONFIG["LED_PIN"] = m.CONFIG["LED_PIN"] or 26
+    interp = ctx["interpreter"]
+    inputs, outputs = interp.get_input_details(), interp.get_output_details()
+    acquire = AcquisitionCoordinator({
+        "colour": lambda: m.read_colour(gpio),
+        "image" : lambda: m.capture_bean_image(cam, seg),
+        "weight": lambda: m.read_weight(scale),
+    }, inline="colour")
+
+    def one_bean():
+        bundle = m.read_all_sensors(gpio, acquire)
+        (r, g, b), weight, image = bundle["colour"], bundle["weight"], bundle["image"]
+        decision, score, dt_p, cnn_p = m.predict_bean(
+            (weight, r, g, b), image, ctx["dt_model"], ctx["scaler"],
+            interp, inputs, outputs)
+        m.trigger_sort(servo, decision)
+        m.log_result(results, "bean_00001", weight, r, g, b, dt_p, cnn_p, score, decision)
+
+    try:
+        with no_sleep():
+            return measure(one_bean, budget_s=3.0)
+    finally:
+        acquire.close()
+        scale.stop()
+        results.close()
+
+
+def bench_e2e_service(ctx):
+    """
+    One sorting_loop iteration, reproduced step by step with sleeps disabled.
+    Publishing goes to private instances — the service's own broadcaster,
+    history and snapshot have a single writer, its sorting thread.
+    """
+    import pandas as pd
+    from event_stream import EventBroadcaster
+    from history_ring import HistoryRing
+    from status_snapshot import StatusSnapshot
+    svc = ctx["service"]
+    events, history = EventBroadcaster(), HistoryRing()
+    snapshot = StatusSnapshot({"prediction": "WAITING"})
+
+    def one_bean():
+        raw = {}
+        for c in ['R', 'G', 'B']:
+            svc.set_filter(c)
+            raw[c] = svc.read_freq()
+        norm = svc.normalize(raw)
+        X = pd.DataFrame([[norm['R'], norm['G'], norm['B']]], columns=['r', 'g', 'b'])
+        pred = str(svc.model.predict(X)[0])
+        result = {"raw": raw, "normalized": norm, "prediction": pred,
+                  "timestamp": time.time()}
+        seq = events.publish(result)
+        history.append(seq, result["timestamp"], raw, norm, pred)
+        snapshot.publish(result, seq)
+        svc.move_servo_smooth(0 if pred == "BAD" else 180)
+        svc.move_servo_smooth(90)
+
+    with no_sleep():
+        stats = measure(one_bean, budget_s=3.0, max_iter=10)
+    stats["overhead_us"] = stats["median_us"] - 300_000     # minus 3 x 100 ms windows
+    return stats
+
+
+BENCHMARKS = [
+    ("pulse_count",         bench_pulse_count,          ("main",)),
+    ("read_freq",           bench_read_freq,            ("service",)),
+    ("normalise",           bench_normalise,            ("service",)),
+    ("dt_predict_06",       bench_dt_predict_06,        ("dt_model",)),
+    ("dt_predict_service",  bench_dt_predict_service,   ("service",)),
+    ("preprocess",          bench_preprocess,           ("main",)),
+    ("tflite_invoke",       bench_tflite_invoke,        ("interpreter",)),
+    ("csv_open_per_row",    bench_csv_open_per_row,     ()),
+    ("csv_result_writer",   bench_csv_result_writer,    ()),
+    ("e2e_06",              bench_e2e_06,               ("main", "dt_model", "interpreter")),
+    ("e2e_service",         bench_e2e_service,          ("service",)),
+]
+
+
+# ── Runner ─────────────────────────────────────────────────────────────────────
+
+def build_context():
+    """Load whatever is available; missing pieces are recorded, not fatal."""
+    ctx = {"gpio": sim_gpio.SimGPIO(), "tmp": tempfile.mkdtemp(prefix="sorter_bench_")}
+    missing = {}
+    loaders = {
+        "main"       : lambda: load_sorter_main(ctx["gpio"]),
+        "service"    : lambda: load_sorter_service(ctx["gpio"], ctx["tmp"]),
+        "dt_model"   : lambda: __import__("joblib").load("models/decision_tree_model.pkl"),
+        "scaler"     : lambda: __import__("joblib").load("models/scaler.pkl"),
+        "interpreter": lambda: _load_interpreter("models/cnn_model.tflite"),
+    }
+    for key, load in loaders.items():
+        try:
+            ctx[key] = load()
+        except Exception as e:
+            missing[key] = f"{type(e).__name__}: {e}"
+    if "scaler" in missing and "dt_model" not in missing:
+        missing["dt_model"] = missing["scaler"]
+    return ctx, missing
+
+
+def _load_interpreter(path):
+    from batch_classifier import load_interpreter
+    interp = load_interpreter(path)
+    interp.allocate_tensors()
+    return interp
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_all(out_path=None, only=None):
+    ctx, missing = build_context()
+    results = {}
+    for name, fn, needs in BENCHMARKS:
+        if only and name not in only:
+            continue
+        lacking = [n for n in needs if n in missing]
+        if lacking:
+            results[name] = {"skipped": missing[lacking[0]]}
+            print(f"  {name:<20} skipped ({missing[lacking[0]]})")
+            continue
+        try:
+            results[name] = fn(ctx)
+            r = results[name]
+            print(f"  {name:<20} median {r['median_us']:>11.1f} µs   "
+                  f"p95 {r['p95_us']:>11.1f} µs   (n={r['n']})")
+        except Exception as e:
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            print(f"  {name:<20} failed ({e})")
+
+    report = {
+        "meta": {
+            "timestamp" : time.strftime("%Y-%m-%d %H:%M:%S"),
+            "git_rev"   : _git_rev(),
+            "python"    : platform.python_version(),
+            "machine"   : platform.machine(),
+            "platform"  : platform.platform(),
+        },
+        "results": results,
+    }
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out_path = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n  Results saved → {out_path}")
+    return report
+
+
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD) -> int:
+    """Print median changes; returns the number of regressions (for exit codes)."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"\n  {old['meta'].get('git_rev') or old_path} → {new['meta'].get('git_rev') or new_path}")
+    if old["meta"].get("machine") != new["meta"].get("machine"):
+        print("  ⚠ Runs are from different machines — differences may not be meaningful")
+    print(f"\n  {'Benchmark':<20} {'old µs':>11} {'new µs':>11} {'change':>8}")
+    regressions = 0
+    for name in new["results"]:
+        a, b = old["results"].get(name, {}), new["results"][name]
+        if "median_us" not in a or "median_us" not in b:
+            print(f"  {name:<20} {'—':>11} {'—':>11}   (not comparable)")
+            continue
+        change = (b["median_us"] - a["median_us"]) / a["median_us"]
+        flag = ""
+        if change > threshold:
+            flag = "  ✗ REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  ✓ faster"
+        print(f"  {name:<20} {a['median_us']:>11.1f} {b['median_us']:>11.1f} "
+              f"{change * 100:>+7.1f}%{flag}")
+    print(f"\n  {regressions} regression(s) above {threshold * 100:.0f}%")
+    return regressions
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "compare":
+        threshold = REGRESSION_THRESHOLD
+        if "--threshold" in args:
+            threshold = float(args[args.index("--threshold") + 1])
+        sys.exit(1 if compare(args[1], args[2], threshold) else 0)
+    out = args[1] if len(args) > 1 and args[0] == "run" else None
+    print("\n  Coffee sorter benchmarks (simulated hardware)\n")
+    run_all(out)
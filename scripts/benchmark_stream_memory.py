@@ -0,0 +1,77 @@
+"""
+benchmark_stream_memory.py — Memory use of CameraModule streaming APIs
+Group Trailblazers | Uganda Christian University
+
+Compares resident memory (RSS) of:
+  - capture_stream(duration)  — keeps every frame in a list
+  - iter_stream(duration)     — reuses a fixed pool of buffers
+
+HOW TO RUN (on the Pi, camera connected):
+  python scripts/benchmark_stream_memory.py [iter_seconds] [list_seconds]
+  e.g. python scripts/benchmark_stream_memory.py 300 10
+
+The list-based capture is kept short on purpose — at 640x480 RGB each
+frame is ~0.9 MB, so a long run would exhaust the Pi's RAM.
+"""
+
+import sys
+import time
+from camera_module import CameraModule
+
+RESOLUTION      = (640, 480)
+SAMPLE_EVERY_S  = 1.0
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux /proc)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_iter_stream(cam, seconds):
+    samples = []
+    start = last = time.time()
+    frames = 0
+    for frame in cam.iter_stream(duration=seconds):
+        frames += 1
+        now = time.time()
+        if now - last >= SAMPLE_EVERY_S:
+            samples.append((now - start, frames, rss_mb()))
+            last = now
+    return frames, samples
+
+
+def run_capture_stream(cam, seconds):
+    before = rss_mb()
+    frames = cam.capture_stream(duration=seconds)
+    after = rss_mb()
+    n = len(frames)
+    del frames
+    return n, before, after
+
+
+if __name__ == "__main__":
+    iter_s = float(sys.argv[1]) if len(sys.argv) > 1 else 120
+    list_s = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with CameraModule(resolution=RESOLUTION) as cam:
+        print(f"\n  Baseline RSS: {rss_mb():.1f} MB")
+
+        print(f"\n  capture_stream({list_s:.0f}s) — list of frames")
+        n, before, after = run_capture_stream(cam, list_s)
+        print(f"    {n} frames, RSS {before:.1f} → {after:.1f} MB "
+              f"(+{after - before:.1f} MB, ~{(after - before) / max(n, 1):.2f} MB/frame)")
+
+        print(f"\n  iter_stream({iter_s:.0f}s) — fixed buffer pool")
+        n, samples = run_iter_stream(cam, iter_s)
+        print(f"    {'t (s)':>7} {'frames':>8} {'RSS (MB)':>9}")
+        step = max(1, len(samples) // 10)
+        for t, f, mb in samples[::step]:
+            print(f"    {t:>7.0f} {f:>8} {mb:>9.1f}")
+        if samples:
+            rss = [mb for _, _, mb in samples]
+            print(f"    {n} frames, RSS min {min(rss):.1f} / max {max(rss):.1f} MB "
+                  f"(spread {max(rss) - min(rss):.1f} MB)")
@@ -1,8 +1,11 @@
 import time
+import queue
 import logging
-from picamera2 import Picamera2
+from collections import deque
+from picamera2 import Picamera2, MappedArray
 import cv2
 import numpy as np
+from frame_ring import FrameRing, picamera2_grabber, RING_DEPTH
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,6 +42,9 @@ class CameraModule:
         """
         self.resolution = resolution
         self.picam2 = None
+        self._ring = None
+        self._listeners = []            # fed every ring frame (see _iter_ring)
+        self._frame_shape = None
         self._is_initialized = False
         
         try:
@@ -80,13 +86,56 @@ class CameraModule:
         """Check if camera is properly initialized"""
         return self._is_initialized
     
-    def capture_image(self, filename=None):
+    def start_continuous(self, depth=RING_DEPTH):
+        """
+        Start a background capture thread filling a ring of preallocated frames.
+        
+        While running, capture_image() returns the buffered frame instead of
+        waiting for a new exposure, and the streaming methods receive frames
+        from the ring's capture loop — only one thread calls capture_request().
+        
+        Args:
+            depth (int): Number of frames kept in the ring.
+        
+        Raises:
+            CameraError: If the camera is not initialized
+        """
+        if not self._is_initialized:
+            raise CameraError("Camera not initialized")
+        
+        if self._ring is None:
+            probe = self.picam2.capture_array()
+            self._frame_shape = (probe.shape, probe.dtype)
+            self._ring = FrameRing(picamera2_grabber(self.picam2, "main", self._listeners),
+                                   probe.shape, probe.dtype, depth)
+        self._ring.start()
+    
+    def stop_continuous(self):
+        """Stop the background capture thread (the ring memory is kept)."""
+        if self._ring:
+            self._ring.stop()
+    
+    def ring_stats(self):
+        """
+        Get continuous-capture statistics.
+        
+        Returns:
+            dict: depth, capacity, captured, dropped, newest_age_ms,
+                  oldest_age_ms — or None if continuous capture was never started
+        """
+        return self._ring.stats() if self._ring else None
+    
+    def capture_image(self, filename=None, at_ns=None):
         """
         Capture a single image from the camera.
         
         Args:
             filename (str, optional): Path to save the image. 
                                       If None, image is not saved to disk.
+            at_ns (int, optional): With continuous capture running, return the
+                                   buffered frame closest to this
+                                   time.monotonic_ns() timestamp instead of
+                                   the newest one.
         
         Returns:
             numpy.ndarray: Captured image as RGB array
@@ -98,7 +147,14 @@ class CameraModule:
             raise CameraError("Camera not initialized")
         
         try:
-            array = self.picam2.capture_array()
+            array = None
+            if self._ring and self._ring.is_running():
+                if at_ns is None:
+                    array, _ = self._ring.latest()
+                else:
+                    array, _ = self._ring.frame_at(at_ns)
+            if array is None:
+                array = self.picam2.capture_array()
             
             if filename:
                 # Convert RGB to BGR for OpenCV
@@ -124,10 +180,20 @@ class CameraModule:
         
         Raises:
             CameraError: If stream capture fails
+        
+        Note:
+            Every frame is kept in memory. For long captures use
+            iter_stream() or stream_to(), which reuse a fixed buffer pool.
         """
         if not self._is_initialized:
             raise CameraError("Camera not initialized")
         
+        if self._ring_running():
+            # The ring thread owns the camera — take copies of its frames
+            frames = [frame.copy() for frame in self.iter_stream(duration=duration)]
+            logger.info(f"Captured {len(frames)} frames")
+            return frames
+        
         frames = []
         start_time = time.time()
         
@@ -145,6 +211,154 @@ class CameraModule:
             logger.error(f"Failed to capture stream: {e}")
             raise CameraError(f"Stream capture failed: {e}")
     
+    @staticmethod
+    def _copy_main(request, out):
+        """Copy a request's main stream into `out` without allocating a new array."""
+        with MappedArray(request, "main") as mapped:
+            if mapped.array.shape == out.shape:
+                np.copyto(out, mapped.array)
+                return
+        # Stream layout differs from `out` (e.g. stride padding)
+        np.copyto(out, request.make_array("main"))
+    
+    def _ring_running(self):
+        return self._ring is not None and self._ring.is_running()
+    
+    def _iter_camera(self, pool, every):
+        """Frames captured on this thread into `pool` in turn (no ring running)."""
+        seen = 0
+        index = 0
+        while True:
+            request = self.picam2.capture_request()
+            try:
+                seen += 1
+                if every > 1 and (seen - 1) % every:
+                    continue                # skipped without copying
+                buf = pool[index % len(pool)]
+                self._copy_main(request, buf)
+            finally:
+                request.release()
+            index += 1
+            yield buf
+    
+    def _iter_ring(self, pool, every):
+        """
+        Frames handed over by the ring's capture loop (a frame listener, as
+        in camera_module2). `pool` has two buffers more than the caller
+        holds, so the listener always has one to copy into; if the caller
+        falls further behind, frames are dropped instead of queued.
+        """
+        held = len(pool) - 2
+        free, ready = queue.Queue(), queue.Queue()
+        for i in range(len(pool)):
+            free.put(i)
+        seen = [0]
+        
+        def listener(request, ts):
+            seen[0] += 1
+            if every > 1 and (seen[0] - 1) % every:
+                return
+            try:
+                i = free.get_nowait()
+            except queue.Empty:
+                return
+            self._copy_main(request, pool[i])
+            ready.put(i)
+        
+        in_use = deque()
+        self._listeners.append(listener)
+        try:
+            while True:
+                try:
+                    i = ready.get(timeout=1.0)
+                except queue.Empty:
+                    if not self._ring_running():
+                        raise CameraError("Continuous capture stopped while streaming")
+                    continue
+                in_use.append(i)
+                if len(in_use) > held:
+                    free.put(in_use.popleft())
+                yield pool[i]
+        finally:
+            self._listeners.remove(listener)
+    
+    def iter_stream(self, duration=None, max_frames=None, pool_size=4, every=1):
+        """
+        Stream frames with bounded memory.
+        
+        Frames are written into a fixed pool of `pool_size` preallocated
+        buffers which are reused in turn, so memory stays flat however long
+        the capture runs. A yielded frame is only valid until `pool_size`
+        more frames have been yielded — copy it if you need to keep it.
+        
+        Args:
+            duration (float, optional): Stop after this many seconds.
+            max_frames (int, optional): Stop after yielding this many frames.
+            pool_size (int): Number of reused frame buffers.
+            every (int): Yield every Nth camera frame, skipping the rest
+                         without copying them.
+        
+        Yields:
+            numpy.ndarray: Frame (a view of one pool buffer)
+        
+        Raises:
+            CameraError: If stream capture fails
+        """
+        if not self._is_initialized:
+            raise CameraError("Camera not initialized")
+        
+        if self._ring_running():
+            # The ring thread is the only caller of capture_request()
+            shape, dtype = self._frame_shape
+            pool = np.empty((pool_size + 2,) + shape, dtype=dtype)
+            source = self._iter_ring(pool, every)
+        else:
+            probe = self.picam2.capture_array()
+            pool = np.empty((pool_size,) + probe.shape, dtype=probe.dtype)
+            del probe
+            source = self._iter_camera(pool, every)
+        
+        start_time = time.time()
+        yielded = 0
+        
+        try:
+            logger.info(f"Streaming (pool of {pool_size} buffers, every {every} frame(s))")
+            while True:
+                if duration is not None and time.time() - start_time >= duration:
+                    break
+                if max_frames is not None and yielded >= max_frames:
+                    break
+                
+                yield next(source)
+                yielded += 1
+            
+            logger.info(f"Streamed {yielded} frames")
+            
+        except Exception as e:
+            logger.error(f"Failed to stream: {e}")
+            raise CameraError(f"Stream capture failed: {e}")
+        finally:
+            source.close()
+    
+    def stream_to(self, callback, duration=None, max_frames=None, pool_size=4, every=1):
+        """
+        Stream frames to a consumer callback with bounded memory.
+        
+        Args:
+            callback (callable): Called as callback(frame, index). Return False
+                                 to stop the stream early.
+            duration, max_frames, pool_size, every: As for iter_stream().
+        
+        Returns:
+            int: Number of frames delivered
+        """
+        count = 0
+        for frame in self.iter_stream(duration, max_frames, pool_size, every):
+            count += 1
+            if callback(frame, count - 1) is False:
+                break
+        return count
+    
     def capture_and_process(self, processing_fn=None):
         """
         Capture an image and optionally process it.
@@ -224,6 +438,7 @@ class CameraModule:
         if self._is_initialized:
             try:
                 logger.info("Stopping camera")
+                self.stop_continuous()
                 self.picam2.stop()
                 self.picam2.close()
                 self._is_initialized = False
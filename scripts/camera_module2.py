@@ -4,6 +4,11 @@ import json
 import numpy as np
 from picamera2 import Picamera2
 from libcamera import controls as libcontrols
+from frame_ring import FrameRing, picamera2_grabber, RING_DEPTH
+from lores_detector import LoresBeanDetector
+from bean_segmenter import BeanSegmenter
+from image_writer import AsyncImageWriter
+from bean_archive import BeanArchive, ARCHIVE_DIR
 
 # ── Camera Configuration ───────────────────────────────────────────────────────
 CAPTURE_RESOLUTION  = (1280, 960)   # lower than max → faster ISP, still good
@@ -11,6 +16,11 @@ PREVIEW_RESOLUTION  = (320, 240)    # low-res preview stream (optional)
 WARMUP_FRAMES       = 20            # frames to capture and discard on startup
 SETTLE_TIME         = 0.3           # seconds to wait after controls change
 ROI_CONFIG_FILE     = "models/roi_config.json"
+AUTO_CROP           = True          # segment the bean and crop tightly around it
+BACKGROUND_FRAMES   = 5             # empty-belt frames used for the background model
+SAVE_ASYNC          = True          # encode/write JPEGs on a background thread
+USE_ARCHIVE         = False         # pack images into bean_archive chunks instead of
+                                    # writing save_path (needs SAVE_ASYNC)
 
 # ── Exposure settings ──────────────────────────────────────────────────────────
 # Set USE_FIXED_EXPOSURE = True once you have good lighting set up.
@@ -28,6 +38,13 @@ class CameraModule:
 
     def __init__(self):
         self._cam = None
+        self._ring = None
+        self._detector = None
+        self._listeners = []            # fed every ring frame (see start_presence_detector)
+        self.segmenter = BeanSegmenter()
+        self.last_segmentation = None
+        self.archive = BeanArchive(ARCHIVE_DIR) if SAVE_ASYNC and USE_ARCHIVE else None
+        self._writer = AsyncImageWriter(archive=self.archive) if SAVE_ASYNC else None
         self._roi = self._load_roi()
         self._open()
 
@@ -81,33 +98,123 @@ class CameraModule:
             self._cam.capture_array("main")
         print("[Camera] Ready.")
 
+    def learn_background(self, frames: int = BACKGROUND_FRAMES):
+        """Capture the empty belt so the segmenter can difference against it."""
+        self.segmenter.learn_background(
+            [self._cam.capture_array("main") for _ in range(frames)])
+
+    # ── Continuous capture ─────────────────────────────────────────────────────
+
+    def start_continuous(self, depth: int = RING_DEPTH):
+        """
+        Start streaming into a background ring of `depth` preallocated frames.
+        Afterwards capture_bean() returns a buffered frame instead of blocking.
+        """
+        if self._ring is None:
+            probe = self._cam.capture_array("main")
+            self._ring = FrameRing(picamera2_grabber(self._cam, "main", self._listeners),
+                                   probe.shape, probe.dtype, depth)
+        self._ring.start()
+
+    def stop_continuous(self):
+        if self._ring:
+            self._ring.stop()
+
+    def ring_stats(self) -> dict | None:
+        """Ring depth, captured/dropped frame counts and frame age (None if not running)."""
+        return self._ring.stats() if self._ring else None
+
+    # ── Bean presence (lores stream) ───────────────────────────────────────────
+
+    def start_presence_detector(self, on_centred=None) -> LoresBeanDetector:
+        """
+        Detect beans on the lores YUV420 stream instead of the IR sensor.
+        on_centred(event) fires when a bean is centred — e.g. pass
+        lambda ev: cam.capture_bean(at_ns=ev["timestamp_ns"]).
+
+        Continuous capture is started too: its thread is the only one
+        calling capture_request() and hands each frame's lores plane to
+        the detector, which then never competes with it for frames.
+        """
+        if self._detector is None:
+            self.start_continuous()
+            self._detector = LoresBeanDetector(self._cam, "lores", on_centred, shared=True)
+            self._listeners.append(self._detector.feed)
+        self._detector.start()
+        return self._detector
+
+    def wait_for_bean(self, timeout: float = 30.0) -> dict | None:
+        """Drop-in for IRSensor.wait_for_bean(): returns the centred event or None."""
+        if self._detector is None:
+            self.start_presence_detector()
+        return self._detector.wait_for_bean(timeout)
+
     # ── Capture ────────────────────────────────────────────────────────────────
 
-    def capture_bean(self, save_path: str | None = None) -> np.ndarray:
+    def capture_bean(self, save_path: str | None = None,
+                     at_ns: int | None = None, label: str | None = None,
+                     predicted: str | None = None) -> np.ndarray:
         """
         Capture a single bean image.
 
         Returns a numpy array (H×W×3, uint8, RGB).
-        If save_path is given, the image is also written as JPEG.
+        If save_path is given, the image is also written as JPEG — or,
+        with USE_ARCHIVE, packed into the bean archive under the file stem
+        of save_path, with `label` / `predicted` setting its priority.
 
-        IMPORTANT: Call this only AFTER the IR sensor confirms a bean is present
-                   so the bean is centred under the camera.
-        """
-        # Let AE settle for this bean's reflectance
-        time.sleep(SETTLE_TIME)
+        With AUTO_CROP the frame is cropped to the segmented bean (details
+        in self.last_segmentation); if no bean is found the static
+        roi_config.json crop is used instead.
 
-        frame = self._cam.capture_array("main")  # RGB888 numpy array
+        With continuous capture running, the frame is taken from the ring:
+        the one closest to `at_ns` (time.monotonic_ns() clock, e.g. the
+        bean's predicted arrival time) or the newest frame if at_ns is None.
 
-        # ── Apply ROI crop if configured ───────────────────────────────────────
-        if self._roi:
+        IMPORTANT: Call this only AFTER the IR sensor (or wait_for_bean())
+                   confirms a bean is present so the bean is centred under
+                   the camera.
+        """
+        frame = None
+        if self._ring and self._ring.is_running():
+            if at_ns is None:
+                frame, _ = self._ring.latest()
+            else:
+                frame, _ = self._ring.frame_at(at_ns)
+
+        if frame is None:
+            # Let AE settle for this bean's reflectance
+            time.sleep(SETTLE_TIME)
+            frame = self._cam.capture_array("main")  # RGB888 numpy array
+
+        # ── Tight crop around the segmented bean, else the static ROI ──────────
+        self.last_segmentation = None
+        if AUTO_CROP:
+            seg = self.segmenter.segment(frame)
+            if seg:
+                self.last_segmentation = seg
+                frame = self.segmenter.crop(frame, seg)
+        if self.last_segmentation is None and self._roi:
             frame = self._apply_roi(frame)
 
-        # ── Save image if requested ────────────────────────────────────────────
+        # ── Save image if requested (off the hot path when SAVE_ASYNC) ─────────
         if save_path:
-            self._save(frame, save_path)
+            if self._writer:
+                self._writer.submit(frame, save_path,
+                                    label=label, predicted=predicted)
+            else:
+                self._save(frame, save_path)
 
         return frame
 
+    def label_bean(self, save_path: str, label: str | None = None,
+                   predicted: str | None = None) -> bool:
+        """
+        Record the prediction (and the true label, if known) for a bean
+        captured earlier with this save_path, once the sorter has it.
+        Only the archive keeps labels; returns False without one.
+        """
+        return self._writer.annotate(save_path, label, predicted) if self._writer else False
+
     def _apply_roi(self, frame: np.ndarray) -> np.ndarray:
         """Crop frame to the ROI rectangle specified in roi_config.json."""
         roi = self._roi
@@ -147,6 +254,10 @@ class CameraModule:
             Image.fromarray(frame).save(path)
         print(f"[Camera] Saved → {path}")
 
+    def writer_stats(self) -> dict | None:
+        """Background image writer queue depth, written and dropped counts."""
+        return self._writer.stats() if self._writer else None
+
     def capture_image(self, save_path: str | None = None) -> np.ndarray:
         """Alias kept for backward compatibility with old sorter_main.py."""
         return self.capture_bean(save_path=save_path)
@@ -154,6 +265,15 @@ class CameraModule:
     # ── Cleanup ────────────────────────────────────────────────────────────────
 
     def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self.archive:
+            self.archive.close()
+            self.archive = None
+        if self._detector:
+            self._detector.stop()
+        self.stop_continuous()
         if self._cam:
             self._cam.stop()
             self._cam.close()
@@ -176,5 +296,9 @@ if __name__ == "__main__":
         print(f"  Shot {i}: shape={frame.shape}  min={frame.min()}  max={frame.max()}")
         time.sleep(1)
 
+    archived = cam.archive is not None
     cam.close()
-    print("\nDone. Check the test_shots/ folder.")
+    if archived:
+        print(f"\nDone. Shots packed into {ARCHIVE_DIR} (USE_ARCHIVE = True).")
+    else:
+        print("\nDone. Check the test_shots/ folder.")
@@ -21,6 +21,8 @@ from pathlib import Path
 
 # Import our modules
 from camera_module import CameraModule, CameraError
+from bean_segmenter import BeanSegmenter
+from ir_sensor import IRSensor
 from config import (
     # Color sensor pins
     COLOR_S0, COLOR_S1, COLOR_S2, COLOR_S3, COLOR_OUT,
@@ -34,7 +36,7 @@ from config import (
     # IR sensor
     IR_SENSOR, IR_DEBOUNCE_MS,
     # Timing
-    MAIN_LOOP_DELAY, BEAN_PROCESS_TIME,
+    BEAN_PROCESS_TIME,
     LOG_LEVEL, LOG_FILE,
     # Detection mode
     DETECTION_MODE
@@ -79,26 +81,22 @@ logger = None
 servo = None
 camera = None
 model = None
-ir_sensor_state = {
-    'last_trigger_time': 0,
-    'last_state': None,
-    'stable_count': 0,
-    'last_reading_time': 0
-}
+segmenter = BeanSegmenter()
+ir = None
 
 
 # ============= GPIO SETUP =============
 def setup_gpio():
     """Initialize all GPIO pins"""
-    global servo
+    global servo, ir
     
     logger.info("Setting up GPIO pins...")
     
     GPIO.setwarnings(False)
     GPIO.setmode(GPIO.BCM)
     
-    # IR Sensor
-    GPIO.setup(IR_SENSOR, GPIO.IN)
+    # IR Sensor (edge interrupts, debounced by edge timing)
+    ir = IRSensor(pin=IR_SENSOR, debounce_s=IR_DEBOUNCE_MS / 1000)
     logger.debug(f"IR_SENSOR configured on GPIO {IR_SENSOR}")
     
     # LEDs
@@ -136,6 +134,8 @@ def cleanup_gpio():
     try:
         if servo:
             servo.stop()
+        if ir:
+            ir.cleanup()
         GPIO.cleanup()
         logger.info("GPIO cleanup complete")
     except Exception as e:
@@ -282,14 +282,18 @@ def detect_bean_color_from_image(image):
     
     try:
         # Preprocess image - extract color features
-        # Calculate average color in the center region
-        h, w = image.shape[:2]
-        center_region = image[h//4:3*h//4, w//4:3*w//4]
-        
-        # Calculate mean color values
-        avg_r = np.mean(center_region[:, :, 0])
-        avg_g = np.mean(center_region[:, :, 1])
-        avg_b = np.mean(center_region[:, :, 2])
+        # Average only the segmented bean pixels, not the belt around it
+        seg = segmenter.segment(image)
+        if seg:
+            avg_r, avg_g, avg_b = segmenter.masked_mean_rgb(image, seg)
+        else:
+            # No bean found - fall back to the center region
+            logger.debug("Segmentation found no bean, using center region")
+            h, w = image.shape[:2]
+            center_region = image[h//4:3*h//4, w//4:3*w//4]
+            avg_r = np.mean(center_region[:, :, 0])
+            avg_g = np.mean(center_region[:, :, 1])
+            avg_b = np.mean(center_region[:, :, 2])
         
         # Create feature vector
         features = np.array([[avg_r, avg_g, avg_b]])
@@ -306,31 +310,6 @@ def detect_bean_color_from_image(image):
         return "unknown"
 
 
-# ============= IR SENSOR DEBOUNCING =============
-def read_ir_sensor_debounced():
-    """Read IR sensor with debouncing"""
-    global ir_sensor_state
-    
-    current_time = time.time() * 1000
-    current_state = GPIO.input(IR_SENSOR)
-    
-    if current_state != ir_sensor_state['last_state']:
-        ir_sensor_state['last_reading_time'] = current_time
-        ir_sensor_state['last_state'] = current_state
-        ir_sensor_state['stable_count'] = 0
-        return False
-    
-    time_since_change = current_time - ir_sensor_state['last_reading_time']
-    if time_since_change >= IR_DEBOUNCE_MS:
-        if ir_sensor_state['stable_count'] < 2:
-            ir_sensor_state['stable_count'] += 1
-        
-        if ir_sensor_state['stable_count'] >= 1:
-            return current_state == 0
-    
-    return False
-
-
 # ============= MAIN SORTING LOGIC =============
 def process_bean():
     """Process a single bean with both sensors"""
@@ -427,6 +406,10 @@ def run():
             try:
                 camera = CameraModule(resolution=(640, 480))
                 logger.info("Camera initialized successfully")
+                
+                # Learn the empty belt for bean segmentation
+                segmenter.learn_background(
+                    [camera.capture_image() for _ in range(5)])
             except CameraError as e:
                 logger.error(f"Camera initialization failed: {e}")
                 camera = None
@@ -439,13 +422,20 @@ def run():
         
         logger.info("Coffee Sorter Running... Press Ctrl+C to stop.")
         
-        # Main loop
+        # Main loop — blocks on the IR event queue, no polling
         while True:
             try:
-                if read_ir_sensor_debounced():
-                    process_bean()
-                
-                time.sleep(MAIN_LOOP_DELAY)
+                # 'enter' is only published once the beam has been blocked for
+                # MIN_BEAN_TIME, so glitches never reach process_bean()
+                event = ir.get_event(timeout=1.0)
+                if event and event['event'] == 'enter':
+                    if ir.is_fresh(event):
+                        process_bean()
+                    else:
+                        logger.warning(f"Skipping stale IR event for bean {event['bean']} "
+                                       f"(queued while the last bean was processed)")
+                elif event and event['event'] == 'glitch':
+                    logger.debug(f"IR glitch ignored ({event['duration_s'] * 1000:.1f} ms)")
                 
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
@@ -94,6 +94,9 @@ CAMERA = {
     "WARMUP_TIME"   : 2,            # Seconds for camera to initialise
     "EXPOSURE_TIME" : 50000,        # Microseconds (higher = brighter)
     "ANALOGUE_GAIN" : 4.0,          # Gain (higher = brighter, more noise)
+    "BELT_AXIS"     : 0,            # Belt direction in the image: 0 = x (columns), 1 = y (rows)
+    "GATE_POSITION" : 1.6,          # Gate distance from the frame's upstream edge, in frame
+                                    # lengths along BELT_AXIS (widths if 0, heights if 1)
 }
 
 # ================================================================
@@ -112,6 +115,10 @@ CONVEYOR = {
 
 # ================================================================
 # ML MODEL SETTINGS
+# Reference values only — 06_sorter_main.py keeps its own copies
+# in CONFIG and overrides them at startup with the tuned values in
+# PATHS["FUSION_CFG"] (written by 05_model_fusion.py and
+# scripts/fusion_optimiser.py). Nothing imports ML directly.
 # ================================================================
 ML = {
     "DT_WEIGHT"       : 0.65,   # Decision Tree contribution to fusion
@@ -170,7 +177,8 @@ PATHS = {
     "FUSION_CFG"  : "models/fusion_config.json",
     "LOG_CSV"     : "data/sorting_results.csv",
     "LOG_TXT"     : "data/sorter_log.txt",
-    "IMAGES_DIR"  : "data/bean_images/",
+    "IMAGES_DIR"  : "data/bean_images/",    # legacy one-file-per-bean images
+    "ARCHIVE_DIR" : "data/bean_archive/",   # chunked archive (bean_archive.py)
 }
 
 # ================================================================
@@ -181,6 +189,8 @@ SYSTEM = {
     "LOG_LEVEL"     : "INFO",   # INFO, DEBUG, WARNING, ERROR
     "SAVE_IMAGES"   : True,     # Save captured bean images to disk
     "SESSION_NAME"  : "default",# Name for this sorting session
+    "REALTIME_MODE" : False,    # sorter_service.py: pin sorting loop, raise priority, hold off GC
+    "REALTIME_CPU"  : 3,        # Core the sorting loop is pinned to
 }
 
 # ================================================================
@@ -0,0 +1,182 @@
+"""
+frame_ring.py — Continuous-capture frame ring buffer for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+A background thread keeps the camera streaming into a fixed number of
+preallocated frame slots, each tagged with its sensor timestamp.
+When the IR sensor (or the belt model) says a bean is under the camera
+at time t, the sorter picks the slot closest to t instead of calling
+capture_array() and waiting for the next exposure.
+
+Timestamps are nanoseconds on the time.monotonic_ns() clock — the same
+clock Picamera2 uses for the "SensorTimestamp" metadata field.
+
+The ring's thread is then the camera's only capture loop: other
+consumers of the same frames (e.g. lores_detector on the lores stream)
+register as listeners of picamera2_grabber instead of calling
+capture_request() from a second thread.
+"""
+
+import time
+import threading
+import numpy as np
+
+# ── Ring Configuration ─────────────────────────────────────────────────────────
+RING_DEPTH        = 8      # frames kept in memory (~0.25 s at 30 fps)
+DROP_GAP_FACTOR   = 1.5    # gap > 1.5 frame durations = at least one dropped frame
+WAIT_TIMEOUT      = 0.2    # seconds to wait for a frame newer than the request
+
+
+class FrameRing:
+    """
+    Fixed-size ring of preallocated frames with timestamp lookup.
+
+    `grab` is called from the capture thread with the destination slot
+    and must fill it in place, returning (timestamp_ns, frame_duration_ns).
+    frame_duration_ns may be None if the camera does not report it.
+    """
+
+    def __init__(self, grab, shape, dtype=np.uint8, depth=RING_DEPTH):
+        self._grab   = grab
+        self._frames = np.zeros((depth,) + tuple(shape), dtype=dtype)
+        self._stamps = np.zeros(depth, dtype=np.int64)   # 0 = slot empty
+        self._depth  = depth
+        self._next   = 0
+        self._count  = 0            # total frames written
+        self._dropped = 0           # frames the camera skipped (timestamp gaps)
+        self._last_ts = 0
+        self._cond   = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._error  = None
+
+    # ── Capture thread ─────────────────────────────────────────────────────────
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameRing", daemon=True)
+        self._thread.start()
+        print(f"[Ring] Continuous capture started ({self._depth} slots)")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        print("[Ring] Continuous capture stopped")
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def _run(self):
+        while self._running:
+            # Claim the oldest slot: a zero timestamp hides it from readers
+            # while the camera writes into it outside the lock.
+            with self._cond:
+                slot = self._next
+                self._stamps[slot] = 0
+            try:
+                ts, duration = self._grab(self._frames[slot])
+            except Exception as e:
+                self._error = e
+                print(f"[Ring] Capture error: {e}")
+                time.sleep(0.05)
+                continue
+
+            with self._cond:
+                self._stamps[slot] = ts
+                if self._last_ts and duration:
+                    gap = ts - self._last_ts
+                    if gap > DROP_GAP_FACTOR * duration:
+                        self._dropped += int(round(gap / duration)) - 1
+                self._last_ts = ts
+
+                self._next = (slot + 1) % self._depth
+                self._count += 1
+                self._cond.notify_all()
+
+    # ── Lookup ─────────────────────────────────────────────────────────────────
+
+    def latest(self, out=None):
+        """Return (frame, timestamp_ns) of the newest frame, or (None, 0)."""
+        with self._cond:
+            slot = (self._next - 1) % self._depth
+            if self._stamps[slot] == 0:
+                return None, 0
+            return self._copy_slot(slot, out), int(self._stamps[slot])
+
+    def frame_at(self, t_ns: int, out=None, timeout: float = WAIT_TIMEOUT):
+        """
+        Return (frame, timestamp_ns) of the frame closest to t_ns.
+
+        If t_ns lies in the future, waits (up to `timeout`) for a frame
+        taken at or after t_ns, so a predicted arrival time can be
+        requested before the bean actually reaches the camera.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._last_ts < t_ns and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            valid = self._stamps > 0
+            if not valid.any():
+                return None, 0
+            diffs = np.where(valid, np.abs(self._stamps - t_ns), np.iinfo(np.int64).max)
+            slot  = int(np.argmin(diffs))
+            return self._copy_slot(slot, out), int(self._stamps[slot])
+
+    def _copy_slot(self, slot, out):
+        # Caller holds the lock — copy out so the capture thread can reuse the slot
+        if out is None:
+            return self._frames[slot].copy()
+        np.copyto(out, self._frames[slot])
+        return out
+
+    # ── Stats ──────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """Ring depth (filled / capacity), frames captured and dropped, frame age."""
+        now = time.monotonic_ns()
+        with self._cond:
+            valid = self._stamps[self._stamps > 0]
+            return {
+                "depth"          : int(valid.size),
+                "capacity"       : self._depth,
+                "captured"       : self._count,
+                "dropped"        : self._dropped,
+                "newest_age_ms"  : (now - int(valid.max())) / 1e6 if valid.size else None,
+                "oldest_age_ms"  : (now - int(valid.min())) / 1e6 if valid.size else None,
+                "last_error"     : str(self._error) if self._error else None,
+            }
+
+
+def picamera2_grabber(cam, stream: str = "main", listeners: list | None = None):
+    """
+    Build a `grab` callable for FrameRing from a started Picamera2 instance.
+    Uses capture_request() so each frame comes with its SensorTimestamp.
+
+    Each callable in `listeners` (may be appended to later) is called as
+    fn(request, timestamp_ns) before the request is released; it must
+    copy what it needs and return quickly.
+    """
+    def grab(out):
+        request = cam.capture_request()
+        try:
+            np.copyto(out, request.make_array(stream))
+            meta = request.get_metadata()
+            ts = int(meta.get("SensorTimestamp", time.monotonic_ns()))
+            for listener in list(listeners or ()):
+                try:
+                    listener(request, ts)
+                except Exception as e:
+                    print(f"[Ring] Frame listener error: {e}")
+        finally:
+            request.release()
+        duration_us = meta.get("FrameDuration")
+        return ts, int(duration_us * 1000) if duration_us else None
+    return grab
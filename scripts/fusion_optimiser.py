@@ -0,0 +1,218 @@
+"""
+================================================================
+COFFEE BEAN QUALITY SORTER — FUSION WEIGHT / THRESHOLD OPTIMISER
+Uganda Christian University | Group Trailblazers
+S23B23/056 | S23B23/010 | S23B23/046
+
+HOW TO RUN:
+  1. Run scripts/05_model_fusion.py first — it caches the DT and
+     CNN probabilities to data/fusion_probs.npz
+  2. Run: python scripts/fusion_optimiser.py [target_false_pass_rate]
+     e.g. python scripts/fusion_optimiser.py 0.02
+
+WHAT THIS SCRIPT DOES:
+  - Loads the cached DT / CNN probability vectors (no TensorFlow needed)
+  - Scores every DT weight x threshold pair in ONE NumPy broadcast
+    (CNN weight = 1 - DT weight)
+  - Builds ROC surfaces: pass rate of good beans and false pass rate
+    of bad beans over the whole weight x threshold grid
+  - Picks the best operating point for each target false pass rate
+  - Writes the chosen weights/threshold to models/fusion_config.json,
+    which 06_sorter_main.py reads at startup
+================================================================
+"""
+
+import os
+import sys
+import json
+import numpy as np
+
+# ── Optimiser Configuration ────────────────────────────────────────────────────
+PROBS_FILE          = "data/fusion_probs.npz"
+FUSION_CONFIG_FILE  = "models/fusion_config.json"
+SURFACE_FILE        = "data/fusion_roc_surface.npz"
+SURFACE_PLOT        = "data/fusion_roc_surface.png"
+WEIGHT_STEPS        = 101     # DT weight grid 0.00, 0.01 … 1.00
+THRESHOLD_STEPS     = 101     # threshold grid 0.00, 0.01 … 1.00
+TARGET_FALSE_PASS   = 0.05    # default: at most 5% of bad beans may pass
+REPORT_TARGETS      = (0.01, 0.02, 0.05, 0.10)
+
+
+def load_cached_probs(path: str = PROBS_FILE):
+    """Return (dt_probs, cnn_probs, y_true) saved by 05_model_fusion.py."""
+    data = np.load(path)
+    return (data["dt_probs"].astype(np.float64),
+            data["cnn_probs"].astype(np.float64),
+            data["y_true"].astype(bool))
+
+
+def evaluate_grid(dt_probs, cnn_probs, y_true,
+                  weights=None, thresholds=None) -> dict:
+    """
+    Evaluate every (DT weight, threshold) pair in one broadcast.
+
+    Scores are shaped (W, N), the pass/reject decisions (W, T, N);
+    confusion counts are reduced over the bean axis to (W, T) grids.
+    """
+    if weights is None:
+        weights = np.linspace(0.0, 1.0, WEIGHT_STEPS)
+    if thresholds is None:
+        thresholds = np.linspace(0.0, 1.0, THRESHOLD_STEPS)
+
+    dt_probs   = np.asarray(dt_probs,  dtype=np.float64)
+    cnn_probs  = np.asarray(cnn_probs, dtype=np.float64)
+    good       = np.asarray(y_true,    dtype=bool)
+
+    # (W, N) fused scores, then (W, T, N) decisions
+    scores = (weights[:, None] * dt_probs[None, :] +
+              (1.0 - weights)[:, None] * cnn_probs[None, :])
+    passed = scores[:, None, :] >= thresholds[None, :, None]
+
+    tp = np.count_nonzero(passed &  good, axis=2)
+    fp = np.count_nonzero(passed & ~good, axis=2)
+    n_good = int(good.sum())
+    n_bad  = int(good.size - n_good)
+    fn = n_good - tp
+    tn = n_bad  - fp
+
+    return {
+        "weights"   : weights,
+        "thresholds": thresholds,
+        "tp": tp, "fp": fp, "tn": tn, "fn": fn,
+        # Pass rate of good beans (TPR) and false pass rate of bad beans (FPR)
+        "good_pass_rate" : tp / max(n_good, 1),
+        "false_pass_rate": fp / max(n_bad,  1),
+        "accuracy"       : (tp + tn) / max(good.size, 1),
+    }
+
+
+def best_operating_point(grid: dict, target_false_pass: float) -> dict:
+    """
+    Best point with false pass rate <= target: most good beans passed,
+    ties broken by accuracy. Falls back to the lowest false pass rate
+    on the grid if the target cannot be met.
+    """
+    fpr, tpr, acc = grid["false_pass_rate"], grid["good_pass_rate"], grid["accuracy"]
+    feasible = fpr <= target_false_pass
+
+    if feasible.any():
+        # lexsort sorts by its last key first: TPR, then accuracy
+        idx  = np.flatnonzero(feasible)
+        flat = idx[np.lexsort((acc.ravel()[idx], tpr.ravel()[idx]))[-1]]
+        met  = True
+    else:
+        # Lowest false pass rate, ties broken by the higher TPR
+        flat = np.lexsort((-tpr.ravel(), fpr.ravel()))[0]
+        met  = False
+    wi, ti = np.unravel_index(flat, fpr.shape)
+
+    dt_weight = float(grid["weights"][wi])
+    return {
+        "target_false_pass_rate": target_false_pass,
+        "target_met"     : met,
+        "dt_weight"      : round(dt_weight, 4),
+        "cnn_weight"     : round(1.0 - dt_weight, 4),
+        "threshold"      : round(float(grid["thresholds"][ti]), 4),
+        "good_pass_rate" : round(float(tpr[wi, ti]), 4),
+        "false_pass_rate": round(float(fpr[wi, ti]), 4),
+        "accuracy"       : round(float(acc[wi, ti]), 4),
+    }
+
+
+def save_roc_surface(grid: dict, npz_path: str = SURFACE_FILE,
+                     png_path: str | None = SURFACE_PLOT):
+    """Save the TPR/FPR surfaces as .npz and (if matplotlib is present) a heatmap."""
+    os.makedirs(os.path.dirname(npz_path) or ".", exist_ok=True)
+    np.savez(npz_path,
+             weights=grid["weights"], thresholds=grid["thresholds"],
+             good_pass_rate=grid["good_pass_rate"],
+             false_pass_rate=grid["false_pass_rate"],
+             accuracy=grid["accuracy"])
+
+    if not png_path:
+        return
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return
+
+    extent = [grid["thresholds"][0], grid["thresholds"][-1],
+              grid["weights"][0],    grid["weights"][-1]]
+    fig, axes = plt.subplots(1, 2, figsize=(13, 5))
+    for ax, key, title in zip(axes,
+                              ["good_pass_rate", "false_pass_rate"],
+                              ["Good beans passed (TPR)", "Bad beans passed (FPR)"]):
+        im = ax.imshow(grid[key], origin="lower", aspect="auto",
+                       extent=extent, cmap="viridis", vmin=0, vmax=1)
+        ax.set_title(title)
+        ax.set_xlabel("Fusion threshold")
+        ax.set_ylabel("DT weight (CNN = 1 - DT)")
+        fig.colorbar(im, ax=ax)
+    plt.tight_layout()
+    plt.savefig(png_path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+
+def write_fusion_config(best: dict, points: list, path: str = FUSION_CONFIG_FILE):
+    """Merge the chosen operating point into fusion_config.json."""
+    cfg = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            cfg = json.load(f)
+
+    cfg.update({
+        "best_strategy"         : "Fusion: Optimised",
+        "dt_weight"             : best["dt_weight"],
+        "cnn_weight"            : best["cnn_weight"],
+        "threshold"             : best["threshold"],
+        "target_false_pass_rate": best["target_false_pass_rate"],
+        "operating_points"      : points,
+    })
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(cfg, f, indent=2)
+
+
+def main(target_false_pass: float = TARGET_FALSE_PASS):
+    if not os.path.exists(PROBS_FILE):
+        print(f"\n  ✗ Missing: {PROBS_FILE}")
+        print("  Run scripts/05_model_fusion.py first.")
+        sys.exit(1)
+
+    dt_probs, cnn_probs, y_true = load_cached_probs()
+    print(f"\n  ✓ Loaded {len(y_true)} cached predictions from {PROBS_FILE}")
+
+    grid = evaluate_grid(dt_probs, cnn_probs, y_true)
+    print(f"  ✓ Evaluated {grid['accuracy'].size} weight x threshold pairs")
+
+    targets = sorted(set(REPORT_TARGETS) | {target_false_pass})
+    points  = [best_operating_point(grid, t) for t in targets]
+
+    print(f"\n  {'Target FPR':>10} {'DT w':>6} {'CNN w':>6} {'Thresh':>7} "
+          f"{'Good pass':>10} {'False pass':>11} {'Accuracy':>9}")
+    print(f"  {'─'*10} {'─'*6} {'─'*6} {'─'*7} {'─'*10} {'─'*11} {'─'*9}")
+    for p in points:
+        flag = "" if p["target_met"] else "  (target not met)"
+        print(f"  {p['target_false_pass_rate']*100:>9.1f}% {p['dt_weight']:>6.2f} "
+              f"{p['cnn_weight']:>6.2f} {p['threshold']:>7.2f} "
+              f"{p['good_pass_rate']*100:>9.1f}% {p['false_pass_rate']*100:>10.1f}% "
+              f"{p['accuracy']*100:>8.1f}%{flag}")
+
+    best = next(p for p in points
+                if p["target_false_pass_rate"] == target_false_pass)
+    save_roc_surface(grid)
+    write_fusion_config(best, points)
+
+    print(f"\n  ✓ Operating point for {target_false_pass*100:.1f}% false pass: "
+          f"DT={best['dt_weight']:.2f} CNN={best['cnn_weight']:.2f} "
+          f"threshold={best['threshold']:.2f}")
+    print(f"  ✓ Saved: {FUSION_CONFIG_FILE}")
+    print(f"  ✓ Saved: {SURFACE_FILE}")
+
+
+if __name__ == "__main__":
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else TARGET_FALSE_PASS
+    main(target)
@@ -0,0 +1,176 @@
+"""
+image_writer.py — Background bean-image archiving for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+JPEG encoding and writing a frame costs tens of milliseconds on the Pi.
+Doing it inside capture_bean() delays every bean's inference, so frames
+are handed to a bounded queue and written by a background thread.
+
+When the queue is full the OVERFLOW_POLICY decides what to lose:
+  "drop_newest" — refuse the new image (the sorter never waits)
+  "drop_oldest" — discard the oldest queued image to make room
+  "downsample"  — above DOWNSAMPLE_AT fill, queue images at 1/DOWNSAMPLE_FACTOR
+                  size (faster to encode); still drop the newest when full
+
+If an `archive` (bean_archive.BeanArchive) is given, images are packed
+into its chunk files instead of one JPEG per bean, and `path` is used
+only for its file stem as the bean id. The label / prediction passed to
+submit() — or later to annotate(), which is queued behind the image —
+set the bean's eviction priority in the archive.
+"""
+
+import os
+import time
+import queue
+import threading
+
+# ── Writer Configuration ───────────────────────────────────────────────────────
+QUEUE_SIZE         = 32
+OVERFLOW_POLICY    = "drop_oldest"
+DOWNSAMPLE_AT      = 0.5     # queue fill fraction where downsampling starts
+DOWNSAMPLE_FACTOR  = 2
+JPEG_QUALITY       = 90
+
+_STOP = object()
+
+
+def _encode_and_write(frame, path, quality):
+    """Write an RGB frame as JPEG using OpenCV or PIL (whichever is available)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        import cv2
+        cv2.imwrite(path, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                    [cv2.IMWRITE_JPEG_QUALITY, quality])
+    except ImportError:
+        from PIL import Image
+        Image.fromarray(frame).save(path, quality=quality)
+
+
+def _bean_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class AsyncImageWriter:
+    """Bounded queue + writer thread for bean images."""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, policy: str = OVERFLOW_POLICY,
+                 quality: int = JPEG_QUALITY, archive=None):
+        if policy not in ("drop_newest", "drop_oldest", "downsample"):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.policy = policy
+        self.quality = quality
+        self.archive = archive
+        self._q = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.downsampled = 0
+        self.errors = 0
+        self._write_s = 0.0
+        self._thread = threading.Thread(target=self._run, name="ImageWriter", daemon=True)
+        self._thread.start()
+
+    # ── Producer side (sorting loop) ───────────────────────────────────────────
+
+    def submit(self, frame, path: str, copy: bool = False,
+               label: str | None = None, predicted: str | None = None) -> bool:
+        """
+        Queue a frame for writing; never blocks.
+        Pass copy=True if the caller will reuse the frame's buffer.
+        Returns False if the image was dropped.
+        """
+        if self.policy == "downsample" and \
+                self._q.qsize() >= DOWNSAMPLE_AT * self._q.maxsize:
+            frame = frame[::DOWNSAMPLE_FACTOR, ::DOWNSAMPLE_FACTOR]
+            copy = True
+            with self._lock:
+                self.downsampled += 1
+        if copy:
+            frame = frame.copy()
+
+        try:
+            self._q.put_nowait((frame, path, label, predicted))
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == "drop_oldest":
+            try:
+                self._q.get_nowait()
+                self._q.task_done()
+            except queue.Empty:
+                pass
+            with self._lock:
+                self.dropped += 1
+            try:
+                self._q.put_nowait((frame, path, label, predicted))
+                return True
+            except queue.Full:
+                pass
+
+        with self._lock:
+            self.dropped += 1
+        return False
+
+    def annotate(self, path: str, label: str | None = None,
+                 predicted: str | None = None) -> bool:
+        """
+        Attach the prediction / true label to an image submitted earlier.
+        Queued behind it, so it is applied after the image is archived;
+        never blocks. Returns False if there is no archive or the queue is full.
+        """
+        if self.archive is None:
+            return False
+        try:
+            self._q.put_nowait((None, path, label, predicted))
+            return True
+        except queue.Full:
+            return False
+
+    # ── Writer thread ──────────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            try:
+                if item is _STOP:
+                    return
+                frame, path, label, predicted = item
+                if frame is None:           # annotate(): label a bean already queued
+                    if self.archive is not None:
+                        self.archive.set_label(_bean_id(path), label, predicted)
+                    continue
+                t0 = time.perf_counter()
+                if self.archive is not None:
+                    self.archive.append(_bean_id(path), frame,
+                                        label=label, predicted=predicted)
+                else:
+                    _encode_and_write(frame, path, self.quality)
+                with self._lock:
+                    self._write_s += time.perf_counter() - t0
+                    self.written += 1
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"[Writer] Could not save image: {e}")
+            finally:
+                self._q.task_done()
+
+    # ── Stats / shutdown ───────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth"   : self._q.qsize(),
+                "queue_size"    : self._q.maxsize,
+                "written"       : self.written,
+                "dropped"       : self.dropped,
+                "downsampled"   : self.downsampled,
+                "errors"        : self.errors,
+                "avg_write_ms"  : self._write_s / self.written * 1000 if self.written else 0.0,
+            }
+
+    def close(self, timeout: float = 10.0):
+        """Write everything still queued, then stop the thread."""
+        self._q.put(_STOP)
+        self._thread.join(timeout=timeout)
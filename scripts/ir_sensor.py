@@ -1,50 +1,86 @@
 """
-ir_sensor.py — Fixed IR Sensor Module for Coffee Bean Sorter
+ir_sensor.py — Interrupt-driven IR Sensor Module for Coffee Bean Sorter
 Group Trailblazers | Uganda Christian University
 
-FIXES APPLIED:
-  - Added software debounce (confirmation sampling) to eliminate false triggers
-  - Sensor is confirmed LOW (bean present) across multiple reads before accepting
-  - Warm-up delay on startup to let sensor stabilise
-  - Configurable sensitivity via CONFIRM_SAMPLES and CONFIRM_INTERVAL
+The sensor is no longer polled. GPIO edge interrupts (both edges)
+timestamp the beam changes, and the edges are debounced by timing
+alone — nothing ever sleeps:
+
+  - an edge that follows DEBOUNCE_DELAY of quiet line is a real change
+    and is accepted at once, with the interrupt's timestamp
+  - edges closer together than that are contact/optical bounce; once the
+    line has been quiet for DEBOUNCE_DELAY a timer checks the level and
+    accepts the change (timestamped at the last edge) if there was one
+  - each accepted change is published to `events` (a queue.Queue):
+      {"event": "enter", "bean": n, "t": perf_counter, "ts": time.time()}
+      {"event": "exit",  "bean": n, "t": ..., "ts": ..., "duration_s": ...}
+    "enter" is held back until the beam has stayed blocked for
+    MIN_BEAN_TIME (it keeps the edge's timestamps), so every enter is a
+    real bean; a blockage that clears sooner is published as a single
+    "glitch" instead of enter + exit
+  - callers that only poll is_bean_present() pass publish_events=False,
+    so nothing piles up in a queue nobody reads
+
+wait_for_bean() / wait_for_bean_clear() / is_bean_present() keep their
+old meaning but now wait on the event queue or read the debounced state.
+Events older than EVENT_MAX_AGE are skipped by the wait_* helpers (and
+can be checked with is_fresh()), so a bean queued long ago is not
+mistaken for the one under the sensor now.
+
+HOW TO RUN (prints events as beans pass):
+  python scripts/ir_sensor.py
 """
 
 import RPi.GPIO as GPIO
 import time
+import queue
+import threading
 
 # ── Pin Configuration ──────────────────────────────────────────────────────────
 IR_PIN = 16  # GPIO16 (BCM)
 
 # ── Debounce Configuration ─────────────────────────────────────────────────────
-WARMUP_DELAY      = 2.0   # seconds: wait for sensor to stabilise on startup
-DEBOUNCE_DELAY    = 0.05  # seconds: wait after first edge before re-reading
-CONFIRM_SAMPLES   = 3     # number of consecutive LOW reads required to confirm bean
-CONFIRM_INTERVAL  = 0.01  # seconds between confirmation reads
-BEAN_GONE_SAMPLES = 3     # consecutive HIGH reads to confirm bean has passed
-COOLDOWN_TIME     = 0.4   # seconds: minimum time between two successive detections
+WARMUP_DELAY      = 2.0   # seconds after start-up during which edges are ignored
+DEBOUNCE_DELAY    = 0.005 # seconds of quiet line that make an edge genuine
+MIN_BEAN_TIME     = 0.01  # enter→exit shorter than this is a glitch, not a bean
+EVENT_QUEUE_SIZE  = 256   # events kept when nobody is reading (oldest dropped)
+EVENT_MAX_AGE     = 0.5   # seconds after which a queued event is stale
 
 
 class IRSensor:
     """
-    Reliable IR proximity sensor reader with debounce.
+    Edge-triggered IR proximity sensor with timestamped bean events.
 
     Typical IR obstacle sensors (like the FC-51 or TCRT5000-based modules)
     output LOW when an object is detected and HIGH when clear.
     If your module is inverted, set active_low=False in the constructor.
     """
 
-    def __init__(self, pin=IR_PIN, active_low=True):
+    def __init__(self, pin=IR_PIN, active_low=True, debounce_s=DEBOUNCE_DELAY,
+                 publish_events=True):
         self.pin = pin
         self.active_low = active_low
-        self._last_trigger_time = 0.0
+        self.debounce_s = debounce_s
+        self.publish_events = publish_events
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.beans = 0
+        self.glitches = 0
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._timer = None
+        self._confirm = None            # timer publishing the held-back enter
+        self._last_edge = 0.0
+        self._entered = None            # perf_counter of the current blockage's start
+        self._confirmed = False         # its enter has been published
+        self._ready_at = time.perf_counter() + WARMUP_DELAY
 
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
         GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-
-        print(f"[IR] Warming up on pin {self.pin} … ({WARMUP_DELAY}s)")
-        time.sleep(WARMUP_DELAY)
-        print("[IR] Ready.")
+        self._present = self._raw_detected()
+        GPIO.add_event_detect(self.pin, GPIO.BOTH, callback=self._on_edge)
+        print(f"[IR] Listening on pin {self.pin} (events after {WARMUP_DELAY}s warm-up)")
 
     # ── Low-level helpers ──────────────────────────────────────────────────────
 
@@ -53,69 +89,162 @@ class IRSensor:
         val = GPIO.input(self.pin)
         return (val == GPIO.LOW) if self.active_low else (val == GPIO.HIGH)
 
-    def _confirm(self, expected_state: bool, samples: int, interval: float) -> bool:
-        """
-        Read the sensor `samples` times, return True only if ALL reads
-        match `expected_state`.  This eliminates single-sample noise spikes.
-        """
-        for _ in range(samples):
-            if self._raw_detected() != expected_state:
-                return False
-            time.sleep(interval)
-        return True
+    def _on_edge(self, channel):
+        """GPIO interrupt callback (RPi.GPIO's event thread) — must not block."""
+        t = time.perf_counter()
+        detected = self._raw_detected()
+        with self._lock:
+            quiet = t - self._last_edge >= self.debounce_s
+            self._last_edge = t
+            if t < self._ready_at:
+                self._present = detected
+            elif quiet and detected != self._present:
+                self._accept(detected, t)
+            else:
+                self._arm_settle()
+
+    def _arm_settle(self):
+        """Bounce in progress: re-check the level once the line is quiet."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.debounce_s, self._settle)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _settle(self):
+        with self._lock:
+            self._timer = None
+            quiet_for = time.perf_counter() - self._last_edge
+            if quiet_for < self.debounce_s:
+                self._arm_settle()      # still bouncing
+                return
+            detected = self._raw_detected()
+            if detected != self._present:
+                self._accept(detected, self._last_edge)
+
+    def _accept(self, detected: bool, t: float):
+        """A debounced state change at perf_counter time `t` (lock held)."""
+        self._present = detected
+        if detected:
+            self._entered, self._confirmed = t, False
+            delay = MIN_BEAN_TIME - (time.perf_counter() - t)
+            if delay <= 0:
+                self._publish_enter()
+            else:
+                self._confirm = threading.Timer(delay, self._confirm_enter, args=(t,))
+                self._confirm.daemon = True
+                self._confirm.start()
+            return
+        if self._entered is None:
+            return                      # clear after warm-up: nothing to report
+        duration = t - self._entered
+        if self._confirm is not None:
+            self._confirm.cancel()
+            self._confirm = None
+        if duration < MIN_BEAN_TIME:
+            self.glitches += 1
+            event = {"event": "glitch", "bean": None, "t": t, "ts": self._ts(t),
+                     "duration_s": duration}
+        else:
+            if not self._confirmed:     # timer not run yet: enter goes first
+                self._publish_enter()
+            event = {"event": "exit", "bean": self.beans, "t": t, "ts": self._ts(t),
+                     "duration_s": duration}
+        self._entered = None
+        self._publish(event)
+
+    def _confirm_enter(self, t: float):
+        """Timer: the beam is still blocked MIN_BEAN_TIME after `t` — a bean."""
+        with self._lock:
+            if self._entered == t and not self._confirmed:
+                self._confirm = None
+                self._publish_enter()
+
+    def _publish_enter(self):
+        self._confirmed = True
+        self.beans += 1
+        self._publish({"event": "enter", "bean": self.beans,
+                       "t": self._entered, "ts": self._ts(self._entered)})
+
+    @staticmethod
+    def _ts(t: float) -> float:
+        """perf_counter time → wall-clock time.time()."""
+        return time.time() - (time.perf_counter() - t)
+
+    def _publish(self, event):
+        if not self.publish_events:
+            return
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            try:
+                self.events.get_nowait()    # keep the newest
+            except queue.Empty:
+                pass
+            self.events.put_nowait(event)
 
     # ── Public API ─────────────────────────────────────────────────────────────
 
+    def get_event(self, timeout: float | None = None) -> dict | None:
+        """Next bean event, or None when `timeout` expires (None = wait forever)."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    @staticmethod
+    def is_fresh(event: dict, max_age: float = EVENT_MAX_AGE) -> bool:
+        """True if `event` happened within the last `max_age` seconds."""
+        return time.perf_counter() - event["t"] <= max_age
+
+    def _wait_for(self, kind: str, timeout: float) -> dict | None:
+        """Next fresh `kind` event; stale and other events are skipped."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            event = self.get_event(remaining)
+            if event is None or (event["event"] == kind and self.is_fresh(event)):
+                return event
+
     def wait_for_bean(self, timeout: float = 30.0) -> bool:
         """
-        Block until a coffee bean is reliably detected or timeout expires.
+        Block (on the event queue) until a bean enters the beam.
 
         Returns True  → bean confirmed present
                 False → timed out with no bean
         """
-        deadline = time.time() + timeout
-        while time.time() < deadline:
-            if self._raw_detected():
-                # Potential hit — wait for bounce to settle then confirm
-                time.sleep(DEBOUNCE_DELAY)
-                if self._confirm(True, CONFIRM_SAMPLES, CONFIRM_INTERVAL):
-                    # Enforce minimum time between successive triggers
-                    now = time.time()
-                    if (now - self._last_trigger_time) >= COOLDOWN_TIME:
-                        self._last_trigger_time = now
-                        print("[IR] ✓ Bean detected (confirmed)")
-                        return True
-            time.sleep(0.005)  # tight poll without hammering CPU
-
-        print("[IR] ✗ Timeout — no bean detected")
-        return False
+        event = self._wait_for("enter", timeout)
+        if event is None:
+            print("[IR] ✗ Timeout — no bean detected")
+            return False
+        print("[IR] ✓ Bean detected (confirmed)")
+        return True
 
     def wait_for_bean_clear(self, timeout: float = 5.0) -> bool:
         """
         Block until the bean has passed the sensor (sensor reads clear again).
         Useful for knowing when to stop the belt or take an image.
         """
-        deadline = time.time() + timeout
-        while time.time() < deadline:
-            if not self._raw_detected():
-                time.sleep(DEBOUNCE_DELAY)
-                if self._confirm(False, BEAN_GONE_SAMPLES, CONFIRM_INTERVAL):
-                    print("[IR] Bean cleared sensor.")
-                    return True
-            time.sleep(0.005)
-        return False
+        if not self._present:
+            return True
+        event = self._wait_for("exit", timeout)
+        if event is not None:
+            print(f"[IR] Bean cleared sensor ({event['duration_s'] * 1000:.0f} ms).")
+        return event is not None
 
     def is_bean_present(self) -> bool:
-        """
-        Non-blocking: returns True only when a bean is confirmed present right now.
-        Suitable for polling inside a loop.
-        """
-        if not self._raw_detected():
-            return False
-        time.sleep(DEBOUNCE_DELAY)
-        return self._confirm(True, CONFIRM_SAMPLES, CONFIRM_INTERVAL)
+        """Non-blocking: the debounced beam state right now."""
+        return self._present
 
     def cleanup(self):
+        GPIO.remove_event_detect(self.pin)
+        with self._lock:
+            for timer in (self._timer, self._confirm):
+                if timer is not None:
+                    timer.cancel()
+            self._timer = self._confirm = None
         GPIO.cleanup(self.pin)
         print("[IR] GPIO cleaned up.")
 
@@ -125,13 +254,17 @@ if __name__ == "__main__":
     sensor = IRSensor()
     print("Place beans under the IR sensor.  Press Ctrl+C to stop.\n")
     try:
-        count = 0
         while True:
-            if sensor.wait_for_bean(timeout=60):
-                count += 1
-                print(f"  → Bean #{count} detected!")
-                sensor.wait_for_bean_clear()
+            event = sensor.get_event()
+            if event["event"] == "enter":
+                print(f"  → Bean #{event['bean']} entered")
+            elif event["event"] == "glitch":
+                print(f"  ~ Glitch ignored ({event['duration_s'] * 1000:.1f} ms)")
+            else:
+                print(f"  ← Bean #{event['bean']} {event['event']} "
+                      f"after {event['duration_s'] * 1000:.1f} ms")
     except KeyboardInterrupt:
-        print(f"\nTotal beans detected: {count}")
+        print(f"\nTotal beans detected: {sensor.beans} "
+              f"({sensor.glitches} glitches, {sensor.dropped} events dropped)")
     finally:
         sensor.cleanup()
@@ -0,0 +1,203 @@
+"""
+load_cell.py — Background HX711 weight stream for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+One HX711 conversion takes ~100 ms at the default 10 samples/s, so
+averaging 3 × 5 readings on the bean path costs over a second per bean.
+LoadCellStream samples the load cell continuously on its own thread
+instead:
+
+  - every reading goes into a preallocated ring (timestamp, raw grams)
+  - the filtered weight is the moving average of the readings since the
+    last step (up to FILTER_WINDOW of them): a reading more than
+    STEP_FACTOR × tolerance away from the average restarts it, so a
+    bean landing shows up at once instead of being averaged in slowly
+  - the reading counts as settled once the last SETTLE_SAMPLES raw
+    readings lie within the settle tolerance of each other (bean at
+    rest, no vibration from the gate or belt)
+  - the latest (weight, settled, timestamp) is published as one tuple,
+    so current_weight() / reading() return instantly and never wait for
+    the sensor
+
+The settle tolerance must sit above the HX711 noise floor: pass it in,
+or call calibrate_tolerance() with the scale empty to set it to
+NOISE_FACTOR × the measured noise.
+
+On the bean path, wait for a settled reading taken after the bean
+arrived (bounded by a timeout) rather than reading the value as is:
+  scale = LoadCellStream(lambda: hx.get_weight_mean(readings=1)).start()
+  scale.calibrate_tolerance()                 # belt/scale empty
+  ...
+  weight, settled = scale.wait_settled(after_ts=arrived, timeout=1.0)
+
+HOW TO RUN (live readout; defaults: DT=5, SCK=6, ratio 102):
+  python scripts/load_cell.py [dt_pin sck_pin scale_ratio]
+"""
+
+import sys
+import time
+import threading
+import numpy as np
+
+# ── Load Cell Configuration ────────────────────────────────────────────────────
+RING_SIZE           = 256       # raw readings kept
+FILTER_WINDOW       = 5         # readings in the moving average
+SETTLE_SAMPLES      = 4         # raw readings that must agree...
+SETTLE_TOLERANCE_G  = 0.03      # ...to within this many grams (see calibrate_tolerance)
+STEP_FACTOR         = 2.0       # reading this many tolerances off the average = new load
+NOISE_FACTOR        = 4.0       # tolerance = this × empty-scale standard deviation
+ERROR_BACKOFF_S     = 0.5       # pause after a failed read
+
+
+class LoadCellStream:
+    def __init__(self, read_fn, interval_s: float = 0.0,
+                 window: int = FILTER_WINDOW, settle_samples: int = SETTLE_SAMPLES,
+                 settle_tolerance_g: float = SETTLE_TOLERANCE_G):
+        """
+        read_fn    : returns one weight reading in grams (blocks for the
+                     conversion, e.g. hx.get_weight_mean(readings=1))
+        interval_s : extra pause between readings (0 = as fast as the HX711)
+        """
+        self.read_fn = read_fn
+        self.interval_s = interval_s
+        self.window = window
+        self.settle_samples = settle_samples
+        self.settle_tolerance_g = settle_tolerance_g
+
+        self._ts = np.zeros(RING_SIZE, dtype=np.float64)
+        self._raw = np.zeros(RING_SIZE, dtype=np.float64)
+        self._filtered = np.zeros(RING_SIZE, dtype=np.float64)
+        self.n = 0
+        self.errors = 0
+        self._latest = (0.0, False, 0.0)        # (weight_g, settled, ts)
+        self._settled_from = 0.0                # ts of the oldest reading in the settle window
+        self._step_n = 0                        # index of the first reading since the last step
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ── Lifecycle ──────────────────────────────────────────────────────────────
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="LoadCell",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    # ── Readers ────────────────────────────────────────────────────────────────
+
+    def current_weight(self) -> float:
+        return self._latest[0]
+
+    def reading(self) -> tuple:
+        """(weight_g, settled, timestamp) of the latest filtered reading."""
+        return self._latest
+
+    @property
+    def settled(self) -> bool:
+        return self._latest[1]
+
+    def wait_settled(self, after_ts: float = 0.0, timeout: float = 1.0) -> tuple:
+        """
+        Wait until the reading is settled on readings taken at or after
+        `after_ts` (e.g. when the bean arrived). Returns (weight_g, settled);
+        on timeout the latest, possibly unsettled, weight is returned.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest[1] and self._settled_from >= after_ts,
+                                timeout=timeout)
+            weight, settled, _ = self._latest
+            return weight, settled and self._settled_from >= after_ts
+
+    def calibrate_tolerance(self, samples: int = 20, timeout: float = 5.0) -> float:
+        """
+        Set the settle tolerance from the noise of `samples` fresh readings
+        (scale must be empty and still). Returns the tolerance in grams.
+        """
+        with self._cond:
+            target = self.n + samples
+            if not self._cond.wait_for(lambda: self.n >= target, timeout=timeout):
+                print(f"[LoadCell] Calibration timed out — keeping "
+                      f"{self.settle_tolerance_g:.3f} g tolerance")
+                return self.settle_tolerance_g
+            idx = np.arange(self.n - samples, self.n) % RING_SIZE
+            noise = float(self._raw[idx].std())
+            self.settle_tolerance_g = max(NOISE_FACTOR * noise, 0.001)
+        print(f"[LoadCell] Noise {noise * 1000:.1f} mg → settle tolerance "
+              f"{self.settle_tolerance_g * 1000:.1f} mg")
+        return self.settle_tolerance_g
+
+    def history(self, seconds: float = 2.0) -> np.ndarray:
+        """Recent (ts, raw, filtered) rows, oldest first."""
+        n = min(self.n, RING_SIZE)
+        idx = (np.arange(self.n - n, self.n)) % RING_SIZE
+        rows = np.column_stack([self._ts[idx], self._raw[idx], self._filtered[idx]])
+        return rows[rows[:, 0] >= time.time() - seconds]
+
+    # ── Sampling thread ────────────────────────────────────────────────────────
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                value = float(self.read_fn())
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    print(f"[LoadCell] Read failed ({self.errors}x): {e}")
+                self._stop.wait(ERROR_BACKOFF_S)
+                continue
+            self._add(time.time(), value)
+            if self.interval_s:
+                self._stop.wait(self.interval_s)
+
+    def _add(self, ts: float, value: float):
+        with self._cond:
+            i = self.n % RING_SIZE
+            # A jump well outside the noise is a new load: restart the average
+            if self.n and abs(value - self._filtered[(i - 1) % RING_SIZE]) \
+                    > STEP_FACTOR * self.settle_tolerance_g:
+                self._step_n = self.n
+            self._ts[i] = ts
+            self._raw[i] = value
+            self.n += 1
+
+            first = max(self._step_n, self.n - self.window)
+            weight = float(self._raw[np.arange(first, self.n) % RING_SIZE].mean())
+            self._filtered[i] = weight
+
+            settled = False
+            if self.n >= self.settle_samples:
+                idx = np.arange(self.n - self.settle_samples, self.n) % RING_SIZE
+                recent = self._raw[idx]
+                settled = float(recent.max() - recent.min()) <= self.settle_tolerance_g
+                self._settled_from = float(self._ts[idx[0]])
+            self._latest = (round(weight, 3), settled, ts)     # one atomic swap
+            self._cond.notify_all()
+
+
+if __name__ == "__main__":
+    from hx711 import HX711
+
+    dt, sck, ratio = (sys.argv[1:4] + ["5", "6", "102"][len(sys.argv[1:4]):])
+    hx = HX711(dout_pin=int(dt), pd_sck_pin=int(sck))
+    hx.set_scale_ratio(float(ratio))
+    hx.tare()
+    scale = LoadCellStream(lambda: hx.get_weight_mean(readings=1)).start()
+    scale.calibrate_tolerance()
+    try:
+        while True:
+            weight, settled, _ = scale.reading()
+            sys.stdout.write(f"\r  {weight:8.3f} g  {'settled' if settled else 'moving ':8}")
+            sys.stdout.flush()
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        scale.stop()
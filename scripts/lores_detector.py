@@ -0,0 +1,399 @@
+"""
+lores_detector.py — Camera-based bean presence detector for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+Replaces the IR sensor gate with the camera's own low-resolution stream.
+camera_module2.py already configures a 320x240 YUV420 "lores" stream;
+this module reads only its Y (luminance) plane in a background thread:
+
+  1. A slow running average of the empty belt is kept as the background,
+     seeded from the per-pixel median of the first BG_SEED_FRAMES frames
+     (a bean passing during start-up is not baked into it)
+  2. Pixels that differ from it by more than DIFF_THRESHOLD (and are darker
+     than LUMA_MAX — beans are darker than the belt) form the bean mask
+  3. The mask's area and centroid give presence and position
+  4. An "arrival" event is published when a bean appears, and a "centred"
+     event when its centroid crosses the middle of the frame — that is
+     the moment to take the full-resolution capture
+
+No warm-up, debounce sleeps or cooldown: presence needs ARRIVAL_FRAMES
+consecutive frames and the bean must leave before the next one counts.
+
+Only one thread may call capture_request() on a Picamera2 instance. When
+the full-resolution FrameRing is running, create the detector with
+shared=True and register its feed() with the ring's grabber: the ring's
+capture loop then hands each request's Y plane to the detector thread
+(camera_module2.CameraModule does this).
+
+HOW TO RUN (on the Pi):
+  python scripts/lores_detector.py record 60      — record 60 s of lores
+                                                    footage + IR edges
+  python scripts/lores_detector.py evaluate data/lores_recording.npz
+                                                  — false-trigger rate and
+                                                    latency against IR
+"""
+
+import time
+import queue
+import threading
+import numpy as np
+from config import CAMERA
+
+# ── Detector Configuration ─────────────────────────────────────────────────────
+DIFF_THRESHOLD    = 25     # |Y - background| above this = changed pixel (0-255)
+LUMA_MAX          = 200    # changed pixels must also be darker than this
+MIN_AREA          = 60     # changed pixels needed to call it a bean (320x240 frame)
+ARRIVAL_FRAMES    = 2      # consecutive frames with a bean before "arrival"
+DEPART_FRAMES     = 3      # consecutive empty frames before the bean has left
+BG_ALPHA          = 0.05   # background learning rate (empty belt only)
+BG_SEED_FRAMES    = 5      # median of the first N frames seeds the background
+BELT_AXIS         = CAMERA["BELT_AXIS"]  # 0 = belt moves along x (columns), 1 = along y (rows)
+CENTRE_TOLERANCE  = 0.08   # centred = centroid within 8% of frame centre
+EVENT_QUEUE_SIZE  = 64
+FEED_QUEUE_SIZE   = 2      # Y planes waiting for the detector (shared=True; oldest dropped)
+RECORDING_FILE    = "data/lores_recording.npz"
+MATCH_WINDOW      = 0.5    # seconds: detector event must be this close to an IR edge
+RECORD_MAX_FPS    = 30     # upper bound on the lores frame rate, sizes the recording buffer
+
+
+class PresenceTracker:
+    """
+    Frame-by-frame presence logic on a Y plane. Pure NumPy, no camera —
+    used by the live LoresBeanDetector and by the offline evaluation.
+    """
+
+    def __init__(self):
+        self._bg = None
+        self._seed = []                # first BG_SEED_FRAMES Y planes
+        self._present = False
+        self._hits = 0
+        self._misses = 0
+        self._centred_sent = False
+        self._last_pos = None          # belt-axis centroid in the previous frame
+        self.bean_count = 0
+
+    def update(self, y: np.ndarray, ts_ns: int) -> list:
+        """Process one Y frame, return the list of events it produced."""
+        if self._bg is None:
+            self._seed.append(y.copy())
+            if len(self._seed) >= BG_SEED_FRAMES:
+                self._bg = np.median(np.stack(self._seed), axis=0).astype(np.float32)
+                self._seed = []
+            return []
+        yf = y.astype(np.float32, copy=False)
+
+        mask = (np.abs(yf - self._bg) > DIFF_THRESHOLD) & (y < LUMA_MAX)
+        area = int(np.count_nonzero(mask))
+        events = []
+
+        if area >= MIN_AREA:
+            self._hits += 1
+            self._misses = 0
+            rows, cols = np.nonzero(mask)
+            cy, cx = float(rows.mean()), float(cols.mean())
+            h, w = y.shape
+            pos, length = (cx, w) if BELT_AXIS == 0 else (cy, h)
+
+            if not self._present and self._hits >= ARRIVAL_FRAMES:
+                self._present = True
+                self._centred_sent = False
+                self._last_pos = None
+                self.bean_count += 1
+                events.append(self._event("arrival", ts_ns, cx, cy, area, w, h))
+
+            if self._present and not self._centred_sent:
+                centre = length / 2
+                near = abs(pos - centre) <= CENTRE_TOLERANCE * length
+                # Also fire if the centroid jumped across the centre between frames
+                crossed = (self._last_pos is not None and
+                           (self._last_pos - centre) * (pos - centre) < 0)
+                if near or crossed:
+                    self._centred_sent = True
+                    events.append(self._event("centred", ts_ns, cx, cy, area, w, h))
+                self._last_pos = pos
+        else:
+            self._hits = 0
+            self._misses += 1
+            if self._present and self._misses >= DEPART_FRAMES:
+                self._present = False
+                events.append({"type": "exit", "timestamp_ns": ts_ns,
+                               "bean": self.bean_count})
+            if not self._present:
+                # Learn the empty belt only — a bean must never fade into it
+                self._bg += BG_ALPHA * (yf - self._bg)
+
+        return events
+
+    def _event(self, kind, ts_ns, cx, cy, area, w, h):
+        return {
+            "type"        : kind,
+            "bean"        : self.bean_count,
+            "timestamp_ns": ts_ns,
+            "centroid"    : (cx / w, cy / h),   # normalised 0.0-1.0
+            "area"        : area,
+        }
+
+
+class LoresBeanDetector:
+    """
+    Background thread running PresenceTracker on a Picamera2 lores stream.
+
+    Events go to a bounded queue (oldest dropped if nobody reads them);
+    on_centred(event) is called from the detector thread when a bean
+    reaches the centre — hook the full-resolution capture there.
+
+    With shared=True the detector never calls capture_request() itself:
+    another capture loop passes each request to feed().
+    """
+
+    def __init__(self, cam, stream: str = "lores", on_centred=None, shared: bool = False):
+        self._cam = cam
+        self._stream = stream
+        self._on_centred = on_centred
+        self._shared = shared
+        self._tracker = PresenceTracker()
+        self._feed = queue.Queue(maxsize=FEED_QUEUE_SIZE)
+        self.skipped = 0              # fed frames dropped because the detector lagged
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._running = False
+        self._thread = None
+        self.frames = 0
+        self.last_latency_ms = None   # sensor timestamp → event published
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LoresDetector", daemon=True)
+        self._thread.start()
+        print("[Detector] Lores presence detector started")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        print("[Detector] Stopped")
+
+    def _y_plane(self, request):
+        yuv = request.make_array(self._stream)
+        h, w = self._cam.camera_config[self._stream]["size"][::-1]
+        return yuv[:h, :w]         # YUV420: the first h rows are the Y plane
+
+    def _grab_y(self):
+        request = self._cam.capture_request()
+        try:
+            y = self._y_plane(request)
+            ts = int(request.get_metadata().get("SensorTimestamp", time.monotonic_ns()))
+        finally:
+            request.release()
+        return y, ts
+
+    def feed(self, request, ts: int):
+        """
+        Shared mode: called by the capture loop with a live request, before
+        it is released. Copies the Y plane out and returns at once.
+        """
+        if not self._running:
+            return
+        item = (self._y_plane(request).copy(), ts)
+        try:
+            self._feed.put_nowait(item)
+        except queue.Full:
+            self.skipped += 1
+            try:
+                self._feed.get_nowait()
+            except queue.Empty:
+                pass
+            self._feed.put_nowait(item)
+
+    def _next_frame(self):
+        """(y, ts) from the shared capture loop or our own capture; None = nothing yet."""
+        if self._shared:
+            try:
+                return self._feed.get(timeout=0.1)
+            except queue.Empty:
+                return None
+        return self._grab_y()
+
+    def _run(self):
+        while self._running:
+            try:
+                frame = self._next_frame()
+            except Exception as e:
+                print(f"[Detector] Capture error: {e}")
+                time.sleep(0.05)
+                continue
+            if frame is None:
+                continue
+            y, ts = frame
+
+            self.frames += 1
+            for ev in self._tracker.update(y, ts):
+                self.last_latency_ms = (time.monotonic_ns() - ts) / 1e6
+                self._publish(ev)
+                if ev["type"] == "centred" and self._on_centred:
+                    try:
+                        self._on_centred(ev)
+                    except Exception as e:
+                        print(f"[Detector] on_centred error: {e}")
+
+    def _publish(self, ev):
+        try:
+            self.events.put_nowait(ev)
+        except queue.Full:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                pass
+            self.events.put_nowait(ev)
+
+    def wait_for_bean(self, timeout: float = 30.0) -> dict | None:
+        """
+        Block until a bean is centred under the camera or timeout expires.
+        Same role as IRSensor.wait_for_bean(), but returns the event.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                ev = self.events.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if ev["type"] == "centred":
+                return ev
+
+
+# ── Offline evaluation against the IR sensor ───────────────────────────────────
+
+def evaluate_against_ir(y_frames, frame_ts_ns, ir_ts_ns,
+                        match_window: float = MATCH_WINDOW) -> dict:
+    """
+    Replay recorded Y frames through PresenceTracker and compare the
+    "arrival" events with IR bean-enter timestamps (all in ns).
+
+    A detector arrival with no IR edge within ±match_window is a false
+    trigger; latency is detector arrival minus the matched IR edge
+    (negative = the camera saw the bean first).
+    """
+    tracker = PresenceTracker()
+    arrivals = []
+    for y, ts in zip(y_frames, frame_ts_ns):
+        arrivals += [ev["timestamp_ns"] for ev in tracker.update(y, int(ts))
+                     if ev["type"] == "arrival"]
+
+    ir = np.sort(np.asarray(ir_ts_ns, dtype=np.int64))
+    used = np.zeros(ir.size, dtype=bool)
+    window = int(match_window * 1e9)
+    latencies, false_triggers = [], 0
+
+    for t in arrivals:
+        if ir.size == 0:
+            false_triggers += 1
+            continue
+        diffs = np.where(used, np.iinfo(np.int64).max, np.abs(ir - t))
+        i = int(np.argmin(diffs))
+        if diffs[i] <= window:
+            used[i] = True
+            latencies.append((t - ir[i]) / 1e6)
+        else:
+            false_triggers += 1
+
+    lat = np.array(latencies) if latencies else np.zeros(0)
+    duration_s = (int(frame_ts_ns[-1]) - int(frame_ts_ns[0])) / 1e9 if len(frame_ts_ns) > 1 else 0
+    return {
+        "frames"              : len(frame_ts_ns),
+        "ir_beans"            : int(ir.size),
+        "detector_beans"      : len(arrivals),
+        "matched"             : len(latencies),
+        "missed"              : int(ir.size - used.sum()),
+        "false_triggers"      : false_triggers,
+        "false_trigger_rate"  : false_triggers / max(len(arrivals), 1),
+        "false_triggers_per_min": false_triggers / (duration_s / 60) if duration_s else 0.0,
+        "latency_ms_mean"     : float(lat.mean())             if lat.size else None,
+        "latency_ms_p50"      : float(np.percentile(lat, 50)) if lat.size else None,
+        "latency_ms_p95"      : float(np.percentile(lat, 95)) if lat.size else None,
+    }
+
+
+def record_footage(duration: float, path: str = RECORDING_FILE, ir_pin: int | None = None):
+    """
+    Record lores Y frames plus IR falling-edge timestamps for evaluate_against_ir().
+    Frames go straight into a preallocated .npy on disk (duration x
+    RECORD_MAX_FPS frames) instead of a growing list in RAM; it is
+    compressed into `path` at the end.
+    """
+    import os
+    import RPi.GPIO as GPIO
+    from camera_module2 import CameraModule
+    from ir_sensor import IR_PIN
+
+    ir_pin = ir_pin or IR_PIN
+    ir_edges = []
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(ir_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    # IR modules are active-low: falling edge = bean enters
+    GPIO.add_event_detect(ir_pin, GPIO.FALLING,
+                          callback=lambda ch: ir_edges.append(time.monotonic_ns()),
+                          bouncetime=50)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    cam = CameraModule()
+    grabber = LoresBeanDetector(cam._cam)
+    w, h = cam._cam.camera_config["lores"]["size"]
+    capacity = int(duration * RECORD_MAX_FPS) + 1
+    raw_path = path + ".frames.npy"
+    frames = np.lib.format.open_memmap(raw_path, mode="w+", dtype=np.uint8,
+                                       shape=(capacity, h, w))
+    stamps = np.zeros(capacity, dtype=np.int64)
+    n = 0
+    print(f"[Detector] Recording {duration:.0f} s of lores footage …")
+    end = time.monotonic() + duration
+    try:
+        while n < capacity and time.monotonic() < end:
+            y, ts = grabber._grab_y()
+            frames[n] = y
+            stamps[n] = ts
+            n += 1
+    finally:
+        GPIO.remove_event_detect(ir_pin)
+        GPIO.cleanup(ir_pin)
+        cam.close()
+
+    np.savez_compressed(path, y=frames[:n], ts=stamps[:n],
+                        ir=np.array(ir_edges, dtype=np.int64))
+    del frames
+    os.remove(raw_path)
+    print(f"[Detector] Saved {n} frames, {len(ir_edges)} IR edges → {path}")
+
+
+# ── Standalone test ────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "record":
+        record_footage(float(sys.argv[2]) if len(sys.argv) > 2 else 60)
+    elif len(sys.argv) > 1 and sys.argv[1] == "evaluate":
+        data = np.load(sys.argv[2] if len(sys.argv) > 2 else RECORDING_FILE)
+        report = evaluate_against_ir(data["y"], data["ts"], data["ir"])
+        print("\nLores detector vs IR sensor")
+        for k, v in report.items():
+            print(f"  {k:<24}: {v:.2f}" if isinstance(v, float) else f"  {k:<24}: {v}")
+    else:
+        from camera_module2 import CameraModule
+        cam = CameraModule()
+        detector = cam.start_presence_detector()
+        print("Pass beans under the camera.  Press Ctrl+C to stop.\n")
+        try:
+            while True:
+                ev = detector.wait_for_bean(timeout=60)
+                if ev:
+                    print(f"  → Bean #{ev['bean']} centred at "
+                          f"({ev['centroid'][0]:.2f}, {ev['centroid'][1]:.2f})  "
+                          f"latency {detector.last_latency_ms:.1f} ms")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            cam.close()
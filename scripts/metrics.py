@@ -0,0 +1,195 @@
+"""
+metrics.py — Minimal Prometheus-style metrics for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+Counters, gauges and fixed-bucket histograms that render in the
+Prometheus text exposition format (scrape with Prometheus or just open
+/metrics in a browser).
+
+Hot-path cost is kept to a few attribute updates: label children are
+created once up front (histogram.labels("capture")) and observe() is a
+bisect into a tuple of bucket bounds plus two additions. No locks —
+each metric is written by one thread (the sorting loop), and a scrape
+that races an update is at most one bean out of date.
+
+Usage:
+  from metrics import REGISTRY
+  STAGE = REGISTRY.histogram("sorter_stage_seconds", "Per-stage latency", ("stage",))
+  capture = STAGE.labels("capture")
+  t0 = time.perf_counter(); ...; capture.observe_since(t0)
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds — 0.5 ms to 2.5 s covers everything from one GPIO read to a slow CNN invoke
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_str(names, values, extra=""):
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+
+class _Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)      # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_since(self, t0):
+        """Observe perf_counter() - t0 (seconds)."""
+        self.observe(time.perf_counter() - t0)
+
+
+class Metric:
+    """A named metric family; unlabelled metrics use the family directly."""
+
+    def __init__(self, kind, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._default = None if labels else self._make()
+
+    def _make(self):
+        if self.kind == "counter":
+            return _Counter()
+        if self.kind == "gauge":
+            return _Gauge()
+        return _Histogram(self.buckets)
+
+    def labels(self, *values):
+        """Child for one label combination — look it up once, outside the hot loop."""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._make())
+        return child
+
+    # Unlabelled shortcuts
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def observe_since(self, t0):
+        self._default.observe_since(t0)
+
+    def _series(self):
+        if self._default is not None:
+            yield (), self._default
+        yield from list(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, m in self._series():
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_label_str(self.label_names, values)} {m.value}")
+                continue
+            counts = list(m.counts)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket"
+                             f"{_label_str(self.label_names, values, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.label_names, values)} {m.sum}")
+            lines.append(f"{self.name}_count{_label_str(self.label_names, values)} {cumulative}")
+        return "\n".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, kind, name, help_text, labels, **kw):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Metric(kind, name, help_text, labels, **kw)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register("counter", name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register("gauge", name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register("histogram", name, help_text, labels, buckets=buckets)
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def serve_http(registry: Registry = REGISTRY, port: int = 9100, host: str = "0.0.0.0"):
+    """
+    Serve GET /metrics from a daemon thread — for scripts that have no
+    Flask app of their own (06_sorter_main.py).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):      # keep scrapes out of the sorter log
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="Metrics", daemon=True).start()
+    return server
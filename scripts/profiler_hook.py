@@ -0,0 +1,187 @@
+"""
+profiler_hook.py — Profile the running sorter on demand
+Group Trailblazers | Uganda Christian University
+
+Arm the hook (HTTP endpoint, SIGUSR1, or code) and the next N beans or
+T seconds of the sorting loop are profiled, then the profiler switches
+itself off again. Nothing is restarted and GPIO state is untouched —
+the hook only flips flags the sorting loop checks between beans.
+
+Two modes:
+  "pstats"    — cProfile on the sorting thread (exact call counts);
+                open with `python -m pstats file` or snakeviz
+  "collapsed" — sampling profiler: a background thread samples the
+                sorting thread's stack every SAMPLE_INTERVAL_S and writes
+                collapsed stacks ("a;b;c 42") for flamegraph.pl / speedscope
+
+Files go to PROFILE_DIR and are named profile_<session>_<time>.<ext>.
+A seconds-limited profile is finished by a timer, so it also completes
+when the belt is idle and no bean reaches bean_end().
+
+Usage in a sorting loop:
+  profiler = ProfilerHook(session)
+  profiler.install_signal()        # kill -USR1 <pid> → profile next 20 beans
+  while True:
+      profiler.bean_start()
+      ... one bean ...
+      profiler.bean_end()
+"""
+
+import os
+import sys
+import time
+import signal
+import cProfile
+import threading
+from collections import Counter
+
+PROFILE_DIR         = "data/profiles"
+DEFAULT_BEANS       = 20
+SAMPLE_INTERVAL_S   = 0.005
+
+
+class ProfilerHook:
+    def __init__(self, session: str, out_dir: str = PROFILE_DIR):
+        self.session = session
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._request = None        # (mode, beans, seconds) waiting to start
+        self._active = None         # dict describing the running profile
+        self._signalled = False     # set by the signal handler — a plain flag, no locks
+        self._signal_beans = DEFAULT_BEANS
+        self._stale_profiler = None # pstats profiler finished off-thread, still hooked
+        self.last_file = None
+
+    # ── Control side (HTTP handler / signal / console) ─────────────────────────
+
+    def request(self, beans: int | None = DEFAULT_BEANS, seconds: float | None = None,
+                mode: str = "pstats") -> bool:
+        """Arm the profiler; it starts at the next bean. False if already busy."""
+        if mode not in ("pstats", "collapsed"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if not beans and not seconds:
+            beans = DEFAULT_BEANS
+        with self._lock:
+            if self._request or self._active:
+                return False
+            self._request = (mode, beans, seconds)
+            return True
+
+    def install_signal(self, signum=signal.SIGUSR1, beans: int = DEFAULT_BEANS):
+        """
+        `kill -USR1 <pid>` profiles the next `beans` beans. The handler may
+        interrupt the sorting loop while it holds a lock, so it only sets
+        a flag; bean_start() turns it into a request.
+        """
+        self._signal_beans = beans
+        signal.signal(signum, lambda s, f: setattr(self, "_signalled", True))
+
+    def status(self) -> dict:
+        active = self._active
+        if active and active["deadline"] and time.monotonic() >= active["deadline"]:
+            self._finish(active)
+        with self._lock:
+            active = self._active
+            return {
+                "armed"     : self._request is not None or self._signalled,
+                "active"    : active is not None,
+                "mode"      : active["mode"] if active else None,
+                "beans_done": active["beans_done"] if active else 0,
+                "last_file" : self.last_file,
+            }
+
+    # ── Sorting-thread side ────────────────────────────────────────────────────
+
+    def bean_start(self):
+        if self._stale_profiler is not None:
+            self._unhook_stale()
+        if self._signalled:
+            self._signalled = False
+            self.request(beans=self._signal_beans)
+        if self._request is None:           # fast path: one attribute check
+            return
+        with self._lock:
+            if self._request is None or self._active:
+                return
+            mode, beans, seconds = self._request
+            self._request = None
+            active = {"mode": mode, "beans": beans, "beans_done": 0,
+                      "deadline": time.monotonic() + seconds if seconds else None,
+                      "started": time.strftime("%Y%m%d_%H%M%S"),
+                      "thread": threading.get_ident()}
+            if mode == "pstats":
+                active["profiler"] = cProfile.Profile()
+                active["profiler"].enable()  # profiles the calling (sorting) thread
+            else:
+                active["stacks"] = Counter()
+                active["stop"] = threading.Event()
+                active["sampler"] = threading.Thread(
+                    target=self._sample, args=(threading.get_ident(), active),
+                    name="ProfileSampler", daemon=True)
+                active["sampler"].start()
+            if seconds:
+                timer = threading.Timer(seconds, self._finish, args=(active,))
+                timer.daemon = True
+                timer.start()
+            self._active = active
+
+    def bean_end(self):
+        if self._stale_profiler is not None:
+            self._unhook_stale()
+        active = self._active
+        if active is None:
+            return
+        active["beans_done"] += 1
+        done_beans = active["beans"] and active["beans_done"] >= active["beans"]
+        done_time = active["deadline"] and time.monotonic() >= active["deadline"]
+        if done_beans or done_time:
+            self._finish(active)
+
+    # ── Internals ──────────────────────────────────────────────────────────────
+
+    def _sample(self, thread_id, active):
+        stacks, stop = active["stacks"], active["stop"]
+        while not stop.wait(SAMPLE_INTERVAL_S):
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                             f":{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                stacks[";".join(reversed(names))] += 1
+
+    def _unhook_stale(self):
+        """Sorting thread: detach a profiler that a timer finished."""
+        profiler, self._stale_profiler = self._stale_profiler, None
+        if profiler is not None:
+            profiler.disable()
+
+    def _finish(self, active):
+        """Write the profile. Called from bean_end(), status() or the deadline timer."""
+        with self._lock:
+            if self._active is not active:      # already finished elsewhere
+                return
+            self._active = None
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"profile_{self.session}_{active['started']}")
+        if active["mode"] == "pstats":
+            # cProfile hooks only the thread that enabled it: from any other
+            # thread, snapshot now and let the sorting thread unhook it later
+            if threading.get_ident() == active["thread"]:
+                active["profiler"].disable()
+            else:
+                self._stale_profiler = active["profiler"]
+            path = base + ".pstats"
+            active["profiler"].dump_stats(path)
+        else:
+            active["stop"].set()
+            active["sampler"].join(timeout=1.0)
+            path = base + ".collapsed"
+            with open(path, "w") as f:
+                for stack, n in active["stacks"].most_common():
+                    f.write(f"{stack} {n}\n")
+        with self._lock:
+            self.last_file = path
+        print(f"[Profiler] {active['beans_done']} beans profiled → {path}")
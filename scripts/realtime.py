@@ -0,0 +1,181 @@
+"""
+realtime.py — Opt-in real-time execution for the sorting thread
+Group Trailblazers | Uganda Christian University
+
+Pulse counting and gate timing share the CPU with Flask, logging and
+the CNN, and Python's cyclic garbage collector can pause any thread for
+milliseconds. RealtimeMode reduces that jitter:
+
+  - enter() — called from the acquisition/actuation thread: pins it to
+    REALTIME_CPU and raises its priority (SCHED_FIFO if permitted, else
+    a lower nice value). Anything not permitted is skipped and reported.
+  - the interpreter's GIL switch interval is shortened so other Python
+    threads (Flask, writers) give the GIL back sooner
+  - gc.freeze() at startup moves long-lived objects (models, modules)
+    out of the collector's view; window_start()/window_end() disable
+    the collector while a bean is being measured/actuated and run a
+    cheap young-generation collection between beans instead.
+  - sleep() sleeps to an absolute deadline (coarse sleep, then a short
+    spin) and records how late it woke in a jitter histogram — with
+    the mode off it is a plain time.sleep(), still measured, so the
+    two can be compared.
+
+HOW TO RUN (compare jitter with and without real-time mode):
+  python scripts/realtime.py [seconds]
+  sudo python scripts/realtime.py [seconds]   — allows SCHED_FIFO
+"""
+
+import os
+import gc
+import sys
+import time
+import threading
+import numpy as np
+
+# ── Real-time Configuration ────────────────────────────────────────────────────
+REALTIME_CPU        = 3         # core reserved for the sorting thread (Pi 4/5: 0-3)
+REALTIME_PRIORITY   = 50        # SCHED_FIFO priority (1-99)
+FALLBACK_NICE       = -10       # used when SCHED_FIFO is not permitted
+SPIN_S              = 0.001     # final part of sleep() spent spinning
+SWITCH_INTERVAL_S   = 0.0005    # GIL hand-over interval in real-time mode
+JITTER_BUCKETS_US   = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+
+class JitterHistogram:
+    """Lateness (µs) of timed events: fixed buckets + a preallocated sample ring."""
+
+    def __init__(self, name: str, capacity: int = 100_000):
+        self.name = name
+        self.bounds = np.array(JITTER_BUCKETS_US, dtype=np.float64)
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self._samples = np.zeros(capacity, dtype=np.float32)
+        self.n = 0
+
+    def record(self, late_us: float):
+        self.counts[np.searchsorted(self.bounds, late_us)] += 1
+        self._samples[self.n % len(self._samples)] = late_us
+        self.n += 1
+
+    def summary(self) -> dict:
+        s = self._samples[:min(self.n, len(self._samples))]
+        if len(s) == 0:
+            return {"n": 0}
+        p50, p95, p99 = np.percentile(s, [50, 95, 99])
+        return {"n": self.n, "p50_us": float(p50), "p95_us": float(p95),
+                "p99_us": float(p99), "max_us": float(s.max())}
+
+    def print(self):
+        s = self.summary()
+        if not s["n"]:
+            return
+        print(f"\n  Timing jitter — {self.name} ({s['n']} events)")
+        print(f"  p50 {s['p50_us']:.0f} µs | p95 {s['p95_us']:.0f} µs | "
+              f"p99 {s['p99_us']:.0f} µs | max {s['max_us']:.0f} µs")
+        labels = [f"≤{b:g}" for b in JITTER_BUCKETS_US] + [f">{JITTER_BUCKETS_US[-1]:g}"]
+        peak = max(self.counts.max(), 1)
+        for label, c in zip(labels, self.counts):
+            if c:
+                print(f"  {label:>8} µs {'█' * int(40 * c / peak):<40} {c}")
+
+
+class RealtimeMode:
+    def __init__(self, enabled: bool = False, cpu: int = REALTIME_CPU,
+                 priority: int = REALTIME_PRIORITY):
+        self.enabled = enabled
+        self.cpu = cpu
+        self.priority = priority
+        self.applied = {}
+        self.jitter = JitterHistogram("sleep wake-up lateness")
+
+    def enter(self) -> dict:
+        """Apply affinity/priority/GC settings to the CALLING thread."""
+        if not self.enabled:
+            return self.applied
+        # Linux: pid 0 = the calling thread for both calls
+        try:
+            if self.cpu in os.sched_getaffinity(0):
+                os.sched_setaffinity(0, {self.cpu})
+                self.applied["affinity"] = self.cpu
+            else:
+                self.applied["affinity"] = f"skipped (CPU {self.cpu} not available)"
+        except (AttributeError, OSError) as e:
+            self.applied["affinity"] = f"skipped ({e})"
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+            self.applied["scheduler"] = f"SCHED_FIFO {self.priority}"
+        except (AttributeError, OSError):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), FALLBACK_NICE)
+                self.applied["scheduler"] = f"nice {FALLBACK_NICE}"
+            except (AttributeError, OSError) as e:
+                self.applied["scheduler"] = f"skipped ({e})"
+        # Other Python threads hold the GIL for up to the switch interval
+        # (default 5 ms) before this thread can run — shorten it
+        sys.setswitchinterval(SWITCH_INTERVAL_S)
+        self.applied["switch_interval_ms"] = SWITCH_INTERVAL_S * 1000
+        gc.collect()
+        gc.freeze()
+        self.applied["gc"] = "frozen, disabled during bean windows"
+        print(f"[Realtime] {self.applied}")
+        return self.applied
+
+    def window_start(self):
+        """Bean measurement/actuation begins — no GC pauses until window_end()."""
+        if self.enabled:
+            gc.disable()
+
+    def window_end(self):
+        if self.enabled:
+            gc.collect(0)           # young generation only — well under 1 ms
+            gc.enable()
+
+    def sleep(self, seconds: float):
+        """Sleep `seconds`, recording wake-up lateness in self.jitter."""
+        deadline = time.perf_counter() + seconds
+        if self.enabled:
+            coarse = seconds - SPIN_S
+            if coarse > 0:
+                time.sleep(coarse)
+            while time.perf_counter() < deadline:
+                pass
+        else:
+            time.sleep(seconds)
+        self.jitter.record((time.perf_counter() - deadline) * 1e6)
+
+
+def probe(mode: RealtimeMode, seconds: float, interval: float = 0.005) -> JitterHistogram:
+    """Periodic sleeps on a fresh thread (as the sorting thread would do)."""
+    def run():
+        mode.enter()
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            mode.window_start()
+            mode.sleep(interval)
+            mode.window_end()
+    t = threading.Thread(target=run, name="JitterProbe")
+    t.start()
+    t.join()
+    return mode.jitter
+
+
+def _background_load(stop):
+    """Allocation-heavy busy thread: keeps the GC and the scheduler active."""
+    junk = []
+    while not stop.is_set():
+        junk.append([{"i": i} for i in range(200)])
+        if len(junk) > 500:
+            junk.clear()
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    stop = threading.Event()
+    loader = threading.Thread(target=_background_load, args=(stop,), daemon=True)
+    loader.start()
+    try:
+        for enabled in (False, True):
+            hist = probe(RealtimeMode(enabled=enabled), seconds)
+            hist.name = f"real-time mode {'ON' if enabled else 'OFF'}"
+            hist.print()
+    finally:
+        stop.set()
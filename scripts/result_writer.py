@@ -0,0 +1,154 @@
+"""
+result_writer.py — Buffered CSV result sink for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+Opening the CSV, writing one row and closing it again for every bean
+costs a file open/close (and often a flush to the SD card) inside the
+sorting loop. ResultWriter keeps the file open instead:
+
+  - the sorting loop only appends a tuple to an in-memory list
+  - a background thread formats and writes the rows, flushing when
+    FLUSH_ROWS rows are pending or FLUSH_INTERVAL seconds have passed
+  - FSYNC_POLICY decides how hard each flush pushes to the SD card:
+      "never"    — leave it to the OS (fastest, may lose rows on power cut)
+      "interval" — os.fsync() on every flush (default)
+      "always"   — write and fsync every row as soon as it arrives
+
+Timestamps are taken as time.time() floats on the hot path and only
+formatted on the writer thread (once per second, then reused).
+
+close() writes everything still pending; it is also registered with
+atexit, and install_sigterm_handler() turns SIGTERM into a normal exit
+so `finally:` blocks and close() still run under systemd/kill.
+"""
+
+import os
+import csv
+import time
+import atexit
+import signal
+import sys
+import threading
+
+# ── Writer Configuration ───────────────────────────────────────────────────────
+FLUSH_ROWS      = 50        # flush once this many rows are pending
+FLUSH_INTERVAL  = 2.0       # ...or this many seconds after the first pending row
+FSYNC_POLICY    = "interval"
+TIME_FORMAT     = "%Y-%m-%d %H:%M:%S"
+
+
+def install_sigterm_handler():
+    """Make SIGTERM raise SystemExit so shutdown code runs as for Ctrl+C."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
+class ResultWriter:
+    """Append rows to a CSV from the sorting loop without touching the disk."""
+
+    def __init__(self, path: str, header: list, flush_rows: int = FLUSH_ROWS,
+                 flush_interval: float = FLUSH_INTERVAL, fsync: str = FSYNC_POLICY):
+        if fsync not in ("never", "interval", "always"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.flush_rows = 1 if fsync == "always" else flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        new_file = not os.path.isfile(path) or os.path.getsize(path) == 0
+        self._f = open(path, "a", newline="")
+        self._csv = csv.writer(self._f)
+        if new_file:
+            self._csv.writerow(header)
+            self._f.flush()
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._running = True
+        self._last_sec = None
+        self._last_str = ""
+
+        self.rows_written = 0
+        self.flushes = 0
+        self._flush_s = 0.0
+        self.max_flush_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ── Producer side (sorting loop) ───────────────────────────────────────────
+
+    def write(self, *fields, ts: float | None = None):
+        """Queue one row; the timestamp column is prepended on the writer thread."""
+        row = (time.time() if ts is None else ts, fields)
+        with self._cond:
+            if not self._running:
+                raise ValueError(f"write to closed ResultWriter ({self.path})")
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_rows:
+                self._cond.notify()
+
+    # ── Writer thread ──────────────────────────────────────────────────────────
+
+    def _format_ts(self, ts: float) -> str:
+        sec = int(ts)
+        if sec != self._last_sec:
+            self._last_sec = sec
+            self._last_str = time.strftime(TIME_FORMAT, time.localtime(sec))
+        return self._last_str
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._pending) < self.flush_rows:
+                    self._cond.wait(self.flush_interval)
+                rows, self._pending = self._pending, []
+                running = self._running
+            if rows:
+                self._flush(rows)
+            if not running:
+                self._f.close()         # only once everything queued is written
+                return
+
+    def _flush(self, rows):
+        t0 = time.perf_counter()
+        self._csv.writerows([(self._format_ts(ts), *fields) for ts, fields in rows])
+        self._f.flush()
+        if self.fsync != "never":
+            os.fsync(self._f.fileno())
+        ms = (time.perf_counter() - t0) * 1000
+        self.rows_written += len(rows)
+        self.flushes += 1
+        self._flush_s += ms / 1000
+        self.max_flush_ms = max(self.max_flush_ms, ms)
+
+    # ── Stats / shutdown ───────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "rows_written"  : self.rows_written,
+            "pending"       : pending,
+            "flushes"       : self.flushes,
+            "avg_flush_ms"  : self._flush_s / self.flushes * 1000 if self.flushes else 0.0,
+            "max_flush_ms"  : self.max_flush_ms,
+        }
+
+    def close(self, timeout: float = 10.0):
+        """
+        Write all pending rows and close the file. Safe to call twice.
+        The writer thread closes the file after its last flush; if that
+        takes longer than `timeout` it is left to finish in the background.
+        """
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            print(f"[Writer] {self.path}: still flushing after {timeout:.0f}s — "
+                  f"file is closed when the last rows are written")
+        atexit.unregister(self.close)
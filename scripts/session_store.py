@@ -0,0 +1,402 @@
+"""
+session_store.py — Columnar on-disk store for per-bean sorting records
+Group Trailblazers | Uganda Christian University
+
+The CSV logs are easy to open in Excel but every analysis has to
+re-parse all of the text. This store keeps the same per-bean records
+as one NumPy array per column, split into chunks and partitioned by
+session:
+
+  data/sessions/
+    20260301_020350/
+      chunk_000001/ts.npy  bean_id.npy  raw_r.npy ... decision.npy
+      chunk_000002/...
+      chunk_000003.wal        ← rows of the chunk still being filled
+    sorting_results/          ← converted from data/sorting_results.csv
+      chunk_000001/...
+
+Appends go to an in-memory chunk that is written out when it reaches
+CHUNK_ROWS rows (or on flush/close). So that a crash or power cut loses
+at most a few seconds of beans, a background thread (like ResultWriter's)
+also appends the new rows to the chunk's single write-ahead file every
+FLUSH_INTERVAL_S seconds (sooner after FLUSH_ROWS rows) and fsyncs it in
+place. The sorting loop itself only copies values into arrays. A full
+chunk is written to a .tmp directory, synced and renamed into place by
+the same thread, and its .wal file is then removed; after a crash the
+next writer turns a leftover .wal back into a chunk. Reads open the .npy
+files with mmap_mode="r", so loading one column of millions of beans
+touches only that column's bytes.
+
+HOW TO RUN:
+  python scripts/session_store.py convert        — import the existing CSV logs
+  python scripts/session_store.py summary        — per-session counts / pass rate
+"""
+
+import os
+import csv
+import time
+import shutil
+import threading
+import numpy as np
+from datetime import datetime
+
+# ── Store Configuration ────────────────────────────────────────────────────────
+STORE_DIR   = "data/sessions"
+CHUNK_ROWS  = 65536
+FLUSH_ROWS  = 256           # write-ahead save after this many new rows...
+FLUSH_INTERVAL_S = 10.0     # ...or this long after the last save
+
+# Column name → dtype. Unknown float values are NaN, unknown decision is -1.
+SCHEMA = {
+    "ts"            : np.float64,   # unix time (seconds)
+    "bean_id"       : np.int64,
+    "raw_r"         : np.float32,
+    "raw_g"         : np.float32,
+    "raw_b"         : np.float32,
+    "weight_g"      : np.float32,
+    "dt_prob"       : np.float32,
+    "cnn_prob"      : np.float32,
+    "fusion_score"  : np.float32,
+    "decision"      : np.int8,      # 1 = GOOD, 0 = BAD, -1 = unknown
+    "sense_ms"      : np.float32,
+    "capture_ms"    : np.float32,
+    "infer_ms"      : np.float32,
+    "total_ms"      : np.float32,
+}
+
+# One packed record per bean in the write-ahead (.wal) files
+ROW_DTYPE = np.dtype([(name, dt) for name, dt in SCHEMA.items()])
+
+DECISION_CODES = {"GOOD": 1, "BAD": 0}
+
+# Existing CSV logs and the session name each is converted into
+CSV_SOURCES = {
+    "data/sorting_results.csv"     : "sorting_results",
+    "data/passthrough_results.csv" : "passthrough_results",
+    "data/manual_test_results.csv" : "manual_test_results",
+}
+
+# CSV header → store column (headers not listed here are ignored)
+CSV_COLUMNS = {
+    "weight_g"      : "weight_g",
+    "red"           : "raw_r",
+    "green"         : "raw_g",
+    "blue"          : "raw_b",
+    "dt_prob"       : "dt_prob",
+    "cnn_prob"      : "cnn_prob",
+    "fusion_score"  : "fusion_score",
+}
+
+
+def _missing(dtype):
+    return -1 if np.issubdtype(dtype, np.integer) else np.nan
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _is_chunk(name: str) -> bool:
+    """A finished chunk directory: chunk_NNNNNN."""
+    return name.startswith("chunk_") and len(name) == 12
+
+
+def _write_chunk(path: str, cols: dict, n: int):
+    """Write the first n rows of `cols` as chunk dir `path`: .tmp, synced, renamed."""
+    tmp = path + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for name, arr in cols.items():
+        with open(os.path.join(tmp, name + ".npy"), "wb") as f:
+            np.save(f, arr[:n])
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+def _read_wal(path: str):
+    """Records in a .wal file (a torn last record is ignored); None if empty."""
+    n = os.path.getsize(path) // ROW_DTYPE.itemsize
+    return np.memmap(path, dtype=ROW_DTYPE, mode="r", shape=(n,)) if n else None
+
+
+class SessionWriter:
+    """Appends records to one session, one chunk at a time."""
+
+    def __init__(self, path: str, chunk_rows: int = CHUNK_ROWS,
+                 flush_rows: int = FLUSH_ROWS, flush_interval_s: float = FLUSH_INTERVAL_S):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        os.makedirs(path, exist_ok=True)
+        self._chunk = self._recover() + 1
+        self._cols = self._new_chunk()
+        self._n = 0
+        self._saved = 0                 # rows of the current chunk already in its .wal
+        self._sealed = []               # (chunk, cols, n) waiting to be written
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self.rows = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="SessionWriter", daemon=True)
+        self._thread.start()
+
+    def _new_chunk(self) -> dict:
+        return {name: np.full(self.chunk_rows, _missing(dt), dtype=dt)
+                for name, dt in SCHEMA.items()}
+
+    def _chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.path, f"chunk_{chunk:06d}")
+
+    def _recover(self) -> int:
+        """Tidy up after a crash; returns the highest chunk number on disk."""
+        for name in os.listdir(self.path):
+            full = os.path.join(self.path, name)
+            if name.endswith(".tmp"):
+                shutil.rmtree(full)                     # never renamed into place
+            elif name.endswith(".wal"):
+                chunk_dir = full[:-4]
+                if not os.path.isdir(chunk_dir):
+                    rows = _read_wal(full)
+                    if rows is not None:
+                        _write_chunk(chunk_dir, {c: rows[c] for c in SCHEMA}, len(rows))
+                        print(f"[Session] Recovered {len(rows)} rows → {chunk_dir}")
+                os.remove(full)
+        return max((int(n[6:12]) for n in os.listdir(self.path) if _is_chunk(n)),
+                   default=0)
+
+    def append(self, **fields):
+        """Add one bean. Unknown columns raise KeyError; omitted ones stay missing."""
+        with self._lock:
+            i = self._n
+            for name, value in fields.items():
+                if name == "decision" and isinstance(value, str):
+                    value = DECISION_CODES.get(value, -1)
+                self._cols[name][i] = value
+            self._n += 1
+            self.rows += 1
+            if self._n == self.chunk_rows:
+                self._seal()
+            elif self._n - self._saved >= self.flush_rows:
+                self._wake.set()
+
+    def append_columns(self, columns: dict):
+        """Add many beans at once from equal-length arrays (used by the converter)."""
+        n = len(next(iter(columns.values())))
+        start = 0
+        with self._lock:
+            while start < n:
+                take = min(n - start, self.chunk_rows - self._n)
+                for name, values in columns.items():
+                    self._cols[name][self._n:self._n + take] = values[start:start + take]
+                self._n += take
+                self.rows += take
+                start += take
+                if self._n == self.chunk_rows:
+                    self._seal()
+
+    def _seal(self):
+        """Hand the current chunk to the writer thread and start a new one (lock held)."""
+        if self._n == 0:
+            return
+        self._sealed.append((self._chunk, self._cols, self._n))
+        self._chunk += 1
+        self._cols = self._new_chunk()
+        self._n = 0
+        self._saved = 0
+        self._wake.set()
+
+    # ── Writer thread ──────────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            with self._lock:
+                sealed, self._sealed = self._sealed, []
+                pending = None
+                if self._n > self._saved:
+                    pending = np.empty(self._n - self._saved, dtype=ROW_DTYPE)
+                    for name, arr in self._cols.items():
+                        pending[name] = arr[self._saved:self._n]
+                    wal_chunk = self._chunk
+                    self._saved = self._n
+                closing = self._closing
+            try:
+                for chunk, cols, n in sealed:
+                    _write_chunk(self._chunk_path(chunk), cols, n)
+                    wal = self._chunk_path(chunk) + ".wal"
+                    if os.path.exists(wal):
+                        os.remove(wal)
+                if pending is not None:
+                    with open(self._chunk_path(wal_chunk) + ".wal", "ab") as f:
+                        f.write(pending.tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+            except OSError as e:
+                self.errors += 1
+                print(f"[Session] Write failed: {e}")
+            if closing:
+                return
+
+    # ── Flush / shutdown ───────────────────────────────────────────────────────
+
+    def flush(self):
+        """Write the buffered rows as a new chunk (on the writer thread)."""
+        with self._lock:
+            self._seal()
+
+    def close(self, timeout: float = 10.0):
+        """Write everything still buffered, then stop the thread."""
+        with self._lock:
+            self._seal()
+            self._closing = True
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            print(f"[Session] Writer still busy after {timeout}s — "
+                  f"{self.path} keeps its .wal for recovery")
+
+
+class SessionStore:
+    """Session-partitioned column store under STORE_DIR."""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def sessions(self) -> list:
+        return sorted(d for d in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, d)))
+
+    def writer(self, session: str, chunk_rows: int = CHUNK_ROWS) -> SessionWriter:
+        return SessionWriter(os.path.join(self.root, session), chunk_rows)
+
+    def _chunk_dirs(self, sessions=None):
+        """Chunk dirs in order, plus the .wal of a chunk still being filled."""
+        for session in sessions or self.sessions():
+            path = os.path.join(self.root, session)
+            names = os.listdir(path)
+            full = {n for n in names if _is_chunk(n)}
+            live = {n for n in names if n.endswith(".wal") and n[:-4] not in full}
+            for chunk in sorted(full | live):
+                yield os.path.join(path, chunk)
+
+    def iter_chunks(self, name: str, sessions=None):
+        """Yield one memory-mapped array per chunk for column `name` (no copying)."""
+        if name not in SCHEMA:
+            raise KeyError(f"Unknown column: {name}")
+        for chunk in self._chunk_dirs(sessions):
+            if chunk.endswith(".wal"):
+                rows = _read_wal(chunk)
+                if rows is not None:
+                    yield rows[name]
+            else:
+                yield np.load(os.path.join(chunk, name + ".npy"), mmap_mode="r")
+
+    def column(self, name: str, sessions=None) -> np.ndarray:
+        parts = list(self.iter_chunks(name, sessions))
+        if not parts:
+            return np.empty(0, dtype=SCHEMA[name])
+        return np.concatenate(parts)
+
+    def columns(self, names, sessions=None) -> dict:
+        return {name: self.column(name, sessions) for name in names}
+
+    def summary(self, sessions=None) -> dict:
+        """Per-session bean count, pass rate, time span and throughput."""
+        out = {}
+        for session in sessions or self.sessions():
+            ts = self.column("ts", [session])
+            dec = self.column("decision", [session])
+            n = len(ts)
+            span = float(np.nanmax(ts) - np.nanmin(ts)) if n else 0.0
+            out[session] = {
+                "beans"         : n,
+                "good"          : int(np.count_nonzero(dec == 1)),
+                "bad"           : int(np.count_nonzero(dec == 0)),
+                "pass_rate"     : float(np.mean(dec[dec >= 0] == 1)) if np.any(dec >= 0) else 0.0,
+                "duration_s"    : span,
+                "beans_per_min" : n / (span / 60) if span > 0 else 0.0,
+            }
+        return out
+
+
+def _parse_timestamps(values) -> np.ndarray:
+    """'YYYY-mm-dd HH:MM:SS' (local time) → unix seconds, cached per distinct string."""
+    cache = {}
+    out = np.empty(len(values), dtype=np.float64)
+    for i, v in enumerate(values):
+        t = cache.get(v)
+        if t is None:
+            try:
+                t = datetime.strptime(v, "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                t = np.nan
+            cache[v] = t
+        out[i] = t
+    return out
+
+
+def _parse_float(values) -> np.ndarray:
+    out = np.full(len(values), np.nan, dtype=np.float32)
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except ValueError:
+            pass
+    return out
+
+
+def convert_csv(csv_path: str, store: SessionStore, session: str) -> int:
+    """Import one CSV results log into `session`. Returns the number of rows."""
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return 0
+    header = rows[0].keys()
+    cols = {"ts": _parse_timestamps([r["timestamp"] for r in rows])}
+    cols["bean_id"] = np.array(
+        [int("".join(ch for ch in r["bean_id"] if ch.isdigit()) or -1) for r in rows],
+        dtype=np.int64)
+    cols["decision"] = np.array(
+        [DECISION_CODES.get(r["decision"], -1) for r in rows], dtype=np.int8)
+    for csv_name, col in CSV_COLUMNS.items():
+        if csv_name in header:
+            cols[col] = _parse_float([r[csv_name] for r in rows])
+
+    writer = store.writer(session)
+    writer.append_columns(cols)
+    writer.close()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import sys
+    store = SessionStore()
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "summary"
+
+    if cmd == "convert":
+        for path, session in CSV_SOURCES.items():
+            if not os.path.isfile(path):
+                continue
+            if session in store.sessions():
+                print(f"  {session}: already converted, skipping")
+                continue
+            t0 = time.perf_counter()
+            n = convert_csv(path, store, session)
+            print(f"  {path} → {session}: {n} rows ({time.perf_counter() - t0:.2f} s)")
+
+    t0 = time.perf_counter()
+    summary = store.summary()
+    print(f"\n  {'Session':<24} {'Beans':>8} {'Pass %':>7} {'Beans/min':>10}")
+    for session, s in summary.items():
+        print(f"  {session:<24} {s['beans']:>8} {s['pass_rate'] * 100:>6.1f}% "
+              f"{s['beans_per_min']:>10.1f}")
+    print(f"\n  Summary computed in {(time.perf_counter() - t0) * 1000:.1f} ms")
@@ -0,0 +1,131 @@
+"""
+sim_camera.py — Simulated camera for testing the Coffee Bean Sorter on a laptop
+Group Trailblazers | Uganda Christian University
+
+Stand-in for Picamera2 that draws synthetic beans on a belt-coloured
+background, using the same bean colours as the laptop simulation in
+06_sorter_main.py. capture_array() has the Picamera2 signature so the
+camera-side code (segmenter, ring buffer, batch classifier) can run
+without the Pi.
+"""
+
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+# ── Simulation Configuration ───────────────────────────────────────────────────
+BELT_COLOUR  = (40, 70, 140)     # blue belt contrasts with every bean colour
+BEAN_SIZE    = (44, 32)          # bean ellipse (width, height) in pixels
+GOOD_RGB     = (140, 93, 58)
+BAD_RGB      = [(38, 30, 22), (198, 204, 175), (105, 98, 90)]   # black, immature, foreign
+
+
+class SimulatedCamera:
+    """
+    Synthetic bean frames. `beans_per_frame` beans are laid out on a grid
+    so they never touch; every third bean is defective.
+    """
+
+    def __init__(self, resolution=(640, 480), beans_per_frame: int = 1,
+                 fps: float | None = None, seed: int = 42):
+        self.resolution = resolution
+        self.beans_per_frame = beans_per_frame
+        self.fps = fps                      # None = return frames as fast as possible
+        self._rng = np.random.default_rng(seed)
+        self._bean_id = 0
+        self._last = 0.0
+        self.last_truth = []                # [(cx, cy, is_good), …] for the last frame
+
+    def _bean_colour(self, is_good):
+        base = GOOD_RGB if is_good else BAD_RGB[self._rng.integers(len(BAD_RGB))]
+        jitter = self._rng.normal(0, 6, 3)
+        return tuple(int(np.clip(c + j, 0, 255)) for c, j in zip(base, jitter))
+
+    def empty_frame(self) -> np.ndarray:
+        w, h = self.resolution
+        return np.full((h, w, 3), BELT_COLOUR, dtype=np.uint8)
+
+    def capture_array(self, stream: str = "main") -> np.ndarray:
+        if self.fps:
+            wait = self._last + 1.0 / self.fps - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last = time.monotonic()
+
+        w, h = self.resolution
+        img  = Image.new("RGB", (w, h), BELT_COLOUR)
+        draw = ImageDraw.Draw(img)
+
+        n    = self.beans_per_frame
+        cols = int(np.ceil(np.sqrt(n * w / h)))
+        rows = int(np.ceil(n / cols))
+        bw, bh = BEAN_SIZE
+        self.last_truth = []
+        for i in range(n):
+            self._bean_id += 1
+            is_good = self._bean_id % 3 != 0
+            r, c = divmod(i, cols)
+            cx = int((c + 0.5) * w / cols + self._rng.integers(-4, 5))
+            cy = int((r + 0.5) * h / rows + self._rng.integers(-4, 5))
+            draw.ellipse([cx - bw // 2, cy - bh // 2, cx + bw // 2, cy + bh // 2],
+                         fill=self._bean_colour(is_good))
+            self.last_truth.append((cx / w, cy / h, is_good))
+
+        return np.array(img.filter(ImageFilter.GaussianBlur(1)))
+
+    # Picamera2 lifecycle methods, so the simulator is a drop-in
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SimulatedBelt(SimulatedCamera):
+    """
+    Moving belt: beans enter at the left edge and travel right at
+    `speed` (fraction of frame width per second), so the same bean is
+    seen in several consecutive frames — used to exercise tracking.
+    """
+
+    def __init__(self, resolution=(640, 480), speed: float = 0.5,
+                 beans_per_second: float = 2.0, fps: float = 30.0, seed: int = 42):
+        super().__init__(resolution, beans_per_frame=0, fps=None, seed=seed)
+        self.speed = speed
+        self.beans_per_second = beans_per_second
+        self.frame_interval = 1.0 / fps
+        self.t = 0.0                         # simulated clock, seconds
+        self._next_spawn = 0.0
+        self._beans = []                     # [x, y, colour, is_good, id]
+
+    def capture_array(self, stream: str = "main") -> np.ndarray:
+        self.t += self.frame_interval
+        w, h = self.resolution
+        bw, bh = BEAN_SIZE
+
+        if self.t >= self._next_spawn:
+            self._bean_id += 1
+            is_good = self._bean_id % 3 != 0
+            y = self._rng.uniform(0.2, 0.8)
+            self._beans.append([-bw / (2 * w), y, self._bean_colour(is_good),
+                                is_good, self._bean_id])
+            # Random arrivals, but never closer than 1.5 bean lengths (beans don't overlap)
+            min_gap = 1.5 * bw / (w * self.speed)
+            self._next_spawn = self.t + max(min_gap,
+                                            self._rng.exponential(1.0 / self.beans_per_second))
+
+        for bean in self._beans:
+            bean[0] += self.speed * self.frame_interval
+        self._beans = [b for b in self._beans if b[0] * w - bw / 2 < w]
+
+        img  = Image.new("RGB", (w, h), BELT_COLOUR)
+        draw = ImageDraw.Draw(img)
+        for x, y, colour, _, _ in self._beans:
+            cx, cy = int(x * w), int(y * h)
+            draw.ellipse([cx - bw // 2, cy - bh // 2, cx + bw // 2, cy + bh // 2],
+                         fill=colour)
+        self.last_truth = [(x, y, g) for x, y, _, g, _ in self._beans]
+        return np.array(img.filter(ImageFilter.GaussianBlur(1)))
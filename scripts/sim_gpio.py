@@ -0,0 +1,161 @@
+"""
+sim_gpio.py — Simulated RPi.GPIO and HX711 for running the sorter on a laptop
+Group Trailblazers | Uganda Christian University
+
+Stand-in for RPi.GPIO with the same function names, so sorter code can
+run (and be benchmarked) without the Pi:
+
+  - input() on an input pin returns a square wave at SIGNAL_HZ, like the
+    TCS3200 OUT pin
+  - wait_for_edge() returns at the next simulated edge (immediately when
+    realtime=False, so only the Python overhead is measured)
+  - set_input(pin, level) drives an input pin from a test and fires any
+    add_event_detect() callbacks, like a real edge interrupt
+  - PWM objects record their duty-cycle changes
+
+install() registers the simulator as `RPi.GPIO` in sys.modules, so an
+unchanged `import RPi.GPIO as GPIO` picks it up.
+"""
+
+import sys
+import time
+import types
+
+# ── Simulation Configuration ───────────────────────────────────────────────────
+SIGNAL_HZ = 2000        # TCS3200-like output frequency on input pins
+
+BCM, BOARD = 11, 10
+IN, OUT = 1, 0
+LOW, HIGH = 0, 1
+RISING, FALLING, BOTH = 31, 32, 33
+PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+
+
+class SimPWM:
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0.0
+        self.changes = []          # (perf_counter, duty)
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+        self.changes.append((time.perf_counter(), duty))
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.duty = 0.0
+
+
+class SimGPIO:
+    """Module-like object; attribute names match RPi.GPIO."""
+
+    BCM, BOARD = BCM, BOARD
+    IN, OUT = IN, OUT
+    LOW, HIGH = LOW, HIGH
+    RISING, FALLING, BOTH = RISING, FALLING, BOTH
+    PUD_OFF, PUD_DOWN, PUD_UP = PUD_OFF, PUD_DOWN, PUD_UP
+    PWM = SimPWM
+
+    def __init__(self, signal_hz: float = SIGNAL_HZ, realtime: bool = False):
+        self.signal_hz = signal_hz
+        self.realtime = realtime
+        self.modes = {}
+        self.levels = {}            # output pins and driven input pins
+        self.driven = set()         # inputs controlled by set_input()
+        self.callbacks = {}         # pin → [(edge, callback)]
+        self.writes = 0
+
+    # ── Setup ──────────────────────────────────────────────────────────────────
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pins, mode, pull_up_down=PUD_OFF, initial=LOW):
+        for pin in pins if isinstance(pins, (list, tuple)) else [pins]:
+            self.modes[pin] = mode
+            if mode == OUT:
+                self.levels[pin] = initial
+
+    def cleanup(self, *args):
+        self.callbacks.clear()
+
+    # ── Pins ───────────────────────────────────────────────────────────────────
+    def output(self, pins, value):
+        for pin in pins if isinstance(pins, (list, tuple)) else [pins]:
+            self.levels[pin] = value
+            self.writes += 1
+
+    def input(self, pin):
+        if pin in self.driven or self.modes.get(pin) == OUT:
+            return self.levels.get(pin, LOW)
+        # Square wave: high for the first half of each period
+        return HIGH if (time.perf_counter() * self.signal_hz) % 1.0 < 0.5 else LOW
+
+    def wait_for_edge(self, pin, edge, timeout=None):
+        if self.realtime:
+            period = 1.0 / self.signal_hz
+            time.sleep(period - (time.perf_counter() % period))
+        return pin
+
+    # ── Interrupts ─────────────────────────────────────────────────────────────
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks.setdefault(pin, [])
+        if callback:
+            self.callbacks[pin].append((edge, callback))
+
+    def add_event_callback(self, pin, callback):
+        self.callbacks.setdefault(pin, []).append((BOTH, callback))
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def set_input(self, pin, level):
+        """Drive an input pin (tests/simulations) and fire edge callbacks."""
+        self.driven.add(pin)
+        old = self.levels.get(pin, LOW)
+        self.levels[pin] = level
+        if old == level:
+            return
+        edge = RISING if level == HIGH else FALLING
+        for want, callback in self.callbacks.get(pin, []):
+            if want in (edge, BOTH):
+                callback(pin)
+
+
+class SimHX711:
+    """Returns a fixed weight (grams) with a little noise."""
+
+    def __init__(self, weight_g: float = 0.15, read_s: float = 0.0):
+        self.weight_g = weight_g
+        self.read_s = read_s        # simulated conversion time per reading
+        self._n = 0
+
+    def get_weight_mean(self, readings=1):
+        if self.read_s:
+            time.sleep(self.read_s * readings)
+        self._n += 1
+        return self.weight_g + 0.002 * ((self._n % 5) - 2)
+
+    def tare(self):
+        pass
+
+    def set_scale_ratio(self, ratio):
+        pass
+
+
+def install(gpio: SimGPIO | None = None) -> SimGPIO:
+    """Make `import RPi.GPIO as GPIO` return the simulator."""
+    gpio = gpio or SimGPIO()
+    rpi = types.ModuleType("RPi")
+    rpi.GPIO = gpio
+    sys.modules["RPi"] = rpi
+    sys.modules["RPi.GPIO"] = gpio
+    return gpio
@@ -0,0 +1,105 @@
+"""
+span_trace.py — Per-bean stage timing for the Coffee Bean Sorter
+Group Trailblazers | Uganda Christian University
+
+Records one span (stage, bean, start, end) for every pipeline stage of
+every bean into preallocated NumPy arrays — no allocation per bean, and
+the oldest spans are overwritten once the buffer is full.
+
+At the end of a session:
+  - export_chrome(path) writes a Chrome trace-event JSON file; open it
+    in chrome://tracing or https://ui.perfetto.dev to see every bean's
+    stages on a timeline
+  - print_summary() prints p50 / p95 / p99 per stage
+
+Usage:
+  tracer = SpanTracer()
+  SENSE  = tracer.stage("read_all_sensors")
+  t0 = tracer.now(); ...; tracer.add(SENSE, bean_id, t0)
+"""
+
+import json
+import time
+import numpy as np
+
+TRACE_CAPACITY = 200_000        # spans kept (~5 MB)
+
+
+class SpanTracer:
+    """Fixed-size span buffer with Chrome-trace export and percentile summary."""
+
+    now = staticmethod(time.perf_counter_ns)
+
+    def __init__(self, capacity: int = TRACE_CAPACITY):
+        self.capacity = capacity
+        self._stage = np.zeros(capacity, dtype=np.int16)
+        self._bean  = np.zeros(capacity, dtype=np.int64)
+        self._start = np.zeros(capacity, dtype=np.int64)
+        self._end   = np.zeros(capacity, dtype=np.int64)
+        self._names = []
+        self.count = 0              # spans recorded (may exceed capacity)
+
+    def stage(self, name: str) -> int:
+        """Register a stage name once; returns the id passed to add()."""
+        if name not in self._names:
+            self._names.append(name)
+        return self._names.index(name)
+
+    def add(self, stage: int, bean: int, start_ns: int, end_ns: int | None = None):
+        i = self.count % self.capacity
+        self._stage[i] = stage
+        self._bean[i]  = bean
+        self._start[i] = start_ns
+        self._end[i]   = time.perf_counter_ns() if end_ns is None else end_ns
+        self.count += 1
+
+    def _valid(self):
+        n = min(self.count, self.capacity)
+        return (self._stage[:n], self._bean[:n], self._start[:n], self._end[:n])
+
+    def summary(self) -> dict:
+        """{stage: {"n", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}"""
+        stage, _, start, end = self._valid()
+        dur_ms = (end - start) / 1e6
+        out = {}
+        for sid, name in enumerate(self._names):
+            d = dur_ms[stage == sid]
+            if len(d) == 0:
+                continue
+            p50, p95, p99 = np.percentile(d, [50, 95, 99])
+            out[name] = {"n": int(len(d)), "p50_ms": float(p50), "p95_ms": float(p95),
+                         "p99_ms": float(p99), "max_ms": float(d.max())}
+        return out
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print(f"\n  {'Stage':<22} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        print(f"  {'─' * 68}")
+        for name, s in summary.items():
+            print(f"  {name:<22} {s['n']:>7} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+                  f"{s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+        if self.count > self.capacity:
+            print(f"  (last {self.capacity} of {self.count} spans)")
+
+    def export_chrome(self, path: str, pid: int = 1):
+        """Write spans as Chrome trace 'complete' events (one row per stage)."""
+        stage, bean, start, end = self._valid()
+        order = np.argsort(start, kind="stable")
+        t_base = int(start[order[0]]) if len(order) else 0
+        # Metadata events label each row with its stage name
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": sid,
+                   "args": {"name": name}}
+                  for sid, name in enumerate(self._names)]
+        for i in order:
+            events.append({
+                "name": self._names[stage[i]],
+                "ph": "X", "pid": pid, "tid": int(stage[i]),
+                "ts": (int(start[i]) - t_base) / 1000,        # µs
+                "dur": (int(end[i]) - int(start[i])) / 1000,
+                "args": {"bean": int(bean[i])},
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
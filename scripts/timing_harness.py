@@ -0,0 +1,407 @@
+"""
+timing_harness.py — Intended vs actual timing of sorter GPIO actions
+Group Trailblazers | Uganda Christian University
+
+We assume the servo moves exactly SERVO_DELAY after it was told to, and
+that a read_freq(0.1) window lasts 0.1 s. This harness measures it,
+without editing the sorter code:
+
+  - RPi.GPIO is wrapped: every output() write and PWM ChangeDutyCycle()
+    is timestamped. Its *intended* time is the deadline of the sleep
+    that preceded it on the same thread (sleep(d) then write → intended
+    = sleep start + d), or the moment the call was made otherwise.
+  - time.sleep is wrapped: wake-up lateness is recorded per thread
+    (sleeps under MIN_SLEEP_S, e.g. read_freq's 50 µs poll, pass through).
+  - counting windows record their actual length: sorter_service.read_freq
+    against its requested duration; 06 read_colour_channel (which counts
+    a fixed number of edges) against its own median length.
+  - context intervals are recorded alongside: garbage collections
+    (gc.callbacks), result-log flushes and model inference.
+
+The report gives the lateness distribution per action, and for each
+outlier (lateness above OUTLIER_US) whether a GC, log flush or
+inference overlapped it.
+
+The wrapping is process-wide (time.sleep, the RPi.GPIO module, the
+sorter functions and ResultWriter._flush), so the harness owns the
+process it runs in: every patch is recorded and undone by restore()
+when the run ends. With --sim, 06's models fall back to fixed-output
+stand-ins if joblib / tflite_runtime or the model files are missing.
+
+HOW TO RUN (repo root; Ctrl+C or the time limit ends the run):
+  python scripts/timing_harness.py service [seconds] [--sim]
+  python scripts/timing_harness.py 06 [seconds] [--sim]
+  --sim uses sim_gpio (and sim_camera / SimHX711 for 06) instead of the Pi
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import threading
+import inspect
+import importlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# ── Harness Configuration ──────────────────────────────────────────────────────
+CAPACITY        = 200_000       # events kept (oldest overwritten)
+OUTLIER_US      = 2000          # lateness that counts as an outlier
+CORRELATE_US    = 5000          # context interval must end within this before the event
+MIN_SLEEP_S     = 0.001         # shorter sleeps are polling, not timing
+HANDOVER_S      = 0.25          # a sleep's deadline applies to an action within this
+
+_real_sleep = time.sleep
+
+
+class TimingRecorder:
+    """Preallocated event + context-interval log."""
+
+    def __init__(self, capacity: int = CAPACITY):
+        self.capacity = capacity
+        self._action   = np.zeros(capacity, dtype=np.int16)
+        self._intended = np.zeros(capacity, dtype=np.int64)
+        self._actual   = np.zeros(capacity, dtype=np.int64)
+        self._names = []
+        self._relative = set()      # actions measured against their own median
+        self.n = 0
+        self._ctx_label = np.zeros(capacity, dtype=np.int16)
+        self._ctx_start = np.zeros(capacity, dtype=np.int64)
+        self._ctx_end   = np.zeros(capacity, dtype=np.int64)
+        self._ctx_names = []
+        self.n_ctx = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._gc_start = None
+        self._gc_callback = None
+        self._patches = []          # (owner, attr, original), undone by restore()
+        self._modules = {}          # sys.modules entries replaced, undone by restore()
+
+    @staticmethod
+    def _id(names, name):
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    def event(self, name: str, intended_ns: int, actual_ns: int):
+        with self._lock:
+            i = self.n % self.capacity
+            self._action[i] = self._id(self._names, name)
+            self._intended[i] = intended_ns
+            self._actual[i] = actual_ns
+            self.n += 1
+
+    def interval(self, label: str, start_ns: int, end_ns: int):
+        with self._lock:
+            i = self.n_ctx % self.capacity
+            self._ctx_label[i] = self._id(self._ctx_names, label)
+            self._ctx_start[i] = start_ns
+            self._ctx_end[i] = end_ns
+            self.n_ctx += 1
+
+    # ── Deadline hand-over from sleep() to the next GPIO action ────────────────
+
+    def set_deadline(self, ns, woke_ns=None):
+        self._local.deadline = (ns, woke_ns) if ns is not None else None
+
+    def take_deadline(self, called_ns):
+        pending = getattr(self._local, "deadline", None)
+        self._local.deadline = None
+        if pending is None or called_ns - pending[1] > HANDOVER_S * 1e9:
+            return called_ns        # no recent sleep — intended = now
+        return pending[0]
+
+    # ── Instrumentation helpers ────────────────────────────────────────────────
+
+    def patch(self, owner, attr, value):
+        """setattr(owner, attr, value), remembered so restore() can undo it."""
+        self._patches.append((owner, attr, getattr(owner, attr)))
+        setattr(owner, attr, value)
+
+    def save_modules(self, *names):
+        """Remember sys.modules entries about to be replaced, for restore()."""
+        for name in names:
+            self._modules.setdefault(name, sys.modules.get(name))
+
+    def restore(self):
+        """Undo every patch (newest first) and stop watching the GC."""
+        while self._patches:
+            owner, attr, original = self._patches.pop()
+            setattr(owner, attr, original)
+        for name, module in self._modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        self._modules = {}
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+        self._gc_callback = None
+
+    def sleep(self, seconds):
+        if seconds < MIN_SLEEP_S:
+            return _real_sleep(seconds)
+        start = time.perf_counter_ns()
+        _real_sleep(seconds)
+        deadline = start + int(seconds * 1e9)
+        woke = time.perf_counter_ns()
+        self.event(f"sleep[{threading.current_thread().name}]", deadline, woke)
+        self.set_deadline(deadline, woke)
+
+    def wrap_window(self, owner, attr, name, duration_arg=None):
+        """
+        Record owner.attr() calls as counting windows. The intended end is
+        start + the call's `duration_arg` argument; without one the window
+        is compared with the median length of all recorded windows.
+        """
+        fn = getattr(owner, attr)
+        sig = inspect.signature(fn)
+        if duration_arg is None:
+            self._relative.add(name)
+
+        def wrapped(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end = time.perf_counter_ns()
+                self.set_deadline(None)         # sleeps inside don't carry over
+                if duration_arg is None:
+                    self.event(name, start, end)
+                else:
+                    bound = sig.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    self.event(name, start + int(bound.arguments[duration_arg] * 1e9), end)
+        self.patch(owner, attr, wrapped)
+
+    def wrap_interval(self, owner, attr, label):
+        """Record owner.attr() calls as context intervals (GC-like suspects)."""
+        fn = getattr(owner, attr)
+
+        def wrapped(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.interval(label, start, time.perf_counter_ns())
+        self.patch(owner, attr, wrapped)
+
+    def watch_gc(self):
+        def callback(phase, info):
+            if phase == "start":
+                self._gc_start = time.perf_counter_ns()
+            elif self._gc_start is not None:
+                self.interval(f"gc_gen{info.get('generation', '?')}",
+                              self._gc_start, time.perf_counter_ns())
+                self._gc_start = None
+        self._gc_callback = callback
+        gc.callbacks.append(callback)
+
+    # ── Report ─────────────────────────────────────────────────────────────────
+
+    def report(self, outlier_us=OUTLIER_US):
+        n = min(self.n, self.capacity)
+        if n == 0:
+            print("  No timed events recorded.")
+            return {}
+        action = self._action[:n]
+        late_us = (self._actual[:n] - self._intended[:n]) / 1000
+        actual = self._actual[:n]
+
+        m = min(self.n_ctx, self.capacity)
+        c_label = self._ctx_label[:m]
+        c_start, c_end = self._ctx_start[:m], self._ctx_end[:m]
+
+        out = {}
+        print(f"\n  {'Action':<34} {'n':>6} {'p50 µs':>8} {'p95 µs':>8} "
+              f"{'p99 µs':>8} {'max µs':>9} {'outliers':>9}")
+        print(f"  {'─' * 88}")
+        for aid, name in enumerate(self._names):
+            sel = action == aid
+            if not sel.any():
+                continue
+            if name in self._relative:       # window length vs its median
+                late_us[sel] -= np.median(late_us[sel])
+            d = late_us[sel]
+            p50, p95, p99 = np.percentile(d, [50, 95, 99])
+            outliers = np.flatnonzero(sel & (late_us > outlier_us))
+
+            # Which context intervals overlapped each outlier?
+            causes = {}
+            for i in outliers:
+                hit = (c_start <= actual[i]) & (c_end >= actual[i] - CORRELATE_US * 1000)
+                labels = {self._ctx_names[l].split("_gen")[0] for l in c_label[hit]} or {"none"}
+                for label in labels:
+                    causes[label] = causes.get(label, 0) + 1
+
+            out[name] = {"n": int(len(d)), "p50_us": float(p50), "p95_us": float(p95),
+                         "p99_us": float(p99), "max_us": float(d.max()),
+                         "outliers": int(len(outliers)), "outlier_causes": causes}
+            print(f"  {name:<34} {len(d):>6} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} "
+                  f"{d.max():>9.0f} {len(outliers):>9}")
+            if causes:
+                print(f"  {'':<34} ↳ overlapping: " +
+                      ", ".join(f"{k} {v}" for k, v in sorted(causes.items(),
+                                                             key=lambda kv: -kv[1])))
+
+        if m:
+            print(f"\n  Context intervals recorded:")
+            for lid, label in enumerate(self._ctx_names):
+                d = (c_end[c_label == lid] - c_start[c_label == lid]) / 1e6
+                if len(d):
+                    print(f"    {label:<20} {len(d):>6} × (p50 {np.median(d):.2f} ms, "
+                          f"max {d.max():.2f} ms)")
+        return out
+
+
+class InstrumentedPWM:
+    def __init__(self, pwm, pin, recorder):
+        self._pwm, self._pin, self._rec = pwm, pin, recorder
+
+    def ChangeDutyCycle(self, duty):
+        called = time.perf_counter_ns()
+        intended = self._rec.take_deadline(called)
+        self._pwm.ChangeDutyCycle(duty)
+        self._rec.event(f"pwm[{self._pin}]", intended, time.perf_counter_ns())
+
+    def __getattr__(self, name):
+        return getattr(self._pwm, name)
+
+
+class InstrumentedGPIO:
+    """RPi.GPIO proxy that timestamps writes and PWM changes."""
+
+    def __init__(self, gpio, recorder):
+        self._gpio, self._rec = gpio, recorder
+
+    def output(self, pins, value):
+        called = time.perf_counter_ns()
+        intended = self._rec.take_deadline(called)
+        self._gpio.output(pins, value)
+        label = pins if not isinstance(pins, (list, tuple)) else "multi"
+        self._rec.event(f"gpio_write[{label}]", intended, time.perf_counter_ns())
+
+    def PWM(self, pin, frequency):
+        return InstrumentedPWM(self._gpio.PWM(pin, frequency), pin, self._rec)
+
+    def __getattr__(self, name):
+        return getattr(self._gpio, name)
+
+
+def install(recorder: TimingRecorder, simulate: bool = False):
+    """Put the instrumented GPIO in sys.modules and wrap time.sleep."""
+    import sim_gpio
+    if simulate:
+        gpio = sim_gpio.SimGPIO(realtime=True)
+    else:
+        import RPi.GPIO as gpio
+    wrapped = InstrumentedGPIO(gpio, recorder)
+    recorder.save_modules("RPi", "RPi.GPIO")
+    sim_gpio.install(wrapped)       # registers any object as RPi.GPIO
+    recorder.patch(time, "sleep", recorder.sleep)
+    recorder.watch_gc()
+    return wrapped
+
+
+def run_service(recorder, seconds, simulate):
+    install(recorder, simulate)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, root)
+    svc = importlib.import_module("sorter_service")     # sorting thread starts here
+    recorder.wrap_window(svc, "read_freq", "read_freq window", "duration")
+    recorder.wrap_interval(svc.model, "predict", "inference")
+    recorder.wrap_interval(svc.results_db, "record", "log")
+    _real_sleep(seconds)
+
+
+class _SimTree:
+    """Stand-in decision tree (and identity scaler) for --sim runs."""
+    def get_depth(self):
+        return 0
+
+    def predict_proba(self, X):
+        return np.tile([0.3, 0.7], (len(X), 1))
+
+    def transform(self, X):
+        return X
+
+
+class _SimInterpreter:
+    """Stand-in TFLite interpreter for --sim runs: always 0.7 good."""
+    def get_input_details(self):
+        return [{"index": 0}]
+
+    def get_output_details(self):
+        return [{"index": 1}]
+
+    def set_tensor(self, index, value):
+        pass
+
+    def invoke(self):
+        pass
+
+    def get_tensor(self, index):
+        return np.array([[0.7]], dtype=np.float32)
+
+
+def _sim_models(load_models):
+    """load_models() replacement that falls back to stand-ins when it fails."""
+    def load():
+        try:
+            return load_models()
+        except (ImportError, OSError) as e:
+            print(f"[Harness] Models unavailable ({e}) — using fixed-output stand-ins")
+            interp = _SimInterpreter()
+            return (_SimTree(), _SimTree(), interp, interp.get_input_details(),
+                    interp.get_output_details(), {"best_strategy": "simulated"})
+    return load
+
+
+def run_sorter_main(recorder, seconds, simulate):
+    install(recorder, simulate)
+    m = importlib.import_module("06_sorter_main")
+    recorder.wrap_window(m, "read_colour_channel", "colour count window")
+    recorder.wrap_interval(m, "predict_bean", "inference")
+    import result_writer
+    recorder.wrap_interval(result_writer.ResultWriter, "_flush", "log_flush")
+
+    if simulate:
+        import sim_gpio
+        from sim_camera import SimulatedCamera
+
+        def init_hardware():
+            gpio = sys.modules["RPi.GPIO"]
+            m.CONFIG["LED_PIN"] = m.CONFIG["LED_PIN"] or 26
+            cam = SimulatedCamera(resolution=(m.CONFIG["IMG_SIZE"],) * 2)
+            return (gpio, sim_gpio.SimHX711(), gpio.PWM(m.CONFIG["SERVO_PIN"], 50),
+                    gpio.PWM(m.CONFIG["DC_MOTOR_EN"], 100), cam)
+        recorder.patch(m, "init_hardware", init_hardware)
+        recorder.patch(m, "load_models", _sim_models(m.load_models))
+
+    # End the session like Ctrl+C after `seconds`
+    timer = threading.Timer(seconds, lambda: os.kill(os.getpid(), signal.SIGINT))
+    timer.daemon = True
+    timer.start()
+    m.main()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    target = args[0] if args else "service"
+    seconds = float(args[1]) if len(args) > 1 else 60
+    simulate = "--sim" in sys.argv
+
+    rec = TimingRecorder()
+    try:
+        if target == "06":
+            run_sorter_main(rec, seconds, simulate)
+        else:
+            run_service(rec, seconds, simulate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rec.restore()
+        print(f"\n  Timing harness — {target} ({'simulated' if simulate else 'hardware'})")
+        rec.report()
@@ -1,8 +1,21 @@
+import os
+import sys
 import time
 import joblib
 import threading
 import pandas as pd
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
+
+from results_db import ResultsDB
+from event_stream import EventBroadcaster, sse_stream, parse_seq
+from history_ring import HistoryRing
+from status_snapshot import StatusSnapshot
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from metrics import REGISTRY, CONTENT_TYPE
+from profiler_hook import ProfilerHook
+from realtime import RealtimeMode
+from config import SYSTEM
 
 import RPi.GPIO as GPIO
 
@@ -117,12 +130,41 @@ def move_servo_smooth(target_angle, step=3, delay=0.02):
 model_data = joblib.load("dt_model.joblib")
 model = model_data["model"]
 
-latest_result = {
+SESSION = time.strftime("%Y%m%d_%H%M%S")
+results_db = ResultsDB()
+events = EventBroadcaster()
+profiler = ProfilerHook(SESSION)
+
+# Opt-in: pin the sorting thread to its own core, raise its priority and
+# keep the GC out of bean windows (see scripts/realtime.py).
+# Set SYSTEM["REALTIME_MODE"] in scripts/config.py to enable.
+realtime = RealtimeMode(SYSTEM["REALTIME_MODE"], SYSTEM["REALTIME_CPU"])
+history = HistoryRing()
+
+# /status snapshot — replaced as a whole for every bean, never mutated
+WAITING = {
     "raw": {"R": 0.0, "G": 0.0, "B": 0.0},
     "normalized": {"R": 0.0, "G": 0.0, "B": 0.0},
     "prediction": "WAITING",
     "timestamp": time.time(),
 }
+status_snapshot = StatusSnapshot(dict(WAITING, errors=0, last_error=None))
+
+
+# =======================================================
+#  METRICS (served at /metrics)
+# =======================================================
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "sorter_stage_seconds", "Time spent in each sorting stage", ("stage",))
+M_SENSOR    = {c: STAGE_SECONDS.labels(f"sensor_{name}")    # same stage names as 06
+               for c, name in (('R', "red"), ('G', "green"), ('B', "blue"))}
+M_DT        = STAGE_SECONDS.labels("dt")
+M_ACTUATION = STAGE_SECONDS.labels("actuation")
+M_LOGGING   = STAGE_SECONDS.labels("logging")
+M_BEANS     = REGISTRY.counter("sorter_beans_total", "Beans sorted", ("decision",))
+M_LAST_BEAN = REGISTRY.gauge("sorter_last_bean_timestamp_seconds", "Unix time of the last bean")
+M_ERRORS    = REGISTRY.counter("sorter_errors_total", "Beans skipped after an error")
 
 
 # =======================================================
@@ -131,41 +173,74 @@ latest_result = {
 
 def sorting_loop():
     print("\nSorter running. Place beans...\n")
+    realtime.enter()
+    errors, last_error = 0, None
+    last_result, last_seq = WAITING, 0
 
     while True:
         time.sleep(0.6)  # Time to place bean
-
-        # --- Read RGB ---
-        raw = {}
-        for c in ['R', 'G', 'B']:
-            set_filter(c)
-            time.sleep(0.05)
-            raw[c] = read_freq()
-
-        # Normalize
-        norm = normalize(raw)
-
-        # ML prediction
-        X = pd.DataFrame([[norm['R'], norm['G'], norm['B']]],
-                         columns=['r', 'g', 'b'])
-        pred = model.predict(X)[0]
-
-        # Update dashboard data
-        latest_result.update({
-            "raw": raw,
-            "normalized": norm,
-            "prediction": pred,
-            "timestamp": time.time()
-        })
-
-        # --- Servo movement ---
-        if pred == "BAD":
-            move_servo_smooth(0)      # Move to left bin
-        else:
-            move_servo_smooth(180)    # Move to right bin
-
-        time.sleep(0.6)
-        move_servo_smooth(90)         # Return to center
+        profiler.bean_start()
+        realtime.window_start()
+        try:
+
+            # --- Read RGB ---
+            raw = {}
+            for c in ['R', 'G', 'B']:
+                t0 = time.perf_counter()
+                set_filter(c)
+                realtime.sleep(0.05)
+                raw[c] = read_freq()
+                M_SENSOR[c].observe_since(t0)
+
+            # Normalize
+            norm = normalize(raw)
+
+            # ML prediction
+            t0 = time.perf_counter()
+            X = pd.DataFrame([[norm['R'], norm['G'], norm['B']]],
+                             columns=['r', 'g', 'b'])
+            pred = model.predict(X)[0]
+            M_DT.observe_since(t0)
+
+            # Update dashboard data
+            result = {
+                "raw": raw,
+                "normalized": norm,
+                "prediction": str(pred),
+                "timestamp": time.time()
+            }
+            t0 = time.perf_counter()
+            results_db.record(SESSION, raw, norm, result["prediction"])
+            seq = events.publish(result)
+            history.append(seq, result["timestamp"], raw, norm, result["prediction"])
+            last_result, last_seq = result, seq
+            status_snapshot.publish(dict(result, errors=errors, last_error=last_error), seq)
+            M_LOGGING.observe_since(t0)
+            M_BEANS.labels(result["prediction"]).inc()
+            M_LAST_BEAN.set(result["timestamp"])
+
+            # --- Servo movement ---
+            t0 = time.perf_counter()
+            if pred == "BAD":
+                move_servo_smooth(0)      # Move to left bin
+            else:
+                move_servo_smooth(180)    # Move to right bin
+
+            M_ACTUATION.observe_since(t0)
+
+            time.sleep(0.6)
+            move_servo_smooth(90)         # Return to center
+        except Exception as e:
+            # One bad read must not kill the sorting thread — skip the bean
+            errors += 1
+            last_error = {"error": repr(e), "timestamp": time.time()}
+            M_ERRORS.inc()
+            print(f"[Sorter] Bean skipped after error #{errors}: {e!r}")
+            status_snapshot.publish(
+                dict(last_result, errors=errors, last_error=last_error), last_seq)
+        finally:
+            realtime.window_end()
+            profiler.bean_end()
 
 
 # =======================================================
@@ -176,7 +251,94 @@ app = Flask(__name__)
 
 @app.route("/status")
 def status():
-    return jsonify(latest_result)
+    body, etag = status_snapshot.current
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers={"ETag": etag})
+    return Response(body, mimetype="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@app.route("/events")
+def event_stream():
+    """
+    Server-sent events: one `bean` event per decision, `id:` = sequence.
+    Reconnecting clients send Last-Event-ID (or ?since=) to resume; after
+    a service restart they get a `reset` event and the backlog from the start.
+    """
+    last = request.headers.get("Last-Event-ID") or request.args.get("since")
+    return Response(sse_stream(events, parse_seq(last)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route("/profile", methods=["GET", "POST"])
+def profile():
+    """
+    POST /profile?beans=20 (or ?seconds=30) [&mode=pstats|collapsed]
+    profiles the next beans of the running sorter; GET shows progress.
+    """
+    if request.method == "POST":
+        try:
+            started = profiler.request(
+                beans=request.args.get("beans", type=int),
+                seconds=request.args.get("seconds", type=float),
+                mode=request.args.get("mode", "pstats"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not started:
+            return jsonify({"error": "profile already running", **profiler.status()}), 409
+    return jsonify(profiler.status())
+
+
+@app.route("/realtime")
+def realtime_status():
+    """Real-time mode settings and filter-settle sleep jitter."""
+    return jsonify({"enabled": realtime.enabled, "applied": realtime.applied,
+                    "jitter": realtime.jitter.summary()})
+
+
+@app.route("/history")
+def recent_history():
+    """Beans after ?since=<seq> (default: oldest kept), at most ?limit=N per page."""
+    since = request.args.get("since", default=0, type=int)
+    limit = max(1, min(request.args.get("limit", default=100, type=int), history.capacity))
+    records = history.since(since, limit)
+    return jsonify({
+        "records" : records,
+        "next"    : records[-1]["seq"] if records else max(since, history.oldest() - 1),
+        "head"    : history.head,
+        "oldest"  : history.oldest(),
+    })
+
+
+def _time_range():
+    """?start=&end= (unix seconds) or ?minutes=N back from now; default last hour."""
+    now = time.time()
+    end = request.args.get("end", default=now, type=float)
+    if "minutes" in request.args:
+        start = end - request.args.get("minutes", type=float) * 60
+    else:
+        start = request.args.get("start", default=end - 3600, type=float)
+    return start, end, request.args.get("session")
+
+
+@app.route("/results/summary")
+def results_summary():
+    return jsonify(results_db.summary(*_time_range()))
+
+
+@app.route("/results/per_minute")
+def results_per_minute():
+    return jsonify(results_db.per_minute(*_time_range()))
+
+
+@app.route("/results/sessions")
+def results_sessions():
+    return jsonify(results_db.sessions())
 
 
 # =======================================================
@@ -188,8 +350,10 @@ t.daemon = True
 t.start()
 
 if __name__ == "__main__":
+    profiler.install_signal()       # kill -USR1 <pid> also profiles the next beans
     try:
-        app.run(host="0.0.0.0", port=5000)
+        app.run(host="0.0.0.0", port=5000, threaded=True)
     finally:
+        results_db.close()
         pwm.stop()
         GPIO.cleanup()
@@ -0,0 +1,28 @@
+"""
+status_snapshot.py — Pre-serialised /status snapshot for sorter_service.py
+
+The sorting thread builds a complete new result, serialises it once
+and swaps it in with a single reference assignment. Flask threads read
+that reference and return the bytes as they are, so a reader can never
+see a half-updated result and serving /status costs no JSON encoding.
+"""
+
+import json
+import time
+
+
+class StatusSnapshot:
+    """Immutable (body, etag) pair, replaced atomically by the sorting thread."""
+
+    def __init__(self, initial: dict):
+        self._current = None
+        self.publish(initial, seq=0)
+
+    def publish(self, result: dict, seq: int):
+        body = json.dumps(dict(result, seq=seq)).encode()
+        self._current = (body, f'"{seq}-{int(time.time() * 1000)}"')  # atomic swap
+
+    @property
+    def current(self) -> tuple:
+        """(json_bytes, etag) of the newest snapshot."""
+        return self._current